@@ -0,0 +1,21 @@
+"""
+Chess Vision - Batch Analysis Entry Point.
+
+This script analyses FEN and PGN files offline with a pool of Stockfish processes
+and writes the results as JSON lines.
+
+Usage:
+    python analyze_positions.py positions.fen games.pgn -o results.jsonl [--depth D | --time S | --nodes N]
+        [--multipv N] [--engines N] [--threads N] [--hash MB] [--shard INDEX/COUNT]
+"""
+
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.chess.batch_analysis import main
+
+if __name__ == "__main__":
+    main()
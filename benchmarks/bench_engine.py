@@ -0,0 +1,196 @@
+"""
+Engine Benchmark.
+
+This script measures the engine layer against the scripted mock engine: the round-trip
+latency and throughput of analyze, the latency of get_best_move, and the time to
+recover from an engine crash through the restart path of analyze and by failing over
+to a supervised engine's standby process.
+
+The mock engine spends a fixed time per depth, so the difference between the measured
+latency and the scripted search time is the overhead of the engine layer.
+
+Usage:
+    python benchmarks/bench_engine.py [--positions N] [--depth D] [--depth-delay S] [--crash-every K]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from src.chess.engine import StockfishEngine
+
+
+def random_positions(count, max_plies=60, seed=1):
+    """
+    Generate random positions from random games.
+
+    Args:
+        count: Number of positions to generate
+        max_plies: Maximum number of plies before a position is taken
+        seed: Random seed
+
+    Returns:
+        A list of boards
+    """
+    rng = random.Random(seed)
+    positions = []
+
+    while len(positions) < count:
+        board = chess.Board()
+        for _ in range(rng.randrange(max_plies)):
+            if board.is_game_over():
+                break
+            board.push(rng.choice(list(board.legal_moves)))
+        if not board.is_game_over():
+            positions.append(board)
+
+    return positions
+
+
+def mock_engine(directory, name, depth, script, supervised=False):
+    """
+    Create an engine that runs the mock engine with a script.
+
+    Args:
+        directory: Directory for the configuration files
+        name: Name of the configuration
+        depth: Search depth of the engine
+        script: The mock engine script
+        supervised: Whether the engine keeps a standby process to fail over to
+
+    Returns:
+        A StockfishEngine running the mock engine
+    """
+    script_path = os.path.join(directory, f"{name}_script.json")
+    with open(script_path, "w") as f:
+        json.dump(script, f)
+
+    config_path = os.path.join(directory, f"{name}_engine.json")
+    with open(config_path, "w") as f:
+        json.dump({"engine": "mock", "script": script_path}, f)
+
+    return StockfishEngine(depth=depth, engine_config=config_path, supervised=supervised)
+
+
+def percentile(values, fraction):
+    """Get a percentile of a list of values."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(name, times, search_time):
+    """Print the latency statistics of one measurement."""
+    mean = sum(times) / len(times)
+    print(f"{name:18s} mean {mean * 1000:7.2f} ms, p50 {percentile(times, 0.5) * 1000:7.2f} ms, "
+          f"p95 {percentile(times, 0.95) * 1000:7.2f} ms, overhead {(mean - search_time) * 1000:6.2f} ms, "
+          f"{len(times) / sum(times):7.1f} positions/s")
+
+
+def measure_recovery(engine, positions):
+    """
+    Measure how long analysis is unavailable after each engine crash.
+
+    Args:
+        engine: A StockfishEngine running a crashing mock engine
+        positions: The positions to analyze
+
+    Returns:
+        The recovery time in seconds of each crash
+    """
+    engine.start()
+    if engine.supervisor is not None:
+        # Let the standby process start
+        time.sleep(0.5)
+
+    recovery_times = []
+    failed_at = None
+    for board in positions:
+        crashes = engine.supervisor.health.crashes if engine.supervisor is not None else 0
+        start = time.perf_counter()
+        lines = engine.analyze(board, limit_time=10.0)
+        if lines and lines[0].is_error:
+            if failed_at is None:
+                failed_at = start
+        elif failed_at is not None:
+            recovery_times.append(time.perf_counter() - failed_at)
+            failed_at = None
+        elif engine.supervisor is not None and engine.supervisor.health.crashes > crashes:
+            # Failed over within the call; the search itself is not recovery time
+            recovery_times.append(engine.supervisor.health.failover_times[-1])
+
+    engine.stop()
+    return recovery_times
+
+
+def report_recovery(name, times):
+    """Print the recovery statistics of one measurement."""
+    if times:
+        print(f"{name + ':':18s} mean {sum(times) / len(times) * 1000:7.2f} ms, "
+              f"max {max(times) * 1000:7.2f} ms over {len(times)} crashes")
+    else:
+        print(f"{name + ':':18s} no crashes")
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the engine layer against the mock engine.")
+    parser.add_argument("--positions", type=int, default=200, help="Number of random positions to analyze")
+    parser.add_argument("--depth", type=int, default=8, help="Search depth")
+    parser.add_argument("--depth-delay", type=float, default=0.001, help="Mock engine time per depth in seconds")
+    parser.add_argument("--crash-every", type=int, default=20, help="Searches between mock engine crashes")
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions)
+    search_time = args.depth * args.depth_delay
+    script = {"depth_delay": args.depth_delay, "max_depth": args.depth + 10}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = mock_engine(directory, "steady", args.depth, script)
+
+        start = time.perf_counter()
+        engine.start()
+        startup_time = time.perf_counter() - start
+
+        # The time limit is generous, so every search stops at the depth limit
+        analyze_times = []
+        for board in positions:
+            start = time.perf_counter()
+            engine.analyze(board, limit_time=10.0)
+            analyze_times.append(time.perf_counter() - start)
+
+        best_move_times = []
+        for board in positions:
+            start = time.perf_counter()
+            engine.get_best_move(board, limit_time=10.0)
+            best_move_times.append(time.perf_counter() - start)
+
+        engine.stop()
+
+        # Each crash makes one analyze fail and restart the engine (recovery lasts
+        # from that call until the next successful result); a supervised engine
+        # switches to its standby and retries within the same call
+        script = dict(script, crash_after_searches=args.crash_every)
+        recovery_times = measure_recovery(mock_engine(directory, "crashing", args.depth, script), positions)
+        failover_times = measure_recovery(
+            mock_engine(directory, "supervised", args.depth, script, supervised=True), positions
+        )
+
+    print(f"Positions: {len(positions)}, depth {args.depth}, scripted search time {search_time * 1000:.2f} ms")
+    print(f"Engine startup:    {startup_time * 1000:7.2f} ms")
+    report("analyze", analyze_times, search_time)
+    report("get_best_move", best_move_times, search_time)
+    report_recovery("Crash recovery", recovery_times)
+    report_recovery("With standby", failover_times)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Frame Pipeline Benchmark.
+
+This script measures the per-frame CPU cost of the detection-to-stability path,
+comparing the FEN string based tracker with the integer position key tracker.
+
+Usage:
+    python benchmarks/bench_frame_pipeline.py [--frames N]
+"""
+
+import os
+import sys
+import io
+import time
+import random
+import argparse
+import contextlib
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from src.detection.fen_generator import FENGenerator
+from src.detection.stability import StabilityTracker
+
+
+def make_detections(board, board_size=(395, 395), jitter=3):
+    """
+    Create synthetic detections for a board, as the detector would return them.
+
+    Args:
+        board: The chess.Board to render
+        board_size: Size of the captured region (width, height)
+        jitter: Maximum pixel offset added to each piece center
+
+    Returns:
+        A list of detected pieces
+    """
+    cell_w, cell_h = board_size[0] / 8.0, board_size[1] / 8.0
+    detections = []
+
+    for square, piece in board.piece_map().items():
+        column = chess.square_file(square)
+        row = 7 - chess.square_rank(square)
+        center_x = int((column + 0.5) * cell_w) + random.randint(-jitter, jitter)
+        center_y = int((row + 0.5) * cell_h) + random.randint(-jitter, jitter)
+        color = 'w' if piece.color == chess.WHITE else 'b'
+        detections.append({
+            "class": color + piece.symbol().lower(),
+            "confidence": random.uniform(0.6, 0.99),
+            "center": (center_x, center_y)
+        })
+
+    return detections
+
+
+def make_frames(num_frames, frames_per_position=12):
+    """
+    Create a stream of frames from a random game, holding each position for a while.
+
+    Args:
+        num_frames: Number of frames to create
+        frames_per_position: Number of frames each position is shown for
+
+    Returns:
+        A list of detection lists
+    """
+    board = chess.Board()
+    frames = []
+
+    while len(frames) < num_frames:
+        for _ in range(frames_per_position):
+            frames.append(make_detections(board))
+        moves = list(board.legal_moves)
+        if not moves:
+            board = chess.Board()
+            continue
+        board.push(random.choice(moves))
+
+    return frames[:num_frames]
+
+
+def run_fen_tracker(frames, threshold=10):
+    """
+    Run the FEN string based stability tracker over the frames.
+
+    This reproduces the per-frame work of the previous detection worker.
+
+    Returns:
+        The number of accepted positions
+    """
+    generator = FENGenerator()
+    recent_fens = []
+    consecutive = 0
+    last_fen = None
+    accepted = 0
+
+    for detections in frames:
+        fen = generator.generate_fen(detections)
+        print(f"Detected {len(detections)} pieces")
+        print(f"Generated FEN: {fen}")
+        try:
+            _ = chess.Board(fen)
+            if not recent_fens or fen != recent_fens[-1]:
+                consecutive = 1
+                recent_fens.append(fen)
+                if len(recent_fens) > 5:
+                    recent_fens.pop(0)
+                print(f"New FEN detected: {fen}, consecutive count: {consecutive}")
+            else:
+                consecutive += 1
+                print(f"Same FEN detected: {fen}, consecutive count: {consecutive}")
+            if consecutive >= threshold:
+                if fen != last_fen:
+                    last_fen = fen
+                    accepted += 1
+            else:
+                print(f"Waiting for stable FEN ({consecutive}/{threshold})")
+        except Exception:
+            consecutive = 0
+
+    return accepted
+
+
+def run_key_tracker(frames, threshold=10):
+    """
+    Run the integer key based stability tracker over the frames.
+
+    Returns:
+        The number of accepted positions
+    """
+    generator = FENGenerator()
+    stability = StabilityTracker(threshold=threshold)
+    accepted = 0
+
+    for detections in frames:
+        key, placement, _ = generator.generate_placement(detections)
+        if stability.observe(key):
+            fen = generator.placement_to_fen(placement)
+            _ = chess.Board(fen)
+            print(f"Stable position detected, updating board: {fen}")
+            accepted += 1
+
+    return accepted
+
+
+def time_run(func, frames):
+    """
+    Time a tracker over the frames with its console output discarded.
+
+    Returns:
+        A tuple (microseconds per frame, accepted positions)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        accepted = func(frames)
+        elapsed = time.perf_counter() - start
+    return elapsed * 1e6 / len(frames), accepted
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame detection-to-stability path.")
+    parser.add_argument("--frames", type=int, default=5000, help="Number of frames to process")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic game")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    frames = make_frames(args.frames)
+
+    fen_us, fen_accepted = time_run(run_fen_tracker, frames)
+    key_us, key_accepted = time_run(run_key_tracker, frames)
+
+    print(f"Frames: {len(frames)}")
+    print(f"FEN string tracker:  {fen_us:8.1f} us/frame ({fen_accepted} positions accepted)")
+    print(f"Integer key tracker: {key_us:8.1f} us/frame ({key_accepted} positions accepted)")
+    print(f"Speedup: {fen_us / key_us:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Move Inference Benchmark.
+
+This script measures the cost of finding the move between two consecutive positions,
+comparing the loop over all legal moves with the square-change signature index.
+
+Usage:
+    python benchmarks/bench_move_inference.py [--games N] [--pgn FILE]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.pgn
+
+from src.chess.move_detector import MoveIndex
+from src.chess.position import Position
+
+
+def random_games(num_games, max_plies=120, seed=1):
+    """
+    Generate a corpus of random games.
+
+    Args:
+        num_games: Number of games to generate
+        max_plies: Maximum number of plies per game
+        seed: Random seed
+
+    Returns:
+        A list of move lists
+    """
+    rng = random.Random(seed)
+    games = []
+
+    for _ in range(num_games):
+        board = chess.Board()
+        moves = []
+        while len(moves) < max_plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move)
+        games.append(moves)
+
+    return games
+
+
+def pgn_games(path):
+    """
+    Read a corpus of games from a PGN file.
+
+    Args:
+        path: Path to the PGN file
+
+    Returns:
+        A list of move lists
+    """
+    games = []
+    with open(path) as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            games.append(list(game.mainline_moves()))
+    return games
+
+
+def make_pairs(games):
+    """
+    Turn games into (previous board, new position, expected move) triples.
+
+    Returns:
+        A list of triples
+    """
+    pairs = []
+    for moves in games:
+        board = chess.Board()
+        for move in moves:
+            previous = board.copy()
+            board.push(move)
+            pairs.append((previous, Position(board=chess.Board(board.board_fen())), move))
+    return pairs
+
+
+def find_move_loop(previous_board, new_position):
+    """Find the move by trying every legal move, as the application used to."""
+    for move in previous_board.legal_moves:
+        test_board = previous_board.copy()
+        test_board.push(move)
+        if test_board.board_fen() == new_position.board_fen:
+            return move
+    return None
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark move inference between consecutive positions.")
+    parser.add_argument("--games", type=int, default=50, help="Number of random games to generate")
+    parser.add_argument("--pgn", help="PGN file to use as the game corpus instead of random games")
+    args = parser.parse_args()
+
+    games = pgn_games(args.pgn) if args.pgn else random_games(args.games)
+    pairs = make_pairs(games)
+
+    # Placement keys are computed once per accepted detection in the application
+    for _, position, _ in pairs:
+        _ = position.key
+
+    start = time.perf_counter()
+    loop_found = sum(find_move_loop(board, position) == move for board, position, move in pairs)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexes = [MoveIndex(board) for board, _, _ in pairs]
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_found = sum(index.lookup(position.key) == move for index, (_, position, move) in zip(indexes, pairs))
+    lookup_time = time.perf_counter() - start
+
+    count = len(pairs)
+    print(f"Games: {len(games)}, position pairs: {count}")
+    print(f"Legal move loop:   {loop_time * 1e6 / count:8.1f} us/pair ({loop_found} moves found)")
+    print(f"Index build:       {build_time * 1e6 / count:8.1f} us/position")
+    print(f"Index lookup:      {lookup_time * 1e6 / count:8.2f} us/pair ({index_found} moves found)")
+    print(f"Build + lookup:    {(build_time + lookup_time) * 1e6 / count:8.1f} us/pair "
+          f"({loop_time / (build_time + lookup_time):.2f}x faster than the loop)")
+
+
+if __name__ == "__main__":
+    main()
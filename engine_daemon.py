@@ -0,0 +1,21 @@
+"""
+Chess Vision - Engine Daemon Entry Point.
+
+This script runs a local daemon that owns a pool of Stockfish processes and shares
+it between Chess Vision instances over a Unix socket, so several windows do not
+each start their own engine.
+
+Usage:
+    python engine_daemon.py [--socket PATH] [--engines N] [--threads N] [--hash MB] [--engine-config FILE]
+"""
+
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.chess.engine_server import main
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,21 @@ Chess Module.
 This module provides chess-related functionality for the Chess Vision application.
 """
 
+from src.chess.analysis import AnalysisLine
+from src.chess.analysis_cache import AnalysisCache
+from src.chess.async_engine import AsyncAnalysisEngine
+from src.chess.batch_analysis import BatchAnalyzer
+from src.chess.budget import SearchBudget
 from src.chess.engine import StockfishEngine
+from src.chess.engine_pool import EnginePool
+from src.chess.game import GameTracker
+from src.chess.move_detector import MoveIndex
+from src.chess.move_quality import MoveQualityMap
+from src.chess.opening_book import OpeningBook
+from src.chess.position import Position
+from src.chess.review import GameReview
+from src.chess.tablebase import Tablebase
+from src.chess.tuning import EngineTuner
+from src.chess.watchdog import EngineSupervisor
 
-__all__ = ['StockfishEngine']
+__all__ = ['AnalysisLine', 'AnalysisCache', 'AsyncAnalysisEngine', 'BatchAnalyzer', 'SearchBudget', 'StockfishEngine', 'EnginePool', 'EngineSupervisor', 'EngineTuner', 'GameReview', 'GameTracker', 'MoveIndex', 'MoveQualityMap', 'OpeningBook', 'Position', 'Tablebase']
@@ -0,0 +1,167 @@
+"""
+Analysis Result Module.
+
+This module provides a compact representation of one line of engine analysis, which
+keeps the engine's score and moves and formats them only when displayed.
+"""
+
+from typing import Dict, List, Optional
+
+import chess
+import chess.engine
+
+
+# Kinds of analysis lines
+ENGINE = "engine"
+BOOK = "book"
+TABLEBASE = "tablebase"
+ERROR = "error"
+
+
+class AnalysisLine:
+    """
+    One principal variation of an analysis.
+
+    The score is kept as the engine's chess.engine.PovScore and the PV as
+    chess.Move objects, together with the depth, nodes and nps of the search.
+    The position is copied without its move stack, so a line stays valid
+    when the caller's board changes. The SAN moves and the score text are
+    only computed when they are first needed, and are then memoised. Book
+    and tablebase lines carry their own label instead of a search score, and
+    error lines only carry a message.
+    """
+
+    __slots__ = (
+        'board', 'score', 'pv', 'depth', 'nodes', 'nps', 'multipv',
+        'kind', 'label', 'weight', '_san', '_score_text'
+    )
+
+    def __init__(self, board: Optional[chess.Board], score: Optional[chess.engine.PovScore] = None,
+                 pv: Optional[List[chess.Move]] = None, depth: int = 0, nodes: Optional[int] = None,
+                 nps: Optional[int] = None, multipv: int = 1, kind: str = ENGINE,
+                 label: Optional[str] = None, weight: Optional[int] = None):
+        """
+        Initialize the analysis line.
+
+        Args:
+            board: The analysed position, which is copied without its move stack
+            score: The engine score, or None for book, tablebase and error lines
+            pv: The principal variation as a list of chess.Move objects
+            depth: The search depth
+            nodes: The number of nodes searched, if known
+            nps: The search speed in nodes per second, if known
+            multipv: The 1-based index of the principal variation
+            kind: ENGINE, BOOK, TABLEBASE or ERROR
+            label: The text shown instead of the score, if any
+            weight: The book weight of a book move
+        """
+        # A copy, so the caller may keep playing moves on its board
+        self.board = board.copy(stack=False) if board is not None else None
+        self.score = score
+        self.pv = pv if pv is not None else []
+        self.depth = depth
+        self.nodes = nodes
+        self.nps = nps
+        self.multipv = multipv
+        self.kind = kind
+        self.label = label
+        self.weight = weight
+        self._san = None
+        self._score_text = label
+
+    @classmethod
+    def from_info(cls, board: chess.Board, info: Dict) -> 'AnalysisLine':
+        """
+        Create an analysis line from an engine info dictionary.
+
+        Args:
+            board: The analysed position
+            info: The info dictionary of one principal variation
+
+        Returns:
+            An AnalysisLine
+        """
+        return cls(
+            board,
+            score=info.get("score"),
+            pv=list(info.get("pv", [])),
+            depth=info.get("depth", 0),
+            nodes=info.get("nodes"),
+            nps=info.get("nps"),
+            multipv=info.get("multipv", 1)
+        )
+
+    @classmethod
+    def error(cls, message: str) -> 'AnalysisLine':
+        """
+        Create an analysis line reporting an engine problem.
+
+        Args:
+            message: The status message, e.g. "Engine error"
+
+        Returns:
+            An AnalysisLine of kind ERROR
+        """
+        return cls(None, kind=ERROR, label=message)
+
+    @property
+    def is_error(self) -> bool:
+        """True if the line reports an engine problem instead of analysis."""
+        return self.kind == ERROR
+
+    @property
+    def move(self) -> Optional[chess.Move]:
+        """The first move of the PV, or None if the PV is empty."""
+        return self.pv[0] if self.pv else None
+
+    @property
+    def san(self) -> List[str]:
+        """The PV in SAN notation, computed on first use."""
+        if self._san is None:
+            sans = []
+            if self.pv:
+                board = self.board.copy(stack=False)
+                for move in self.pv:
+                    if not board.is_legal(move):
+                        break
+                    sans.append(board.san(move))
+                    board.push(move)
+            self._san = sans
+        return self._san
+
+    @property
+    def pv_text(self) -> str:
+        """The PV as a space-separated SAN string."""
+        return " ".join(self.san)
+
+    @property
+    def score_text(self) -> str:
+        """The score from white's point of view as text, e.g. "+0.35" or "Mate in 3"."""
+        if self._score_text is None:
+            if self.score is None:
+                self._score_text = "?"
+            elif self.score.is_mate():
+                self._score_text = f"Mate in {self.score.white().mate()}"
+            else:
+                self._score_text = f"{self.score.white().score() / 100.0:+.2f}"
+        return self._score_text
+
+    @property
+    def raw_score(self) -> int:
+        """The score in centipawns from white's point of view, with mates as +-10000."""
+        if self.score is None:
+            return 0
+        return self.score.white().score(mate_score=10000)
+
+    def to_info(self) -> Dict:
+        """
+        Get the line as an engine info dictionary, e.g. for the analysis cache.
+
+        Returns:
+            A dictionary with the score, pv, depth and multipv
+        """
+        return {"score": self.score, "pv": self.pv, "depth": self.depth, "multipv": self.multipv}
+
+    def __repr__(self) -> str:
+        """Return a short description of the line."""
+        return f"AnalysisLine({self.kind}, {self.score_text}, depth={self.depth}, pv={[m.uci() for m in self.pv]})"
@@ -0,0 +1,313 @@
+"""
+Analysis Cache Module.
+
+This module provides a transposition-keyed cache of engine analysis results, kept
+in memory with LRU eviction and persisted in an SQLite database.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import chess
+import chess.engine
+import chess.polyglot
+
+
+# Approximate memory cost of a cache entry and of each PV move, in bytes
+_ENTRY_COST = 400
+_MOVE_COST = 60
+
+
+def position_hash(board: chess.Board) -> int:
+    """
+    Get the Zobrist hash of a position.
+
+    The hash covers the piece placement, the side to move, the castling rights
+    and the en passant square, so transpositions share one key.
+
+    Args:
+        board: The chess board position
+
+    Returns:
+        The 64-bit Polyglot Zobrist hash
+    """
+    return chess.polyglot.zobrist_hash(board)
+
+
+def _encode_lines(lines: List[Dict]) -> str:
+    """Encode info dictionaries as JSON, with white-relative scores and UCI moves."""
+    encoded = []
+    for info in lines:
+        score = info["score"].white()
+        encoded.append({
+            "mate": score.mate(),
+            "cp": score.score(),
+            "pv": [move.uci() for move in info["pv"]],
+            "depth": info.get("depth", 0)
+        })
+    return json.dumps(encoded)
+
+
+def _decode_lines(text: str) -> List[Dict]:
+    """Decode JSON lines into info dictionaries like those of the engine."""
+    lines = []
+    for index, line in enumerate(json.loads(text)):
+        if line["mate"] is not None:
+            score = chess.engine.Mate(line["mate"])
+        else:
+            score = chess.engine.Cp(line["cp"])
+        lines.append({
+            "score": chess.engine.PovScore(score, chess.WHITE),
+            "pv": [chess.Move.from_uci(uci) for uci in line["pv"]],
+            "depth": line["depth"],
+            "multipv": index + 1
+        })
+    return lines
+
+
+class AnalysisCache:
+    """
+    A cache of engine analysis results keyed by position and engine configuration.
+
+    Each entry is keyed by the Zobrist hash of the position and a fingerprint
+    of the engine configuration (see StockfishEngine.fingerprint), and keeps
+    the deepest complete set of lines seen for it. The most recently used
+    entries are kept in memory up to a memory budget. With a database path,
+    every entry is also written to SQLite, so the cache survives restarts and
+    can be shared by several processes.
+
+    Stored entries are written by a background thread every `flush_interval`
+    seconds, in one transaction, so a search storing each completed depth
+    never waits for the database; only the deepest version of an entry
+    since the last write is written.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_budget: int = 16 * 1024 * 1024,
+                 flush_interval: float = 2.0):
+        """
+        Initialize the analysis cache.
+
+        Args:
+            path: Path of the SQLite database, or None to keep the cache in memory only
+            memory_budget: Approximate maximum memory of the in-memory entries in bytes
+            flush_interval: Seconds between writes of the stored entries to the database
+        """
+        self.path = path
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.entries = OrderedDict()  # (hash, fingerprint) -> (depth, lines, cost)
+        self.lock = threading.Lock()
+
+        # Entries waiting to be written, and the thread writing them on its own connection
+        self.flush_interval = flush_interval
+        self.pending = {}  # (hash, fingerprint) -> (depth, lines)
+        self.write_lock = threading.Lock()
+        self.writer = None
+        self.writer_db = None
+        self.closing = threading.Event()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+        self.db = None
+        if path is not None:
+            self._open_db(path)
+
+    def _open_db(self, path: str) -> None:
+        """Open the SQLite database and create its table if needed."""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self.db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+
+            # Write-ahead logging lets several processes read while one writes
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis ("
+                "hash INTEGER NOT NULL, fingerprint TEXT NOT NULL, "
+                "depth INTEGER NOT NULL, lines TEXT NOT NULL, "
+                "PRIMARY KEY (hash, fingerprint))"
+            )
+            self.db.commit()
+
+            # Writes go through a second connection, so lookups never wait for them
+            self.writer_db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self.writer_db.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            print(f"Error opening analysis cache {path}: {e}")
+            self.db = None
+            self.writer_db = None
+            return
+
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    @staticmethod
+    def _db_hash(key: int) -> int:
+        """Convert an unsigned 64-bit hash to the signed integer SQLite stores."""
+        return key - (1 << 64) if key >= (1 << 63) else key
+
+    def get(self, board: chess.Board, fingerprint: str, depth: int = 0) -> Optional[List[Dict]]:
+        """
+        Look up the analysis of a position.
+
+        Args:
+            board: The chess board position
+            fingerprint: The engine configuration fingerprint
+            depth: The minimum depth the cached analysis must have
+
+        Returns:
+            A list of info dictionaries (score, pv, depth, multipv), one for
+            each principal variation, or None if there is no entry at least
+            as deep as requested
+        """
+        key = (position_hash(board), fingerprint)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            elif self.db is not None:
+                entry = self._load(key)
+
+            if entry is None or entry[0] < depth:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return _decode_lines(entry[1])
+
+    def put(self, board: chess.Board, fingerprint: str, lines: List[Dict]) -> bool:
+        """
+        Store the analysis of a position if it is deeper than the cached one.
+
+        Args:
+            board: The chess board position
+            fingerprint: The engine configuration fingerprint
+            lines: A complete list of info dictionaries, one for each principal
+                variation, each with a score and a PV
+
+        Returns:
+            True if the entry was stored, False if a deeper one is cached
+        """
+        lines = [info for info in lines if "score" in info and "pv" in info]
+        if not lines:
+            return False
+
+        depth = min(info.get("depth", 0) for info in lines)
+        key = (position_hash(board), fingerprint)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                entry = self._load(key)
+            if entry is not None and entry[0] >= depth:
+                return False
+
+            text = _encode_lines(lines)
+            self._remember(key, depth, text)
+
+            # Written by the writer thread
+            if self.db is not None:
+                self.pending[key] = (depth, text)
+
+        return True
+
+    def _remember(self, key, depth: int, text: str) -> None:
+        """Keep an entry in memory, evicting the least recently used ones over the budget."""
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.memory_used -= old[2]
+
+        cost = _ENTRY_COST + len(text) + _MOVE_COST * text.count(",")
+        self.entries[key] = (depth, text, cost)
+        self.memory_used += cost
+
+        while self.memory_used > self.memory_budget and len(self.entries) > 1:
+            _, (_, _, evicted_cost) = self.entries.popitem(last=False)
+            self.memory_used -= evicted_cost
+
+    def _load(self, key):
+        """Load an entry from the database (or the entries not yet written) into memory."""
+        if key in self.pending:
+            depth, text = self.pending[key]
+            self._remember(key, depth, text)
+            return self.entries[key]
+
+        try:
+            row = self.db.execute(
+                "SELECT depth, lines FROM analysis WHERE hash = ? AND fingerprint = ?",
+                (self._db_hash(key[0]), key[1])
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis cache: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        self._remember(key, row[0], row[1])
+        return self.entries[key]
+
+    def _write_loop(self) -> None:
+        """Write the stored entries every flush interval until the cache is closed."""
+        while not self.closing.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write the entries stored since the last write to the database.
+
+        Entries are not overwritten where another process stored a deeper one.
+
+        Returns:
+            The number of entries written
+        """
+        with self.write_lock:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+            if not batch or self.writer_db is None:
+                return 0
+
+            try:
+                self.writer_db.executemany(
+                    "INSERT INTO analysis (hash, fingerprint, depth, lines) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (hash, fingerprint) DO UPDATE SET depth = excluded.depth, lines = excluded.lines "
+                    "WHERE excluded.depth > analysis.depth",
+                    [(self._db_hash(key[0]), key[1], depth, text) for key, (depth, text) in batch.items()]
+                )
+                self.writer_db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing analysis cache: {e}")
+                return 0
+        return len(batch)
+
+    def __len__(self) -> int:
+        """Return the number of entries in memory."""
+        return len(self.entries)
+
+    def close(self) -> None:
+        """Write the remaining entries and close the database."""
+        self.closing.set()
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        self.flush()
+
+        with self.write_lock:
+            if self.writer_db is not None:
+                self.writer_db.close()
+                self.writer_db = None
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
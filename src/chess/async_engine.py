@@ -0,0 +1,590 @@
+"""
+Async Chess Engine Module.
+
+This module provides a streaming analysis interface to the Stockfish chess engine
+built on the asyncio API of python-chess.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import chess
+import chess.engine
+
+from src.chess.analysis import AnalysisLine
+from src.chess.analysis_cache import position_hash
+from src.chess.engine import StockfishEngine
+from src.chess.watchdog import EngineHealth
+
+
+class AsyncAnalysisEngine:
+    """
+    A streaming analysis engine driven by an asyncio event loop.
+
+    The engine process is opened with chess.engine.popen_uci and every search
+    runs as an asyncio task on one event loop thread. New lines are delivered
+    through the on_update callback as soon as the engine sends them, so no
+    thread has to poll for results. Analysing a new position cancels the
+    running task, which stops the search immediately.
+
+    After our side has moved, the search of the opponent's position runs to
+    the configured depth and then the engine ponders: it searches the position
+    after the predicted reply (the first move of the PV) while the opponent
+    thinks. If that reply is played, the ponder search simply continues with
+    everything it has accumulated, like a UCI ponderhit; otherwise it is
+    cancelled and the real position is searched.
+
+    With a search budget on the config, a search of a position that stays on
+    the board stops once it has used the budget for its complexity, so a
+    position left alone for minutes does not keep the engine busy.
+
+    A configured standby process is kept ready, so when the engine dies, or
+    a search sends nothing for `stall_timeout` seconds, the search continues
+    on the standby within milliseconds and a new standby is started in the
+    background. While no search runs, the engine and the standby are pinged
+    with isready every `ping_interval` seconds. A position whose searches keep
+    failing is retried after exponentially growing delays, and given up with
+    an error status after `max_failures` consecutive failures. Invalid
+    positions (e.g. from a misdetection) are never sent to the engine.
+
+    The engine always runs in a process of its own, even when the config
+    analyzes on the shared engine daemon: the daemon only answers complete
+    searches, so streaming analysis is not shared.
+
+    All public methods are thread-safe and return immediately.
+    """
+
+    def __init__(self, config: StockfishEngine,
+                 on_update: Callable[[chess.Board, List[AnalysisLine]], None],
+                 on_status: Optional[Callable[[str], None]] = None,
+                 min_interval: float = 0.05, stall_timeout: float = 10.0,
+                 ping_interval: float = 2.0, ping_timeout: float = 2.0,
+                 max_failures: int = 3, retry_delay: float = 0.5):
+        """
+        Initialize the async analysis engine.
+
+        Args:
+            config: The StockfishEngine whose path, options and result formatting are used
+            on_update: Called with the analysed board and the list of analysis
+                lines, one for each principal variation, whenever new lines arrive
+            on_status: Called with a status message when the engine fails or restarts
+            min_interval: Minimum time in seconds between two updates
+            stall_timeout: Seconds without output after which a search counts as hung
+            ping_interval: Seconds between health checks of the idle engine and the standby
+            ping_timeout: Seconds to wait for readyok before an engine counts as hung
+            max_failures: Consecutive failed searches of a position after which it is given up
+            retry_delay: Seconds before the first retry of a failed search, doubled for each further one
+        """
+        self.config = config
+        self.on_update = on_update
+        self.on_status = on_status
+        self.min_interval = min_interval
+        self.stall_timeout = stall_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_failures = max_failures
+        self.retry_delay = retry_delay
+
+        self.loop = None
+        self.thread = None
+
+        # State owned by the event loop thread
+        self.transport = None
+        self.protocol = None
+        self.task = None
+        self._open_lock = None
+        self._flush = None  # Sends the latest lines of the running task
+
+        # Warm standby process, health checks and failure metrics
+        self.standby = None  # (transport, protocol) of a started and configured process
+        self._standby_task = None
+        self._watch_task = None
+        self._failed_at = None  # Event loop time of the last failure, until the next engine is ready
+        self.health = EngineHealth()
+
+        # Consecutive failed searches of the position last failing
+        self._failure_key = None
+        self._failures = 0
+
+        # Pondering on the opponent's predicted reply
+        self.ponder_enabled = True
+        self.ponder_color = chess.WHITE  # Our side; we ponder while the other side is to move
+        self.ponder_board = None  # The position being pondered, owned by the event loop thread
+        self.ponder_started = None
+
+        # Ponder statistics: hits, misses and the search time each hit saved in seconds
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.ponder_saved = deque(maxlen=100)
+
+    def start(self) -> None:
+        """Start the event loop thread; the engine process is opened on first use."""
+        if self.thread is not None:
+            return
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+
+    def is_running(self) -> bool:
+        """
+        Check if the event loop thread is running.
+
+        Returns:
+            True if the event loop thread is running, False otherwise
+        """
+        return self.thread is not None
+
+    def analyse(self, board: chess.Board) -> None:
+        """
+        Analyse a position until another position is analysed or the analysis is cancelled.
+
+        Args:
+            board: The chess board position, which is copied
+        """
+        self.start()
+        self.loop.call_soon_threadsafe(self._restart, board.copy())
+
+    def set_ponder(self, enabled: bool, color: chess.Color = chess.WHITE) -> None:
+        """
+        Configure pondering on the opponent's predicted reply.
+
+        Args:
+            enabled: Whether to ponder
+            color: Our side; the engine ponders while the other side is to move
+        """
+        self.ponder_enabled = enabled
+        self.ponder_color = color
+
+    def ponder_stats(self) -> Dict:
+        """
+        Get the pondering statistics.
+
+        Returns:
+            A dictionary with the hits, misses, hit rate and the mean search
+            time in seconds saved per hit
+        """
+        total = self.ponder_hits + self.ponder_misses
+        saved = list(self.ponder_saved)
+        return {
+            "hits": self.ponder_hits,
+            "misses": self.ponder_misses,
+            "hit_rate": self.ponder_hits / total if total else 0.0,
+            "mean_saved": sum(saved) / len(saved) if saved else 0.0
+        }
+
+    def cancel(self) -> None:
+        """Cancel the running analysis."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """
+        Cancel the analysis, quit the engine and stop the event loop thread.
+
+        Args:
+            timeout: Maximum time in seconds to wait for the engine to quit
+        """
+        if self.thread is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout)
+        except Exception as e:
+            print(f"Error closing engine: {e}")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.thread = None
+        self.loop = None
+
+    def _run_loop(self) -> None:
+        """Run the event loop of the engine thread."""
+        asyncio.set_event_loop(self.loop)
+        self._open_lock = asyncio.Lock()
+        self._watch_task = self.loop.create_task(self._watch())
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _status(self, message: str) -> None:
+        """Report a status message."""
+        print(message)
+        if self.on_status is not None:
+            self.on_status(message)
+
+    def _restart(self, board: chess.Board) -> None:
+        """Replace the running analysis task with one for a new position."""
+        if self.ponder_board is not None:
+            hit = position_hash(board) == position_hash(self.ponder_board)
+            if hit and self.task is not None and not self.task.done():
+                # Ponder hit: keep the search and everything it has accumulated
+                saved = time.monotonic() - self.ponder_started
+                self.ponder_hits += 1
+                self.ponder_saved.append(saved)
+                self.ponder_board = None
+                print(f"Ponder hit, search started {saved:.1f} s earlier")
+                if self._flush is not None:
+                    self._flush()
+                return
+
+            # A pondered book or tablebase position has no running search, so it is not a miss
+            if not hit:
+                self.ponder_misses += 1
+            self.ponder_board = None
+
+        self._cancel()
+        self.task = self.loop.create_task(self._analyse(board))
+
+    def _start_ponder(self, board: chess.Board, reply: chess.Move) -> None:
+        """Replace the running analysis with a search of the position after the predicted reply."""
+        ponder_board = board.copy()
+        ponder_board.push(reply)
+        self.ponder_board = ponder_board
+        self.ponder_started = time.monotonic()
+        self.task = self.loop.create_task(self._analyse(ponder_board))
+
+    def _should_ponder(self, board: chess.Board, info: Dict) -> bool:
+        """Check whether the search of the opponent's position is deep enough to start pondering."""
+        return (self.ponder_enabled
+                and board.turn != self.ponder_color
+                and info.get("multipv", 1) == 1
+                and info.get("depth", 0) >= self.config.depth
+                and len(info["pv"]) > 0)
+
+    def _cancel(self) -> None:
+        """Cancel the running analysis task."""
+        self.ponder_board = None
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _open(self) -> None:
+        """Open and configure the engine process if it is not running, taking the standby if it is ready."""
+        async with self._open_lock:
+            if self.protocol is not None:
+                return
+
+            standby = self.standby is not None
+            if standby:
+                (self.transport, self.protocol), self.standby = self.standby, None
+            else:
+                self.transport, self.protocol = await self._spawn()
+
+            if self._failed_at is not None:
+                self.health.record_failover(self.loop.time() - self._failed_at, standby)
+                self._failed_at = None
+
+            self._ensure_standby()
+
+    async def _spawn(self):
+        """Start and configure an engine process."""
+        transport, protocol = await chess.engine.popen_uci(self.config.engine_path)
+        await protocol.configure(self.config.engine_options())
+        return transport, protocol
+
+    def _ensure_standby(self) -> None:
+        """Start a standby process in the background unless one is ready or starting."""
+        if self.standby is None and (self._standby_task is None or self._standby_task.done()):
+            self._standby_task = self.loop.create_task(self._spawn_standby())
+
+    async def _spawn_standby(self) -> None:
+        """Start and configure a standby process."""
+        started = self.loop.time()
+        try:
+            self.standby = await self._spawn()
+            self.health.record_respawn(self.loop.time() - started)
+        except (chess.engine.EngineError, OSError) as e:
+            print(f"Error starting the standby engine: {e}")
+
+    async def _ping(self, protocol) -> Optional[bool]:
+        """
+        Ping an engine with isready.
+
+        Returns:
+            True if it answered in time, False if not, or None if the ping was
+            pre-empted by a search (a new command cancels the ping)
+        """
+        ping = asyncio.ensure_future(protocol.ping())
+
+        # An abandoned ping fails when its engine is killed, which is expected
+        ping.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+        done, _ = await asyncio.wait({ping}, timeout=self.ping_timeout)
+        if not done:
+            ping.cancel()
+            return False
+        if ping.cancelled():
+            return None
+        return ping.exception() is None
+
+    async def _watch(self) -> None:
+        """Ping the idle engine and the standby until the event loop stops."""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+
+            # A ping would stop a running search, whose output is watched instead
+            idle = self.task is None or self.task.done()
+            if idle and self.protocol is not None:
+                protocol = self.protocol
+                if await self._ping(protocol) is False and protocol is self.protocol:
+                    self._status("Engine did not answer isready, switching to the standby")
+                    self._reset_engine("ping")
+                    await self._open()
+
+            standby = self.standby
+            if standby is not None and await self._ping(standby[1]) is False and standby is self.standby:
+                print("Standby engine did not answer isready, respawning")
+                self.health.record_failure("ping")
+                self.standby = None
+                standby[0].close()
+                self._ensure_standby()
+
+    async def _close(self) -> None:
+        """Cancel the analysis and quit the engine and standby processes."""
+        self._cancel()
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+        if self._standby_task is not None:
+            self._standby_task.cancel()
+        if self.standby is not None:
+            self.standby[0].close()
+            self.standby = None
+
+        if self.protocol is not None:
+            try:
+                await asyncio.wait_for(self.protocol.quit(), 1.0)
+            except Exception as e:
+                print(f"Error stopping engine gracefully: {e}")
+                self.transport.close()
+            finally:
+                self.protocol = None
+                self.transport = None
+
+    def _retry(self, board: chess.Board) -> None:
+        """
+        Search a position again after an engine failure, unless it failed too often.
+
+        Args:
+            board: The chess board position whose search failed
+        """
+        key = position_hash(board)
+        if key != self._failure_key:
+            self._failure_key = key
+            self._failures = 0
+        self._failures += 1
+
+        if self._failures >= self.max_failures:
+            self._status(f"Engine failed {self._failures} times in a row on this position, analysis stopped")
+            return
+
+        # Only the current task is retried; a newer position replaces it anyway
+        if self.task is asyncio.current_task():
+            delay = self.retry_delay * 2 ** (self._failures - 1)
+            self.task = self.loop.create_task(self._analyse(board, delay))
+
+    def _succeeded(self, board: chess.Board) -> None:
+        """Forget the failures of a position once one of its searches ended normally."""
+        if position_hash(board) == self._failure_key:
+            self._failure_key = None
+            self._failures = 0
+
+    async def _analyse(self, board: chess.Board, delay: float = 0.0) -> None:
+        """
+        Stream the analysis of a position to the update callback.
+
+        Args:
+            board: The chess board position
+            delay: Seconds to wait first, when retrying after a failure
+        """
+        # Detection can produce impossible positions, which the engine may crash on
+        if not board.is_valid():
+            self._status("Position is not valid, not analysing it")
+            return
+
+        if delay:
+            await asyncio.sleep(delay)
+
+            # The backoff is not part of the failover time
+            if self._failed_at is not None:
+                self._failed_at += delay
+
+        multipv = self.config.multipv
+        cache = self.config.cache
+        fingerprint = self.config.fingerprint()
+
+        # Tablebase positions are exact, so the engine is not woken for them
+        tablebase_results = self.config.tablebase_results(board)
+        if tablebase_results:
+            if board is not self.ponder_board:
+                self.on_update(board, tablebase_results)
+            return
+
+        # Book positions show the book moves; the engine only searches them in the background if asked to
+        book_results = self.config.book_results(board)
+        if book_results:
+            if board is not self.ponder_board:
+                self.on_update(board, book_results)
+            if not self.config.book_background:
+                return
+
+        # Show a cached analysis at once; the search only replaces it once it is deeper
+        cached_depth = 0
+        if cache is not None:
+            cached = cache.get(board, fingerprint)
+            if cached:
+                cached_depth = min(info["depth"] for info in cached)
+                self.on_update(board, [AnalysisLine.from_info(board, info) for info in cached])
+
+                # Already deep enough to ponder on the predicted reply without searching
+                if self._should_ponder(board, cached[0]) and self.task is asyncio.current_task():
+                    self._start_ponder(board, cached[0]["pv"][0])
+                    return
+
+        try:
+            await self._open()
+
+            # The search starts once the previous one has stopped, which a hung engine never does
+            analysis = await asyncio.wait_for(self.protocol.analysis(board, multipv=multipv), self.stall_timeout)
+        except asyncio.TimeoutError:
+            self._status("Engine stopped responding, switching to the standby...")
+            self._reset_engine("hang")
+            self._retry(board)
+            return
+        except (chess.engine.EngineTerminatedError, chess.engine.EngineError, OSError) as e:
+            self._status(f"Engine error: {e}")
+            self._reset_engine("crash")
+            self._retry(board)
+            return
+
+        lines = {}
+        flush = None
+        expected_lines = min(multipv, board.legal_moves.count())
+        stored_depth = cached_depth
+
+        # Budgeting: search start, and the score of the first line at each depth
+        budget = self.config.budget
+        started = self.loop.time()
+        depth_scores = {}
+
+        # The legal moves of the position do not change during the search
+        complexity = budget.position_complexity(board) if budget is not None else None
+
+        def emit():
+            nonlocal flush
+            if flush is not None:
+                flush.cancel()
+            flush = None
+
+            # Lines of a pondered position are only sent once the predicted reply is played,
+            # and the book moves stay on display while a book position is searched
+            if lines and board is not self.ponder_board and not book_results:
+                self.on_update(board, self._format(board, lines))
+
+        self._flush = emit
+
+        try:
+            while True:
+                # A search that sends nothing for too long is hung
+                try:
+                    info = await asyncio.wait_for(analysis.get(), self.stall_timeout)
+                except chess.engine.AnalysisComplete:
+                    break
+
+                # Only complete lines (with a score and a PV) are shown
+                if "score" not in info or "pv" not in info:
+                    continue
+                lines[info.get("multipv", 1)] = info
+
+                # Store each newly completed depth of all lines in the cache
+                if cache is not None and len(lines) >= expected_lines:
+                    complete_depth = min(line.get("depth", 0) for line in lines.values())
+                    if complete_depth > stored_depth:
+                        cache.put(board, fingerprint, [lines[index] for index in sorted(lines)])
+                        stored_depth = complete_depth
+
+                # Check whether the search has used the budget of the position
+                exhausted = False
+                if budget is not None and info.get("multipv", 1) == 1:
+                    depth = info.get("depth", 0)
+                    depth_scores[depth] = info["score"].white().score(mate_score=10000)
+                    swing = abs(depth_scores[depth] - depth_scores.get(depth - 1, depth_scores[depth]))
+                    exhausted = budget.exhausted(complexity, self.loop.time() - started, depth, self.config.depth, swing)
+
+                # Keep showing a deeper cached analysis until the search catches up
+                if info.get("depth", 0) < cached_depth:
+                    if exhausted:
+                        self._succeeded(board)
+                        return
+                    continue
+
+                # Once the opponent's position is searched deep enough, ponder on the predicted reply
+                if self._should_ponder(board, info) and self.task is asyncio.current_task():
+                    emit()
+                    self._succeeded(board)
+                    self._start_ponder(board, info["pv"][0])
+                    return
+
+                # Stop with the lines found so far once the budget is used
+                if exhausted:
+                    emit()
+                    self._succeeded(board)
+                    print(f"Search budget used at depth {depth} after {self.loop.time() - started:.1f} s")
+                    return
+
+                # Lines arriving together (e.g. all PVs of one depth) are sent as one update
+                if flush is None:
+                    flush = self.loop.call_later(self.min_interval, emit)
+
+            # The search ended by itself (e.g. a mate or a position without legal moves)
+            if flush is not None:
+                emit()
+            self._succeeded(board)
+
+        except (chess.engine.EngineTerminatedError, asyncio.TimeoutError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self._status("Engine stopped responding during analysis, switching to the standby...")
+                self._reset_engine("hang")
+            else:
+                self._status("Engine terminated unexpectedly during analysis, switching to the standby...")
+                self._reset_engine("crash")
+
+            # Continue with the same position on the standby or a fresh engine process
+            self._retry(board)
+
+        finally:
+            if flush is not None:
+                flush.cancel()
+            if self._flush is emit:
+                self._flush = None
+            analysis.stop()
+
+            # Wait for the search to end, which also retrieves the error a dead engine
+            # fails it with; a hung engine was closed above, which ends it
+            try:
+                await asyncio.wait_for(analysis.wait(), self.stall_timeout)
+            except (chess.engine.EngineError, asyncio.TimeoutError):
+                pass
+
+    def _reset_engine(self, reason: str = "crash") -> None:
+        """
+        Forget a failed engine process so the next analysis takes the standby or opens a new one.
+
+        Args:
+            reason: "crash", "hang" or "ping", for the failure metrics
+        """
+        self.health.record_failure(reason)
+        self._failed_at = self.loop.time()
+        if self.transport is not None:
+            try:
+                self.transport.close()
+            except Exception:
+                pass
+        self.transport = None
+        self.protocol = None
+
+    def _format(self, board: chess.Board, lines: Dict[int, Dict]) -> List[AnalysisLine]:
+        """Get the latest info of each principal variation as analysis lines."""
+        return [AnalysisLine.from_info(board, lines[index]) for index in sorted(lines)]
@@ -0,0 +1,272 @@
+"""
+Batch Analysis Module.
+
+This module provides offline analysis of FEN and PGN corpora on an engine pool,
+writing the results incrementally as JSON lines.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chess
+import chess.engine
+import chess.pgn
+
+from src.chess.engine import find_engine
+from src.chess.engine_pool import EnginePool
+
+
+def read_positions(paths: List[str]) -> Iterator[Tuple[str, chess.Board, Optional[int]]]:
+    """
+    Stream the positions of FEN and PGN files.
+
+    Files ending in .pgn yield every position of the main line of each game,
+    from the starting position to the final one. Other files are read as one
+    FEN per line; blank lines and lines starting with "#" are skipped.
+
+    Args:
+        paths: The input files
+
+    Yields:
+        Tuples (id, board, route), where the id names the source of the position
+        ("file:line" or "file:game:ply") and the route keeps the positions of one
+        game on the same pool engine (None for FENs)
+    """
+    for path in paths:
+        name = os.path.basename(path)
+
+        if path.lower().endswith(".pgn"):
+            with open(path) as pgn:
+                game_number = 0
+                while True:
+                    game = chess.pgn.read_game(pgn)
+                    if game is None:
+                        break
+                    game_number += 1
+
+                    board = game.board()
+                    route = hash((path, game_number))
+                    yield f"{name}:{game_number}:0", board.copy(), route
+                    for ply, move in enumerate(game.mainline_moves(), 1):
+                        board.push(move)
+                        yield f"{name}:{game_number}:{ply}", board.copy(stack=False), route
+        else:
+            with open(path) as f:
+                for line_number, line in enumerate(f, 1):
+                    fen = line.strip()
+                    if not fen or fen.startswith("#"):
+                        continue
+                    try:
+                        board = chess.Board(fen)
+                    except ValueError as e:
+                        print(f"Skipping invalid FEN at {name}:{line_number}: {e}")
+                        continue
+                    yield f"{name}:{line_number}", board, None
+
+
+def _encode_result(index: int, position_id: str, board: chess.Board, lines: List[Dict]) -> Dict:
+    """Encode the result of a position, with white-relative scores and UCI moves."""
+    encoded = []
+    for info in lines:
+        score = info["score"].white() if "score" in info else None
+        encoded.append({
+            "multipv": info.get("multipv", 1),
+            "depth": info.get("depth", 0),
+            "nodes": info.get("nodes"),
+            "mate": score.mate() if score is not None else None,
+            "cp": score.score() if score is not None else None,
+            "pv": [move.uci() for move in info.get("pv", [])]
+        })
+    return {"index": index, "id": position_id, "fen": board.fen(), "lines": encoded}
+
+
+class BatchAnalyzer:
+    """
+    Analyses a stream of positions on an engine pool and writes JSON lines.
+
+    At most `window` positions are in flight at once, so memory stays bounded
+    however large the corpus is. Results are written in input order, and every
+    `checkpoint_interval` positions the number of positions written and the
+    size of the output file are saved next to the output. An interrupted run
+    started again with the same inputs truncates the output to the last
+    checkpoint and skips the positions already written.
+    """
+
+    def __init__(self, pool: EnginePool, limit: chess.engine.Limit, multipv: int = 1,
+                 window: Optional[int] = None, checkpoint_interval: int = 100,
+                 shard: int = 0, shards: int = 1, report_interval: float = 10.0):
+        """
+        Initialize the batch analyzer.
+
+        Args:
+            pool: The engine pool to analyse on
+            limit: The search limit of each position
+            multipv: Number of principal variations
+            window: Maximum number of positions in flight, or None for four per engine
+            checkpoint_interval: Number of positions between checkpoints
+            shard: Index of the shard to analyse, from 0 to shards - 1
+            shards: Number of shards the corpus is split into; position i belongs
+                to shard i % shards
+            report_interval: Seconds between progress reports
+        """
+        self.pool = pool
+        self.limit = limit
+        self.multipv = multipv
+        self.window = window if window is not None else 4 * pool.size
+        self.checkpoint_interval = checkpoint_interval
+        self.shard = shard
+        self.shards = shards
+        self.report_interval = report_interval
+
+        # Statistics of the last run
+        self.analysed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    @staticmethod
+    def checkpoint_path(output_path: str) -> str:
+        """Get the checkpoint file of an output file."""
+        return output_path + ".checkpoint"
+
+    def _load_checkpoint(self, output_path: str) -> Tuple[int, int]:
+        """
+        Load the checkpoint of an output file.
+
+        Returns:
+            A tuple (next index, output size in bytes), (0, 0) without a checkpoint
+        """
+        path = self.checkpoint_path(output_path)
+        if not os.path.exists(path) or not os.path.exists(output_path):
+            return 0, 0
+
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("shard") != [self.shard, self.shards]:
+            raise ValueError(f"Checkpoint {path} belongs to another shard")
+        return checkpoint["next_index"], checkpoint["output_size"]
+
+    def _save_checkpoint(self, output_path: str, output, next_index: int) -> None:
+        """Flush the output and atomically save the checkpoint."""
+        output.flush()
+        os.fsync(output.fileno())
+
+        path = self.checkpoint_path(output_path)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"next_index": next_index, "output_size": output.tell(),
+                       "shard": [self.shard, self.shards]}, f)
+        os.replace(path + ".tmp", path)
+
+    def run(self, positions: Iterator[Tuple[str, chess.Board, Optional[int]]], output_path: str) -> int:
+        """
+        Analyse positions and append the results to a JSON lines file.
+
+        Args:
+            positions: Tuples (id, board, route), e.g. from read_positions
+            output_path: The output file
+
+        Returns:
+            The number of positions written in this run
+        """
+        next_index, output_size = self._load_checkpoint(output_path)
+        if next_index:
+            print(f"Resuming after {next_index} positions")
+
+        self.analysed = 0
+        self.failed = 0
+        started = time.perf_counter()
+        last_report = started
+        in_flight = deque()  # (index, id, board, future) in input order
+
+        mode = "r+" if output_size else "w"
+        with open(output_path, mode) as output:
+            # Drop anything written after the last checkpoint
+            output.truncate(output_size)
+            output.seek(output_size)
+
+            def write_next():
+                index, position_id, board, future = in_flight.popleft()
+                try:
+                    record = _encode_result(index, position_id, board, future.result())
+                except Exception as e:
+                    record = {"index": index, "id": position_id, "fen": board.fen(), "error": str(e)}
+                    self.failed += 1
+                output.write(json.dumps(record) + "\n")
+                self.analysed += 1
+
+                if self.analysed % self.checkpoint_interval == 0:
+                    self._save_checkpoint(output_path, output, index + 1)
+
+            for index, (position_id, board, route) in enumerate(positions):
+                if index < next_index or index % self.shards != self.shard:
+                    continue
+
+                # Wait for the oldest position before exceeding the window
+                while len(in_flight) >= self.window:
+                    write_next()
+
+                future = self.pool.submit(board, self.limit, multipv=self.multipv, route=route)
+                in_flight.append((index, position_id, board, future))
+
+                now = time.perf_counter()
+                if now - last_report >= self.report_interval:
+                    self._report(now - started)
+                    last_report = now
+
+            while in_flight:
+                write_next()
+            self._save_checkpoint(output_path, output, index + 1 if self.analysed else next_index)
+
+        self.elapsed = time.perf_counter() - started
+        self._report(self.elapsed)
+        return self.analysed
+
+    def _report(self, elapsed: float) -> None:
+        """Print the progress of the run."""
+        rate = self.analysed / elapsed if elapsed > 0 else 0.0
+        print(f"Analysed {self.analysed} positions in {elapsed:.1f} s "
+              f"({rate:.1f} positions/s, {self.failed} failed)")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the batch analysis command line."""
+    parser = argparse.ArgumentParser(description="Analyse FEN and PGN files with a pool of engines.")
+    parser.add_argument("inputs", nargs="+", help="FEN files (one FEN per line) or PGN files")
+    parser.add_argument("-o", "--output", required=True, help="Output JSON lines file")
+    parser.add_argument("--time", type=float, help="Search time per position in seconds")
+    parser.add_argument("--depth", type=int, help="Search depth per position")
+    parser.add_argument("--nodes", type=int, help="Search nodes per position")
+    parser.add_argument("--multipv", type=int, default=1, help="Number of principal variations")
+    parser.add_argument("--engines", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Number of engine processes")
+    parser.add_argument("--threads", type=int, default=1, help="Threads per engine process")
+    parser.add_argument("--hash", type=int, default=64, help="Hash size per engine process in MB")
+    parser.add_argument("--window", type=int, help="Maximum number of positions in flight")
+    parser.add_argument("--checkpoint-interval", type=int, default=100, help="Positions between checkpoints")
+    parser.add_argument("--engine-config", help="Engine configuration file, by default data/config/engine.json")
+    parser.add_argument("--shard", default="0/1", help="Shard to analyse as INDEX/COUNT, e.g. 2/8")
+    args = parser.parse_args(argv)
+
+    if args.time is None and args.depth is None and args.nodes is None:
+        args.depth = 15
+    limit = chess.engine.Limit(time=args.time, depth=args.depth, nodes=args.nodes)
+
+    shard, shards = (int(part) for part in args.shard.split("/"))
+    if not 0 <= shard < shards:
+        parser.error("--shard must be INDEX/COUNT with 0 <= INDEX < COUNT")
+
+    pool = EnginePool(size=args.engines, threads=args.threads, hash_size=args.hash,
+                      engine_path=find_engine(args.engine_config))
+    analyzer = BatchAnalyzer(pool, limit, multipv=args.multipv, window=args.window,
+                             checkpoint_interval=args.checkpoint_interval, shard=shard, shards=shards)
+    try:
+        analyzer.run(read_positions(args.inputs), args.output)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume from the last checkpoint")
+        sys.exit(1)
+    finally:
+        pool.stop()
@@ -0,0 +1,177 @@
+"""
+Search Budget Module.
+
+This module provides the policy deciding how much engine time each position gets,
+based on how long it has been on the board and how complex it is.
+"""
+
+import os
+from typing import Optional
+
+import chess
+import chess.engine
+
+
+# Complexity of a position with at most one legal move
+ONLY_MOVE_COMPLEXITY = 0.25
+
+
+class SearchBudget:
+    """
+    A per-position search time budget.
+
+    A new position gets `base_time` of search, and every second it stays on
+    the board adds `growth` seconds, up to `max_time`. The budget is scaled
+    by the complexity of the position: forced positions (in check, few legal
+    moves) get less time, and positions with many captures and checks or an
+    evaluation that swings between depths get more. The engine is given only
+    `cpu_share` of the CPU cores, so detection always keeps the rest.
+    """
+
+    def __init__(self, base_time: float = 0.1, growth: float = 0.5, max_time: float = 20.0,
+                 max_depth: int = 40, cpu_share: float = 0.5, cpu_count: Optional[int] = None):
+        """
+        Initialize the search budget.
+
+        Args:
+            base_time: Search time in seconds of a position that was just shown
+            growth: Seconds of search added for each second the position stays unchanged
+            max_time: Maximum search time in seconds of an average position
+            max_depth: Depth at which a search always stops
+            cpu_share: Fraction of the CPU cores the engine may use
+            cpu_count: Number of CPU cores, or None to detect it
+        """
+        self.base_time = base_time
+        self.growth = growth
+        self.max_time = max_time
+        self.max_depth = max_depth
+        self.cpu_share = cpu_share
+        self.cpu_count = cpu_count if cpu_count is not None else (os.cpu_count() or 1)
+
+    def threads(self) -> int:
+        """
+        Get the number of engine threads allowed by the CPU share.
+
+        Returns:
+            The number of threads, at least 1
+        """
+        return max(1, int(self.cpu_count * self.cpu_share))
+
+    @staticmethod
+    def complexity(board: chess.Board, swing: int = 0) -> float:
+        """
+        Estimate the complexity of a position.
+
+        Args:
+            board: The chess board position
+            swing: Change in centipawns of the evaluation between the last two
+                searches (or depths) of the position
+
+        Returns:
+            A factor between 0.25 and 3.0 scaling the search time, 1.0 for an
+            average position
+        """
+        return SearchBudget.with_swing(SearchBudget.position_complexity(board), swing)
+
+    @staticmethod
+    def position_complexity(board: chess.Board) -> float:
+        """
+        Estimate the complexity of a position from its legal moves alone.
+
+        This walks all legal moves, so a search computes it once and scales it
+        with with_swing as its evaluation changes.
+
+        Args:
+            board: The chess board position
+
+        Returns:
+            The complexity factor without the evaluation swing
+        """
+        moves = list(board.legal_moves)
+        if len(moves) <= 1:
+            return ONLY_MOVE_COMPLEXITY
+
+        # Forced positions need little time
+        if board.is_check() or len(moves) <= 4:
+            factor = 0.5
+        else:
+            factor = 1.0
+
+        # Tactical positions, with many captures and checks available, need more
+        forcing = sum(1 for move in moves if board.is_capture(move) or board.gives_check(move))
+        return factor * (1.0 + min(forcing, 10) / 20.0)
+
+    @staticmethod
+    def with_swing(complexity: float, swing: int = 0) -> float:
+        """
+        Scale a position complexity by the change of its evaluation.
+
+        Args:
+            complexity: The factor returned by position_complexity
+            swing: Change in centipawns of the evaluation between the last two
+                searches (or depths) of the position
+
+        Returns:
+            A factor between 0.25 and 3.0 scaling the search time
+        """
+        # A position without a choice needs no more time however the evaluation moves
+        if complexity == ONLY_MOVE_COMPLEXITY:
+            return complexity
+
+        # An evaluation that is still changing needs more, up to double for a pawn or more
+        return min(complexity * (1.0 + min(abs(swing), 100) / 100.0), 3.0)
+
+    def time_budget(self, board: chess.Board, stable_for: float = 0.0, swing: int = 0) -> float:
+        """
+        Get the search time of a position.
+
+        Args:
+            board: The chess board position
+            stable_for: Seconds the position has been on the board unchanged
+            swing: Change in centipawns of the evaluation between the last two searches
+
+        Returns:
+            The search time in seconds
+        """
+        complexity = self.complexity(board, swing)
+        return min(self.base_time + self.growth * stable_for, self.max_time) * complexity
+
+    def limit(self, board: chess.Board, stable_for: float = 0.0, swing: int = 0) -> chess.engine.Limit:
+        """
+        Get the search limit of a position.
+
+        Args:
+            board: The chess board position
+            stable_for: Seconds the position has been on the board unchanged
+            swing: Change in centipawns of the evaluation between the last two searches
+
+        Returns:
+            A limit with the time budget and the maximum depth
+        """
+        return chess.engine.Limit(time=self.time_budget(board, stable_for, swing), depth=self.max_depth)
+
+    def exhausted(self, complexity: float, elapsed: float, depth: int, min_depth: int = 1,
+                  swing: int = 0) -> bool:
+        """
+        Check if a streaming search of a position has used its budget.
+
+        A streaming search starts when the position is shown, so its elapsed
+        time is also the time the position has been unchanged; it runs until
+        the budget of a position that has been stable for long is spent.
+
+        Args:
+            complexity: The position_complexity of the searched position, computed
+                once per search
+            elapsed: Seconds since the search started
+            depth: Depth reached by the search
+            min_depth: Depth the search always reaches before it is stopped
+            swing: Change in centipawns of the evaluation between the last two depths
+
+        Returns:
+            True if the search should stop
+        """
+        if depth >= self.max_depth:
+            return True
+        if depth < min_depth:
+            return False
+        return elapsed >= self.max_time * self.with_swing(complexity, swing)
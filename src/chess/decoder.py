@@ -0,0 +1,164 @@
+"""
+Game Decoder Module.
+
+This module provides functionality for reconstructing missed moves by decoding the
+most likely sequence of legal moves behind a noisy detected placement.
+"""
+
+import math
+
+import numpy as np
+
+from src.chess.position import EMPTY, piece_code, placement_key, square_key, touched_squares
+
+
+class GameDecoder:
+    """
+    A beam search decoder over legal move sequences.
+
+    The detected placement is treated as a noisy observation of the hidden
+    game position: each square's detected class is correct with the
+    probability given by its detection confidence, and a piece goes undetected
+    with probability miss_rate. Starting from the last known game position,
+    the decoder expands legal moves ply by ply, keeping the beam_width most
+    likely hypotheses, and returns the move sequence whose resulting position
+    best explains the observation. The work per decode is bounded by
+    max_plies * beam_width * (legal moves per position).
+    """
+
+    def __init__(self, max_plies=3, beam_width=32, miss_rate=0.02, ply_penalty=2.0, tolerance=4.0):
+        """
+        Initialize the game decoder.
+
+        Args:
+            max_plies: Maximum number of moves to reconstruct
+            beam_width: Number of hypotheses kept at each ply
+            miss_rate: Probability that a piece on a square is not detected
+            ply_penalty: Log-probability penalty for each additional missed move
+            tolerance: Maximum log-likelihood gap between the decoded position
+                and a perfect match of the observation
+        """
+        self.max_plies = max_plies
+        self.beam_width = beam_width
+        self.miss_rate = miss_rate
+        self.ply_penalty = ply_penalty
+        self.tolerance = tolerance
+
+    def observation_log_likelihood(self, placement, confidences=None):
+        """
+        Build the per-square log-likelihood table of an observation.
+
+        Args:
+            placement: The detected array of 64 piece codes indexed by chess square
+            confidences: The detection confidence of each square, or None to
+                assume a fixed confidence
+
+        Returns:
+            A (64, 13) array where entry [square, code + 1] is the log-likelihood
+            of the observation on that square if the square held that code
+            (column 0 is the empty square)
+        """
+        placement = np.asarray(placement, dtype=np.intp)
+        if confidences is None:
+            confidences = np.where(placement >= 0, 0.9, 0.0)
+        confidences = np.clip(np.asarray(confidences, dtype=np.float64), 0.05, 0.99)
+
+        table = np.empty((64, 13))
+        detected = placement >= 0
+
+        # A square observed empty: it is empty, or its piece was missed
+        table[~detected, 0] = math.log(1.0 - self.miss_rate)
+        table[~detected, 1:] = math.log(self.miss_rate)
+
+        # A square observed with a piece: that piece with its confidence, anything else otherwise
+        wrong = np.log((1.0 - confidences[detected]) / 12.0)
+        table[detected, :] = wrong[:, None]
+        table[np.flatnonzero(detected), placement[detected] + 1] = np.log(confidences[detected])
+
+        return table
+
+    def decode(self, board, placement, observed, confidences=None):
+        """
+        Decode the most likely sequence of legal moves behind an observation.
+
+        Args:
+            board: The chess.Board of the last known game position
+            placement: The array of 64 piece codes of the last known game position
+            observed: The detected array of 64 piece codes indexed by chess square
+            confidences: The detection confidence of each observed square
+
+        Returns:
+            A list of chess.Move objects leading from the board to the most
+            likely position, or None if no sequence within max_plies explains
+            the observation
+        """
+        table = self.observation_log_likelihood(observed, confidences)
+        perfect = float(table.max(axis=1).sum())
+
+        codes = np.asarray(placement, dtype=np.intp)
+        start_score = float(table[np.arange(64), codes + 1].sum())
+
+        # Each hypothesis is (total score, observation score, prior, moves, placement, key)
+        beam = [(start_score, start_score, 0.0, [], codes, placement_key(codes))]
+        best = None
+        board = board.copy()
+        root_stack = len(board.move_stack)
+
+        for ply in range(self.max_plies):
+            candidates = {}
+
+            for _, obs_score, prior, moves, codes, key in beam:
+                # Replay the hypothesis on the scratch board
+                for move in moves:
+                    board.push(move)
+
+                # Uniform prior over the legal moves, with a penalty for each missed move
+                legal_moves = list(board.legal_moves)
+                if legal_moves:
+                    child_prior = prior - math.log(len(legal_moves)) - (self.ply_penalty if ply else 0.0)
+
+                for move in legal_moves:
+                    touched = touched_squares(board, move)
+                    board.push(move)
+
+                    # Update the observation score and the key incrementally on the touched squares
+                    score = obs_score
+                    child_key = key
+                    changes = []
+                    for square in touched:
+                        piece = board.piece_at(square)
+                        code = piece_code(piece) if piece else EMPTY
+                        old_code = codes[square]
+                        score += table[square, code + 1] - table[square, old_code + 1]
+                        child_key ^= square_key(old_code, square) ^ square_key(code, square)
+                        changes.append((square, code))
+                    board.pop()
+
+                    # Transpositions are merged (all hypotheses of a ply have the same side
+                    # to move), keeping the more likely path
+                    total = score + child_prior
+                    if child_key not in candidates or candidates[child_key][0] < total:
+                        candidates[child_key] = (total, score, child_prior, moves + [move], codes, changes)
+
+                while len(board.move_stack) > root_stack:
+                    board.pop()
+
+            if not candidates:
+                break
+
+            # Keep the most likely hypotheses, building their placements only now
+            beam = []
+            ranked = sorted(candidates.items(), key=lambda item: item[1][0], reverse=True)
+            for child_key, (total, score, child_prior, moves, codes, changes) in ranked[:self.beam_width]:
+                child = codes.copy()
+                for square, code in changes:
+                    child[square] = code
+                beam.append((total, score, child_prior, moves, child, child_key))
+
+            for total, obs_score, _, moves, _, _ in beam:
+                if perfect - obs_score <= self.tolerance and (best is None or total > best[0]):
+                    best = (total, moves)
+
+        if best is None:
+            return None
+        return best[1]
@@ -4,11 +4,102 @@ Chess Engine Module.
 This module provides an interface to the Stockfish chess engine.
 """
 
+import json
 import os
+import sys
+import threading
+import time
 import chess
 import chess.engine
+import chess.polyglot
 from typing import List, Dict, Optional, Tuple, Union
 
+from src.chess.analysis import AnalysisLine, BOOK, TABLEBASE
+from src.chess.engine_server import SOCKET_PATH, EngineClient
+from src.chess.tuning import engine_identity, load_tuning
+from src.chess.watchdog import EngineSupervisor
+
+
+# Engine selection file, e.g. {"engine": "mock", "script": "data/config/mock_engine.json"}
+ENGINE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "config", "engine.json")
+
+
+def find_engine(config_path: Optional[str] = None) -> Union[str, List[str]]:
+    """
+    Find the engine executable.
+
+    If the engine configuration file exists, its "engine" entry selects the
+    engine: "stockfish" for the default search below, "mock" for the scripted
+    mock engine (with an optional "script" file), or the path of any other UCI
+    engine. Otherwise Stockfish is looked up in the stockfish directory.
+
+    Args:
+        config_path: Path to the engine configuration file, or None for the default
+
+    Returns:
+        The path to the engine executable, or the command line of the mock engine
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+    config_path = config_path if config_path is not None else ENGINE_CONFIG
+    if os.path.exists(config_path):
+        with open(config_path) as f:
+            config = json.load(f)
+
+        engine = config.get("engine", "stockfish")
+        if engine == "mock":
+            # Run the mock engine with this interpreter
+            command = [sys.executable, os.path.join(os.path.dirname(__file__), "mock_engine.py")]
+            if config.get("script"):
+                command += ["--script", os.path.join(root, config["script"])]
+            return command
+        if engine != "stockfish":
+            return os.path.join(root, engine)
+
+    # Look in the stockfish directory
+    stockfish_dir = os.path.join(root, "stockfish")
+
+    # Check for Windows executable
+    stockfish_exe = os.path.join(stockfish_dir, "stockfish.exe")
+    if os.path.exists(stockfish_exe):
+        return stockfish_exe
+
+    # Check for Linux/Mac executable
+    stockfish_bin = os.path.join(stockfish_dir, "stockfish")
+    if os.path.exists(stockfish_bin):
+        return stockfish_bin
+
+    # If not found, raise an error
+    raise FileNotFoundError(
+        f"Stockfish executable not found in {stockfish_dir}. "
+        "Please download Stockfish from https://stockfishchess.org/download/ "
+        "and place the executable in the 'stockfish' directory."
+    )
+
+
+def find_server(config_path: Optional[str] = None) -> Optional[str]:
+    """
+    Find the socket of the shared engine daemon to analyze on.
+
+    The "server" entry of the engine configuration file enables the daemon:
+    true for the default socket, or the path of another socket.
+
+    Args:
+        config_path: Path to the engine configuration file, or None for the default
+
+    Returns:
+        The socket path, or None if the daemon is not enabled
+    """
+    config_path = config_path if config_path is not None else ENGINE_CONFIG
+    if not os.path.exists(config_path):
+        return None
+
+    with open(config_path) as f:
+        server = json.load(f).get("server")
+    if server is True:
+        return SOCKET_PATH
+    return server or None
+
 
 class StockfishEngine:
     """
@@ -18,7 +109,9 @@ class StockfishEngine:
     and manage the Stockfish process.
     """
 
-    def __init__(self, depth: int = 15, threads: int = 1, hash_size: int = 128):
+    def __init__(self, depth: int = 15, threads: int = 1, hash_size: int = 128, cache=None, book=None, tablebase=None,
+                 engine_config: Optional[str] = None, budget=None, supervised: bool = False, tuned: bool = False,
+                 server: Optional[str] = None, max_failures: int = 3, retry_delay: float = 0.5):
         """
         Initialize the Stockfish engine.
 
@@ -26,45 +119,141 @@ class StockfishEngine:
             depth: The search depth for analysis
             threads: Number of CPU threads to use
             hash_size: Hash table size in MB
+            cache: An AnalysisCache for results of previously analyzed positions, or None
+            book: An OpeningBook whose positions are answered without searching, or None
+            tablebase: A Tablebase whose positions are answered without searching, or None
+            engine_config: Path to an engine configuration file selecting the engine,
+                or None for data/config/engine.json
+            budget: A SearchBudget deciding the search time of each position, or None
+                for a fixed 0.1 second search
+            supervised: Whether to health-check the engine and keep a standby
+                process to fail over to
+            tuned: Whether start() replaces threads and hash_size with the saved
+                tuning of this engine and machine (see tune_engine.py), if any
+            server: Socket path of a shared engine daemon (see engine_daemon.py) to
+                analyze on, or None; without a running daemon the engine starts its
+                own process, and only then has to be found
+            max_failures: Number of consecutive engine failures on one position after
+                which the position is not searched again
+            retry_delay: Seconds to wait before replacing the engine after the second
+                consecutive failure, doubled after each further one
         """
+        self.engine_config = engine_config
         self.depth = depth
         self.threads = threads
         self.hash_size = hash_size
+        self.tuned = tuned
+        self.server = server
         self.engine = None
-        self.engine_path = self._find_engine()
+        self._engine_path = None  # Found on first use, as the daemon needs no local engine
+        self._identity = None
+        self.lock = threading.Lock()  # Held while a command runs on the engine
+        self.supervisor = EngineSupervisor(self) if supervised else None
+        self.cache = cache
+        self.book = book
+        self.book_background = False  # Whether to keep searching book positions in the background
+        self.tablebase = tablebase
+
+        # Search budgeting: the position last analyzed, since when it has been
+        # analyzed, its last score in centipawns and the change of that score
+        self.budget = budget
+        self._budget_key = None
+        self._budget_since = 0.0
+        self._budget_score = None
+        self._budget_swing = 0
+
+        # Consecutive engine failures: a position that keeps crashing the engine
+        # is given up on instead of replacing the engine again and again
+        self.max_failures = max_failures
+        self.retry_delay = retry_delay
+        self._failure_key = None
+        self._failures = 0
 
         # Analysis options
         self.multipv = 1  # Number of principal variations (lines) to calculate
-        self.show_score = True  # Whether to show the evaluation score
-        self.show_mate = True  # Whether to show mate announcements
-        self.show_wdl = False  # Whether to show win/draw/loss statistics
 
-    def _find_engine(self) -> str:
+    def _find_engine(self) -> Union[str, List[str]]:
         """
-        Find the Stockfish executable.
+        Find the engine executable.
 
         Returns:
-            The path to the Stockfish executable
-        """
-        # Look in the stockfish directory
-        stockfish_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "stockfish")
-
-        # Check for Windows executable
-        stockfish_exe = os.path.join(stockfish_dir, "stockfish.exe")
-        if os.path.exists(stockfish_exe):
-            return stockfish_exe
-
-        # Check for Linux/Mac executable
-        stockfish_bin = os.path.join(stockfish_dir, "stockfish")
-        if os.path.exists(stockfish_bin):
-            return stockfish_bin
-
-        # If not found, raise an error
-        raise FileNotFoundError(
-            f"Stockfish executable not found in {stockfish_dir}. "
-            "Please download Stockfish from https://stockfishchess.org/download/ "
-            "and place the executable in the 'stockfish' directory."
-        )
+            The path to the engine executable, or the command line of the mock engine
+        """
+        return find_engine(self.engine_config)
+
+    @property
+    def engine_path(self) -> Union[str, List[str]]:
+        """
+        The engine executable, or the command line of the mock engine.
+
+        Raises:
+            FileNotFoundError: If there is no engine
+        """
+        if self._engine_path is None:
+            self._engine_path = self._find_engine()
+        return self._engine_path
+
+    def fingerprint(self) -> str:
+        """
+        Get the fingerprint of the engine configuration for the analysis cache.
+
+        The fingerprint identifies the engine binary (by name, size and
+        modification time) and the number of lines. Threads and hash size only
+        change how fast a depth is reached, so they are not part of it. An
+        engine that only exists behind the daemon is identified by its socket.
+
+        Returns:
+            The fingerprint string
+        """
+        if self._identity is None:
+            try:
+                self._identity = engine_identity(self.engine_path)
+            except FileNotFoundError:
+                if self.server is None:
+                    raise
+                self._identity = f"daemon:{self.server}"
+        return f"{self._identity}|multipv={self.multipv}"
+
+    def engine_options(self) -> Dict:
+        """
+        Get the UCI options to configure the engine process with.
+
+        Returns:
+            A dictionary of UCI option values
+        """
+        options = {
+            "Threads": self.threads,
+            "Hash": self.hash_size
+        }
+
+        # Let the engine use the same tablebases during its search
+        if self.tablebase is not None and self.tablebase.is_open():
+            options["SyzygyPath"] = self.tablebase.path
+
+        return options
+
+    def apply_tuning(self, path: Optional[str] = None) -> bool:
+        """
+        Use the saved Threads and Hash tuning of this engine and machine.
+
+        Args:
+            path: Path to the tuning file, or None for data/config/engine_tuning.json
+
+        Returns:
+            True if a tuning was applied, False if there is none
+        """
+        try:
+            tuning = load_tuning(self.engine_path, path)
+        except FileNotFoundError:
+            # Only the daemon has an engine, and it has its own options
+            return False
+        if tuning is None:
+            return False
+
+        print(f"Using engine tuning: Threads {tuning['threads']}, Hash {tuning['hash']} MB")
+        self.set_threads(tuning["threads"])
+        self.set_hash_size(tuning["hash"])
+        return True
 
     def start(self) -> bool:
         """
@@ -73,15 +262,30 @@ class StockfishEngine:
         Returns:
             True if the engine started successfully, False otherwise
         """
+        if self.tuned and self.engine is None:
+            self.apply_tuning()
+
+        # The daemon owns its engine processes, so there is nothing to supervise
+        if self.engine is None and self.server is not None:
+            try:
+                self.engine = EngineClient(self.server)
+                return True
+            except OSError as e:
+                print(f"Engine daemon not available ({e}), starting an own engine process")
+
         try:
-            if self.engine is None:
+            if self.engine is None and self.supervisor is not None:
+                # Supervised engines are opened with a short command timeout
+                self.engine = self.supervisor.open_engine()
+            elif self.engine is None:
                 self.engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
 
                 # Configure the engine
-                self.engine.configure({
-                    "Threads": self.threads,
-                    "Hash": self.hash_size
-                })
+                self.engine.configure(self.engine_options())
+
+            # Start the watchdog and the standby process
+            if self.supervisor is not None:
+                self.supervisor.start()
             return True
         except Exception as e:
             print(f"Error starting Stockfish: {e}")
@@ -94,6 +298,9 @@ class StockfishEngine:
         This method ensures the engine process is properly terminated
         and resources are cleaned up.
         """
+        if self.supervisor is not None:
+            self.supervisor.stop()
+
         if self.engine is not None:
             try:
                 # Try to quit gracefully
@@ -128,131 +335,266 @@ class StockfishEngine:
         if not self.is_running():
             self.start()
 
-    def analyze(self, board: chess.Board, limit_time: float = 0.1) -> List[Dict]:
+    def search_limit(self, board: chess.Board, limit_time: Optional[float] = None) -> chess.engine.Limit:
         """
-        Analyze the current position.
+        Get the search limit of a position.
+
+        With a budget and no explicit time, the search time grows the longer the
+        same position keeps being analyzed and with its complexity, including
+        how much its score changed since the previous search.
 
         Args:
             board: The chess board position
-            limit_time: Time limit for analysis in seconds
+            limit_time: Time limit in seconds, or None to use the budget
+
+        Returns:
+            The search limit
+        """
+        if limit_time is not None or self.budget is None:
+            return chess.engine.Limit(time=limit_time if limit_time is not None else 0.1, depth=self.depth)
+
+        key = chess.polyglot.zobrist_hash(board)
+        now = time.monotonic()
+        if key != self._budget_key:
+            self._budget_key = key
+            self._budget_since = now
+            self._budget_score = None
+            self._budget_swing = 0
+
+        return self.budget.limit(board, now - self._budget_since, self._budget_swing)
+
+    def _record_score(self, board: chess.Board, info: Dict) -> None:
+        """Remember the score of a budgeted search, to measure how much it changes between searches."""
+        if self.budget is None or "score" not in info:
+            return
+        if chess.polyglot.zobrist_hash(board) != self._budget_key:
+            return
+
+        score = info["score"].white().score(mate_score=10000)
+        if self._budget_score is not None:
+            self._budget_swing = abs(score - self._budget_score)
+        self._budget_score = score
+
+    def analyze(self, board: chess.Board, limit_time: Optional[float] = None) -> List[AnalysisLine]:
+        """
+        Analyze the current position.
+
+        Args:
+            board: The chess board position, which is not modified
+            limit_time: Time limit for analysis in seconds, or None to use the
+                search budget (0.1 seconds without one)
 
         Returns:
-            A list of analysis results, one for each principal variation
+            A list of analysis lines, one for each principal variation
         """
+        # Detection can produce impossible positions, which the engine may crash on
+        if not board.is_valid():
+            return [AnalysisLine.error("Invalid position")]
+
+        # Answer book and tablebase positions without searching
+        known_results = self.book_results(board) or self.tablebase_results(board)
+        if known_results:
+            return known_results
+
+        # Answer from the cache if the position was already analyzed deep enough; with
+        # a budget, a position analyzed again gets a longer search instead
+        repeated = self.budget is not None and chess.polyglot.zobrist_hash(board) == self._budget_key
+        if self.cache is not None and not repeated:
+            cached = self.cache.get(board, self.fingerprint(), self.depth)
+            if cached is not None:
+                return [AnalysisLine.from_info(board, info) for info in cached]
+
+        # Do not crash the engine again on a position it keeps failing on
+        if chess.polyglot.zobrist_hash(board) == self._failure_key and self._failures >= self.max_failures:
+            return [AnalysisLine.error(f"Engine failed {self._failures} times on this position")]
+
         # Check if engine is running, if not try to start it
         if not self.is_running():
             if not self.start():
                 # If we can't start the engine, return an empty result
                 print("Could not start engine for analysis")
-                return [{"score": "Engine error", "pv": "", "moves": []}]
+                return [AnalysisLine.error("Engine error")]
 
-        try:
-            # Create the limit object
-            limit = chess.engine.Limit(time=limit_time, depth=self.depth)
-
-            # Analyze the position
-            result = self.engine.analyse(
-                board,
-                limit,
-                multipv=self.multipv
-            )
-
-            # If result is not a list (single PV), convert it to a list
-            if not isinstance(result, list):
-                result = [result]
-
-            # Process the results
-            analysis_results = []
-            for i, info in enumerate(result):
-                analysis = {}
-
-                # Get the score
-                if "score" in info:
-                    score = info["score"]
-                    if self.show_score:
-                        try:
-                            # Convert the score to a string representation
-                            if score.is_mate():
-                                # Handle mate scores safely
-                                mate_score = score.white().mate()
-                                if mate_score is not None:
-                                    analysis["score"] = f"Mate in {mate_score}"
-                                else:
-                                    # Fallback if mate() returns None
-                                    analysis["score"] = "Mate"
-                            else:
-                                # Convert centipawns to pawns
-                                cp_score = score.white().score(mate_score=10000) / 100.0
-                                analysis["score"] = f"{cp_score:+.2f}"
-                        except AttributeError:
-                            # Handle the case where score doesn't have expected methods
-                            try:
-                                # Try a more generic approach
-                                cp_score = score.white().score(mate_score=10000) / 100.0
-                                analysis["score"] = f"{cp_score:+.2f}"
-                            except Exception:
-                                # Last resort fallback
-                                analysis["score"] = "?"
-
-                    # Add raw score for sorting/comparison
-                    try:
-                        analysis["raw_score"] = score.white().score(mate_score=10000)
-                    except Exception:
-                        # Use a default value if we can't get the raw score
-                        analysis["raw_score"] = 0
-
-                # Get the principal variation (PV)
-                if "pv" in info:
-                    pv = info["pv"]
-                    analysis["moves"] = []
-
-                    # Convert the moves to SAN notation
-                    temp_board = board.copy()
-                    for move in pv:
-                        san = temp_board.san(move)
-                        analysis["moves"].append(san)
-                        temp_board.push(move)
-
-                    # Create a string representation of the PV
-                    analysis["pv"] = " ".join(analysis["moves"])
-
-                # Get the depth
-                if "depth" in info:
-                    analysis["depth"] = info["depth"]
-
-                analysis_results.append(analysis)
-
-            return analysis_results
-
-        except chess.engine.EngineTerminatedError:
-            print("Engine terminated unexpectedly during analysis")
-            # Try to restart the engine
-            self.stop()
-            self.engine = None
-            if self.start():
-                print("Engine restarted successfully")
-            return [{"score": "Engine restarting...", "pv": "", "moves": []}]
-
-        except chess.engine.EngineError as e:
-            print(f"Engine error during analysis: {e}")
-            # Try to restart the engine
-            self.stop()
-            self.engine = None
-            if self.start():
-                print("Engine restarted successfully")
-            return [{"score": "Engine error", "pv": "", "moves": []}]
+        # Create the limit object
+        limit = self.search_limit(board, limit_time)
 
-        except Exception as e:
-            print(f"Unexpected error during analysis: {e}")
-            return [{"score": "Analysis error", "pv": "", "moves": []}]
+        # A supervised engine fails over to its standby and retries at once
+        attempts = 2 if self.supervisor is not None else 1
+        for attempt in range(attempts):
+            retry = attempt + 1 < attempts
+            try:
+                # Analyze the position
+                with self.lock:
+                    result = self.engine.analyse(
+                        board,
+                        limit,
+                        multipv=self.multipv
+                    )
+
+                # If result is not a list (single PV), convert it to a list
+                if not isinstance(result, list):
+                    result = [result]
+                self._record_score(board, result[0])
+                self._failures = 0
+
+                # Keep the result if it is deeper than the cached one
+                if self.cache is not None:
+                    self.cache.put(board, self.fingerprint(), result)
+
+                # Keep the scores and moves; SAN is only produced when displayed
+                return [AnalysisLine.from_info(board, info) for info in result]
+
+            except chess.engine.EngineTerminatedError:
+                print("Engine terminated unexpectedly during analysis")
+                if self._failed(board, "crash") and retry:
+                    continue
+                return [AnalysisLine.error("Engine restarting...")]
+
+            except chess.engine.EngineError as e:
+                print(f"Engine error during analysis: {e}")
+                if self._failed(board, "crash") and retry:
+                    continue
+                return [AnalysisLine.error("Engine error")]
+
+            except TimeoutError:
+                print("Engine did not answer in time during analysis")
+                if self._failed(board, "hang") and retry:
+                    continue
+                return [AnalysisLine.error("Engine restarting...")]
+
+            except Exception as e:
+                print(f"Unexpected error during analysis: {e}")
+                return [AnalysisLine.error("Analysis error")]
 
-    def get_best_move(self, board: chess.Board, limit_time: float = 0.1) -> Tuple[chess.Move, str]:
+    def _failed(self, board: chess.Board, reason: str = "crash") -> bool:
+        """
+        Count an engine failure on a position and replace the engine.
+
+        The first failure is recovered from at once; after further consecutive
+        failures on the same position the engine is only replaced after an
+        exponentially growing delay.
+
+        Args:
+            board: The position the engine failed on
+            reason: "crash" or "hang", for the supervisor's metrics
+
+        Returns:
+            True if an engine is running again and the position may be searched
+            again, False otherwise
+        """
+        key = chess.polyglot.zobrist_hash(board)
+        if key != self._failure_key:
+            self._failure_key = key
+            self._failures = 0
+        self._failures += 1
+
+        if self._failures > 1:
+            time.sleep(self.retry_delay * 2 ** (self._failures - 2))
+        recovered = self._recover(reason)
+
+        if self._failures >= self.max_failures:
+            print(f"Engine failed {self._failures} times in a row on {board.fen()}, not analyzing it again")
+            return False
+        return recovered
+
+    def _recover(self, reason: str = "crash") -> bool:
+        """
+        Replace a failed engine process.
+
+        A supervised engine switches to its standby process, which takes
+        milliseconds; otherwise the engine is restarted.
+
+        Args:
+            reason: "crash" or "hang", for the supervisor's metrics
+
+        Returns:
+            True if an engine is running again, False otherwise
+        """
+        if self.supervisor is not None:
+            with self.lock:
+                self.engine = self.supervisor.failover(self.engine, reason)
+            return self.engine is not None
+
+        # Try to restart the engine
+        self.stop()
+        self.engine = None
+        if self.start():
+            print("Engine restarted successfully")
+            return True
+        return False
+
+    def book_results(self, board: chess.Board, max_moves: int = 5) -> List[AnalysisLine]:
+        """
+        Get the book moves of a position as analysis lines.
+
+        Args:
+            board: The chess board position
+            max_moves: Maximum number of book moves to return
+
+        Returns:
+            A list of analysis lines, one for each book move labelled with its
+            share of the total weight, or an empty list if the position is not
+            in the book
+        """
+        if self.book is None:
+            return []
+
+        entries = self.book.lookup(board)[:max_moves]
+        total = sum(weight for _, weight in entries)
+
+        return [
+            AnalysisLine(board, pv=[move], multipv=index + 1, kind=BOOK,
+                         label=f"Book {100.0 * weight / total:.0f}%", weight=weight)
+            for index, (move, weight) in enumerate(entries)
+        ]
+
+    def tablebase_results(self, board: chess.Board) -> List[AnalysisLine]:
+        """
+        Get the tablebase result of a position as an analysis line.
+
+        Args:
+            board: The chess board position
+
+        Returns:
+            A list with one analysis line holding the exact outcome and the
+            best move, or an empty list if the position is not in the tablebases
+        """
+        if self.tablebase is None:
+            return []
+
+        probe = self.tablebase.probe(board)
+        if probe is None:
+            return []
+
+        # Wins and losses spoiled by the 50-move rule (wdl 1 and -1) are draws
+        wdl, dtz, move = probe
+        if wdl > 1:
+            label = f"TB win (DTZ {abs(dtz)})"
+        elif wdl < -1:
+            label = f"TB loss (DTZ {abs(dtz)})"
+        elif wdl == 1:
+            label = "TB draw (cursed win)"
+        elif wdl == -1:
+            label = "TB draw (blessed loss)"
+        else:
+            label = "TB draw"
+
+        # Decisive results count as a mate score for comparisons
+        score = chess.engine.PovScore(
+            chess.engine.Cp(10000 if wdl > 1 else -10000 if wdl < -1 else 0), board.turn
+        )
+
+        return [AnalysisLine(board, score=score, pv=[move] if move is not None else [],
+                             kind=TABLEBASE, label=label)]
+
+    def get_best_move(self, board: chess.Board, limit_time: Optional[float] = None) -> Tuple[chess.Move, str]:
         """
         Get the best move for the current position.
 
         Args:
             board: The chess board position
-            limit_time: Time limit for analysis in seconds
+            limit_time: Time limit for analysis in seconds, or None to use the
+                search budget (0.1 seconds without one)
 
         Returns:
             A tuple containing the best move and its SAN notation
@@ -261,10 +603,18 @@ class StockfishEngine:
             self.start()
 
         # Create the limit object
-        limit = chess.engine.Limit(time=limit_time, depth=self.depth)
+        limit = self.search_limit(board, limit_time)
 
-        # Get the best move
-        result = self.engine.play(board, limit)
+        # Get the best move, failing over to the standby once if the engine died
+        try:
+            with self.lock:
+                result = self.engine.play(board, limit)
+        except (chess.engine.EngineTerminatedError, chess.engine.EngineError, TimeoutError) as e:
+            reason = "hang" if isinstance(e, TimeoutError) else "crash"
+            if self.supervisor is None or not self._recover(reason):
+                raise
+            with self.lock:
+                result = self.engine.play(board, limit)
 
         # Convert to SAN notation
         san = board.san(result.move)
@@ -290,6 +640,8 @@ class StockfishEngine:
         self.threads = threads
         if self.is_running():
             self.engine.configure({"Threads": threads})
+        if self.supervisor is not None:
+            self.supervisor.configure({"Threads": threads})
 
     def set_hash_size(self, hash_size: int) -> None:
         """
@@ -301,6 +653,8 @@ class StockfishEngine:
         self.hash_size = hash_size
         if self.is_running():
             self.engine.configure({"Hash": hash_size})
+        if self.supervisor is not None:
+            self.supervisor.configure({"Hash": hash_size})
 
     def set_multipv(self, multipv: int) -> None:
         """
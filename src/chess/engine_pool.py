@@ -0,0 +1,332 @@
+"""
+Engine Pool Module.
+
+This module provides a pool of Stockfish processes for analysing several positions
+in parallel.
+"""
+
+import heapq
+import itertools
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import chess
+import chess.engine
+import chess.polyglot
+
+from src.chess.engine import find_engine
+from src.chess.engine_server import EngineClient
+
+
+class _Job:
+    """A queued analysis request."""
+
+    __slots__ = ('board', 'limit', 'multipv', 'route', 'future', 'queued_at')
+
+    def __init__(self, board, limit, multipv, route, future):
+        self.board = board
+        self.limit = limit
+        self.multipv = multipv
+        self.route = route
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class _Worker:
+    """One engine process of the pool and its statistics."""
+
+    def __init__(self, index):
+        self.index = index
+        self.engine = None
+        self.thread = None
+        self.busy = False
+        self.busy_time = 0.0
+        self.jobs_done = 0
+        self.failures = 0
+
+
+class EnginePool:
+    """
+    A pool of Stockfish processes with a shared priority queue.
+
+    Each process runs on its own worker thread. Jobs are taken in priority
+    order (lower values first, then first come first served). Every job has a
+    route, by default the Zobrist hash of its position, which selects a
+    preferred engine (route modulo pool size): an engine takes the most urgent
+    job routed to it, so related work (e.g. the positions of one game when
+    they share a route) keeps hitting the same warm hash table. When an
+    engine has no job of its own, it takes the most urgent job routed to a
+    busy engine instead of idling.
+
+    With a `server`, each worker is a connection to the shared engine daemon
+    instead of an engine process of its own, so the pool's jobs are searched
+    by the daemon's engines, whose options belong to the daemon.
+    """
+
+    def __init__(self, size: int = 2, threads: int = 1, hash_size: int = 64,
+                 engine_path: Optional[str] = None, wait_history: int = 1000,
+                 low_priority: bool = False, server: Optional[str] = None):
+        """
+        Initialize the engine pool.
+
+        Args:
+            size: Number of engine processes
+            threads: Number of CPU threads of each engine process
+            hash_size: Hash table size of each engine process in MB
+            engine_path: Path to the engine executable, or None to find Stockfish
+            wait_history: Number of queue wait times to remember
+            low_priority: Whether to run the engine processes at below-normal OS
+                priority, so they only use CPU time other processes leave idle
+            server: Socket path of an engine daemon (see engine_daemon.py) to connect
+                the workers to instead of starting engine processes, or None
+        """
+        self.size = size
+        self.threads = threads
+        self.hash_size = hash_size
+        self.server = server
+        # Connections to the daemon need no engine of their own
+        self.engine_path = engine_path if engine_path is not None or server is not None else find_engine()
+        self.low_priority = low_priority
+
+        self.workers = [_Worker(index) for index in range(size)]
+        self.queue = []  # Heap of (priority, sequence, job)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.running = False
+        self.started_at = None
+
+        # Queue wait times in seconds, from submission to the start of the search
+        self.wait_times = deque(maxlen=wait_history)
+
+    def start(self) -> None:
+        """Start the engine processes and their worker threads."""
+        if self.running:
+            return
+
+        self.running = True
+        self.started_at = time.perf_counter()
+        for worker in self.workers:
+            worker.thread = threading.Thread(target=self._worker_loop, args=(worker,), daemon=True)
+            worker.thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Stop the worker threads and the engine processes.
+
+        Jobs that have not started are cancelled.
+
+        Args:
+            timeout: Maximum time in seconds to wait for each worker
+        """
+        with self.condition:
+            self.running = False
+            for _, _, job in self.queue:
+                job.future.cancel()
+            self.queue.clear()
+            self.condition.notify_all()
+
+        for worker in self.workers:
+            if worker.thread is not None:
+                worker.thread.join(timeout)
+                worker.thread = None
+
+    def submit(self, board: chess.Board, limit: chess.engine.Limit, multipv: int = 1,
+               priority: int = 0, route: Optional[int] = None) -> Future:
+        """
+        Queue a position for analysis.
+
+        Args:
+            board: The chess board position, which is copied
+            limit: The search limit
+            multipv: Number of principal variations
+            priority: Priority of the job, lower values run first
+            route: Routing key selecting the preferred engine, or None to use
+                the Zobrist hash of the position
+
+        Returns:
+            A Future resolving to a list of info dictionaries, one for each
+            principal variation
+        """
+        if not self.running:
+            self.start()
+
+        if route is None:
+            route = chess.polyglot.zobrist_hash(board)
+
+        future = Future()
+        job = _Job(board.copy(), limit, multipv, route, future)
+        with self.condition:
+            heapq.heappush(self.queue, (priority, next(self.sequence), job))
+            self.condition.notify_all()
+        return future
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, multipv: int = 1,
+                priority: int = 0, route: Optional[int] = None) -> List[Dict]:
+        """
+        Analyse a position on the pool and wait for the result.
+
+        Args:
+            board: The chess board position
+            limit: The search limit
+            multipv: Number of principal variations
+            priority: Priority of the job, lower values run first
+            route: Routing key selecting the preferred engine, or None to use
+                the Zobrist hash of the position
+
+        Returns:
+            A list of info dictionaries, one for each principal variation
+        """
+        return self.submit(board, limit, multipv, priority, route).result()
+
+    def _take_job(self, worker):
+        """
+        Take the next job for a worker, waiting until one is queued.
+
+        Must be called with the condition held.
+
+        Returns:
+            The job, or None if the pool is stopping
+        """
+        while self.running:
+            # The most urgent job routed to this engine, else one waiting for a busy engine
+            candidates = [entry for entry in self.queue if entry[2].route % self.size == worker.index]
+            if not candidates:
+                candidates = [entry for entry in self.queue if self.workers[entry[2].route % self.size].busy]
+
+            if candidates:
+                entry = min(candidates)
+                self.queue.remove(entry)
+                heapq.heapify(self.queue)
+                worker.busy = True
+
+                # Idle workers that found only jobs routed to this (then free) engine
+                # may now take them
+                self.condition.notify_all()
+                return entry[2]
+
+            self.condition.wait()
+        return None
+
+    def _worker_loop(self, worker) -> None:
+        """Run the jobs of one engine process."""
+        while True:
+            with self.condition:
+                job = self._take_job(worker)
+            if job is None:
+                break
+
+            if not job.future.set_running_or_notify_cancel():
+                with self.condition:
+                    worker.busy = False
+                continue
+
+            started = time.perf_counter()
+            self.wait_times.append(started - job.queued_at)
+
+            try:
+                result = self._run(worker, job)
+            except Exception as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                worker.busy_time += time.perf_counter() - started
+                worker.jobs_done += 1
+
+            with self.condition:
+                worker.busy = False
+
+        self._close_engine(worker)
+
+    def _run(self, worker, job) -> List[Dict]:
+        """Analyse a job on a worker's engine, restarting the engine once if it died."""
+        for attempt in range(2):
+            try:
+                if worker.engine is None:
+                    worker.engine = self._open_engine()
+                    worker.engine.configure({"Threads": self.threads, "Hash": self.hash_size})
+
+                result = worker.engine.analyse(job.board, job.limit, multipv=job.multipv)
+                return result if isinstance(result, list) else [result]
+
+            except chess.engine.EngineTerminatedError:
+                print(f"Pool engine {worker.index} terminated unexpectedly, restarting")
+                worker.failures += 1
+                self._close_engine(worker)
+                if attempt:
+                    raise
+
+    def _open_engine(self) -> chess.engine.SimpleEngine:
+        """Start an engine process, at below-normal OS priority if requested, or connect to the daemon."""
+        if self.server is not None:
+            return EngineClient(self.server)
+
+        if not self.low_priority:
+            return chess.engine.SimpleEngine.popen_uci(self.engine_path)
+
+        if os.name == "nt":
+            return chess.engine.SimpleEngine.popen_uci(
+                self.engine_path, creationflags=subprocess.BELOW_NORMAL_PRIORITY_CLASS
+            )
+
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
+        try:
+            pid = engine.protocol.transport.get_pid()
+            os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, 0) + 10)
+        except (AttributeError, OSError) as e:
+            print(f"Could not lower the engine priority: {e}")
+        return engine
+
+    def _close_engine(self, worker) -> None:
+        """Quit a worker's engine process."""
+        if worker.engine is not None:
+            try:
+                worker.engine.quit()
+            except Exception:
+                try:
+                    worker.engine.close()
+                except Exception:
+                    pass
+            worker.engine = None
+
+    def pending(self) -> int:
+        """
+        Get the number of queued jobs.
+
+        Returns:
+            The number of jobs that have not started
+        """
+        with self.condition:
+            return len(self.queue)
+
+    def stats(self) -> Dict:
+        """
+        Get the utilisation and queue statistics of the pool.
+
+        Returns:
+            A dictionary with the per-engine jobs, busy time, utilisation and
+            failures, the number of pending jobs and the mean and maximum
+            queue wait times in seconds
+        """
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        waits = list(self.wait_times)
+        return {
+            "engines": [
+                {
+                    "index": worker.index,
+                    "jobs": worker.jobs_done,
+                    "busy_time": worker.busy_time,
+                    "utilisation": worker.busy_time / elapsed if elapsed else 0.0,
+                    "failures": worker.failures
+                }
+                for worker in self.workers
+            ],
+            "pending": self.pending(),
+            "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+            "max_wait": max(waits) if waits else 0.0
+        }
@@ -0,0 +1,513 @@
+"""
+Engine Server Module.
+
+This module provides a local daemon that owns a pool of engine processes and serves
+analysis requests from several Chess Vision instances over a Unix socket, and the
+client that StockfishEngine and EnginePool use to talk to it.
+"""
+
+import argparse
+import getpass
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from typing import Dict, List, Optional, Union
+
+import chess
+import chess.engine
+import chess.polyglot
+
+
+# Default socket of the engine daemon
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"chess-vision-engine-{getpass.getuser()}.sock")
+
+
+def _encode_limit(limit: chess.engine.Limit) -> Dict:
+    """Encode the search limit of a request."""
+    return {"time": limit.time, "depth": limit.depth, "nodes": limit.nodes, "mate": limit.mate}
+
+
+def _encode_info(info: Dict) -> Dict:
+    """Encode an info dictionary as JSON, with a white-relative score and UCI moves."""
+    encoded = {"depth": info.get("depth", 0), "nodes": info.get("nodes", 0)}
+    if "score" in info:
+        score = info["score"].white()
+        encoded["mate"] = score.mate()
+        encoded["cp"] = score.score()
+    encoded["pv"] = [move.uci() for move in info.get("pv", [])]
+    return encoded
+
+
+def _decode_info(encoded: Dict, index: int) -> Dict:
+    """Decode a JSON info dictionary into one like those of the engine."""
+    info = {
+        "depth": encoded["depth"],
+        "nodes": encoded["nodes"],
+        "pv": [chess.Move.from_uci(uci) for uci in encoded["pv"]],
+        "multipv": index + 1
+    }
+    if "cp" in encoded:
+        score = chess.engine.Mate(encoded["mate"]) if encoded["mate"] is not None else chess.engine.Cp(encoded["cp"])
+        info["score"] = chess.engine.PovScore(score, chess.WHITE)
+    return info
+
+
+class _Request:
+    """A search on the pool and the clients waiting for its result."""
+
+    __slots__ = ('key', 'future', 'waiters')
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.waiters = []  # (client, request id)
+
+
+class _Client:
+    """A connected client and its outstanding requests."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.write_lock = threading.Lock()
+        self.outstanding = 0  # Requests waiting for a result
+        self.connected = True
+
+    def send(self, message: Dict) -> None:
+        """Send one JSON line to the client, ignoring clients that went away."""
+        data = (json.dumps(message) + "\n").encode()
+        with self.write_lock:
+            if not self.connected:
+                return
+            try:
+                self.handler.wfile.write(data)
+                self.handler.wfile.flush()
+            except OSError:
+                self.connected = False
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Reads the JSON line requests of one client connection."""
+
+    def handle(self):
+        server = self.server.engine_server
+        client = _Client(self)
+        server.connect(client)
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    client.send({"error": "Invalid request"})
+                    continue
+                server.handle(client, message)
+        except OSError:
+            pass
+        finally:
+            server.disconnect(client)
+
+
+# Windows builds of Python may lack Unix sockets, and with them UnixStreamServer
+if hasattr(socket, "AF_UNIX"):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """A Unix socket server with one thread per client."""
+
+        daemon_threads = True
+
+
+class EngineServer:
+    """
+    A local daemon that multiplexes analysis requests onto an engine pool.
+
+    Clients connect to a Unix socket and send one JSON request per line:
+    {"id": n, "op": "analyse", "fen": root FEN, "moves": [UCI moves],
+    "limit": {...}, "multipv": k}. Each is answered with {"id": n, "lines":
+    [...]} or {"id": n, "error": message}, in completion order.
+
+    The pool routes every position by its Zobrist hash, so identical
+    positions from all clients are searched by the same engine and hit its
+    warm hash table. Requests for a position that is already queued or being
+    searched with the same limit and number of lines are coalesced: they wait
+    for that search instead of starting another. Clients are scheduled
+    fairly: a request's queue priority is the number of requests its client
+    already has outstanding, so a client with a long queue cannot starve
+    the others.
+    """
+
+    def __init__(self, pool, socket_path: Optional[str] = None):
+        """
+        Initialize the engine server.
+
+        Args:
+            pool: The EnginePool that owns the engine processes
+            socket_path: Path of the Unix socket, or None for SOCKET_PATH
+        """
+        self.pool = pool
+        self.socket_path = socket_path if socket_path is not None else SOCKET_PATH
+        self.server = None
+        self.thread = None
+
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.requests = {}  # (hash, multipv, limit) -> _Request of queued and running searches
+
+        # Statistics
+        self.received = 0
+        self.coalesced = 0
+
+    def start(self) -> None:
+        """Listen on the socket and serve clients on a background thread."""
+        if self.server is not None:
+            return
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("The engine daemon needs Unix sockets")
+
+        # A socket file left behind by a daemon that died would make bind fail
+        if os.path.exists(self.socket_path):
+            if is_running(self.socket_path):
+                raise OSError(f"An engine daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+
+        self.pool.start()
+        self.server = _UnixServer(self.socket_path, _Handler)
+        self.server.engine_server = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Engine daemon listening on {self.socket_path}")
+
+    def stop(self) -> None:
+        """Stop serving, remove the socket and stop the engine pool."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        self.pool.stop()
+
+    def connect(self, client: _Client) -> None:
+        """Register a new client."""
+        with self.lock:
+            self.clients.add(client)
+
+    def disconnect(self, client: _Client) -> None:
+        """Forget a client, cancelling queued searches that nobody else waits for."""
+        cancelled = []
+        with self.lock:
+            client.connected = False
+            self.clients.discard(client)
+            for request in list(self.requests.values()):
+                request.waiters = [waiter for waiter in request.waiters if waiter[0] is not client]
+                if not request.waiters:
+                    cancelled.append(request.future)
+
+        # Cancelling runs the done callback, which takes the lock
+        for future in cancelled:
+            future.cancel()
+
+    def handle(self, client: _Client, message: Dict) -> None:
+        """Handle one request of a client."""
+        request_id = message.get("id")
+        op = message.get("op", "analyse")
+
+        if op == "stats":
+            client.send({"id": request_id, "stats": self.stats()})
+            return
+        if op != "analyse":
+            client.send({"id": request_id, "error": f"Unknown operation {op}"})
+            return
+
+        try:
+            board = chess.Board(message["fen"], chess960=message.get("chess960", False))
+            for uci in message.get("moves", []):
+                board.push_uci(uci)
+            limit = chess.engine.Limit(**message.get("limit", {}))
+            multipv = int(message.get("multipv", 1))
+        except (KeyError, TypeError, ValueError) as e:
+            client.send({"id": request_id, "error": f"Invalid request: {e}"})
+            return
+
+        self.submit(client, request_id, board, limit, multipv)
+
+    def submit(self, client: _Client, request_id, board: chess.Board, limit: chess.engine.Limit,
+               multipv: int) -> None:
+        """
+        Queue a search for a client, or join an identical one.
+
+        Args:
+            client: The requesting client
+            request_id: The id of the request, echoed in the answer
+            board: The chess board position
+            limit: The search limit
+            multipv: Number of principal variations
+        """
+        key = (chess.polyglot.zobrist_hash(board), multipv, tuple(_encode_limit(limit).values()))
+        with self.lock:
+            self.received += 1
+            client.outstanding += 1
+
+            request = self.requests.get(key)
+            if request is not None and not request.future.cancelled():
+                request.waiters.append((client, request_id))
+                self.coalesced += 1
+                return
+
+            request = _Request(key)
+            request.waiters.append((client, request_id))
+            request.future = self.pool.submit(board, limit, multipv=multipv, priority=client.outstanding - 1)
+            self.requests[key] = request
+
+        request.future.add_done_callback(lambda future: self._on_done(request, future))
+
+    def _on_done(self, request: _Request, future) -> None:
+        """Send the result of a search to every client waiting for it."""
+        with self.lock:
+            if self.requests.get(request.key) is request:
+                del self.requests[request.key]
+            waiters, request.waiters = request.waiters, []
+            for client, _ in waiters:
+                client.outstanding -= 1
+
+        if future.cancelled():
+            message = {"error": "Cancelled"}
+        elif future.exception() is not None:
+            message = {"error": str(future.exception()) or type(future.exception()).__name__}
+        else:
+            message = {"lines": [_encode_info(info) for info in future.result()]}
+
+        for client, request_id in waiters:
+            client.send(dict(message, id=request_id))
+
+    def stats(self) -> Dict:
+        """
+        Get the statistics of the daemon.
+
+        Returns:
+            A dictionary with the number of clients, received and coalesced
+            requests, searches in progress, and the statistics of the pool
+        """
+        with self.lock:
+            stats = {
+                "clients": len(self.clients),
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "searches": len(self.requests)
+            }
+        stats["pool"] = self.pool.stats()
+        return stats
+
+
+def is_running(socket_path: Optional[str] = None) -> bool:
+    """
+    Check if an engine daemon is listening.
+
+    Args:
+        socket_path: Path of the Unix socket, or None for SOCKET_PATH
+
+    Returns:
+        True if a daemon accepts connections on the socket
+    """
+    socket_path = socket_path if socket_path is not None else SOCKET_PATH
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+class EngineClient:
+    """
+    A client of the engine daemon with the analyse and play methods of SimpleEngine.
+
+    The daemon owns the engine processes and their options, so configure is
+    ignored. A lost connection raises EngineTerminatedError and a search
+    without an answer raises TimeoutError, like a failed engine process.
+    Only searches with a time limit have a deadline, as a depth or node
+    limited search may wait in the daemon's queue for any time. After a
+    timeout or a lost connection the next request reconnects.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 10.0):
+        """
+        Connect to the engine daemon.
+
+        Args:
+            socket_path: Path of the Unix socket, or None for SOCKET_PATH
+            timeout: Seconds to wait for an answer beyond the search time limit
+
+        Raises:
+            OSError: If no daemon is listening on the socket
+        """
+        self.socket_path = socket_path if socket_path is not None else SOCKET_PATH
+        self.timeout = timeout
+        self.sock = None
+        self.file = None
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self._connect()
+
+    def _connect(self) -> None:
+        """Open the connection to the daemon."""
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not available")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.file = sock.makefile("rwb")
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit,
+                multipv: Optional[int] = None) -> Union[Dict, List[Dict]]:
+        """
+        Analyse a position on the daemon.
+
+        Args:
+            board: The chess board position, sent with its move history
+            limit: The search limit
+            multipv: Number of principal variations, or None for a single one
+
+        Returns:
+            A list of info dictionaries if multipv is given, otherwise the info
+            dictionary of the best line
+        """
+        lines = self._request({
+            "op": "analyse",
+            "fen": board.root().fen(),
+            "chess960": board.chess960,
+            "moves": [move.uci() for move in board.move_stack],
+            "limit": _encode_limit(limit),
+            "multipv": multipv or 1
+        }, limit)
+        infos = [_decode_info(line, index) for index, line in enumerate(lines)]
+        if multipv is None:
+            return infos[0] if infos else {}
+        return infos
+
+    def play(self, board: chess.Board, limit: chess.engine.Limit) -> chess.engine.PlayResult:
+        """
+        Find the best move of a position on the daemon.
+
+        Args:
+            board: The chess board position
+            limit: The search limit
+
+        Returns:
+            The best move, with the predicted reply as the ponder move
+        """
+        info = self.analyse(board, limit)
+        pv = info.get("pv", [])
+        if not pv:
+            raise chess.engine.EngineError(f"No move found for {board.fen()}")
+        return chess.engine.PlayResult(pv[0], pv[1] if len(pv) > 1 else None, info)
+
+    def configure(self, options: Dict) -> None:
+        """Ignore engine options, which belong to the daemon."""
+
+    def stats(self) -> Dict:
+        """
+        Get the statistics of the daemon.
+
+        Returns:
+            The dictionary of EngineServer.stats
+        """
+        return self._request({"op": "stats"}, None, key="stats")
+
+    def _request(self, message: Dict, limit: Optional[chess.engine.Limit], key: str = "lines"):
+        """Send a request and wait for its answer."""
+        with self.lock:
+            self.next_id += 1
+            message["id"] = self.next_id
+
+            # Only a time limit bounds the search, a depth or node limit may take any time
+            if limit is None:
+                timeout = self.timeout
+            elif limit.time:
+                timeout = self.timeout + limit.time
+            else:
+                timeout = None
+            try:
+                # A timeout leaves the buffered file unusable, so the connection is reopened
+                if self.file is None:
+                    self._connect()
+                self.sock.settimeout(timeout)
+                self.file.write((json.dumps(message) + "\n").encode())
+                self.file.flush()
+
+                # Answers of other requests on the connection are skipped
+                while True:
+                    line = self.file.readline()
+                    if not line:
+                        raise chess.engine.EngineTerminatedError("Engine daemon closed the connection")
+                    answer = json.loads(line)
+                    if answer.get("id") == message["id"]:
+                        break
+            except socket.timeout:
+                self.close()
+                raise TimeoutError("Engine daemon did not answer in time")
+            except OSError as e:
+                self.close()
+                raise chess.engine.EngineTerminatedError(f"Lost the engine daemon: {e}")
+            except chess.engine.EngineTerminatedError:
+                self.close()
+                raise
+
+        if "error" in answer:
+            raise chess.engine.EngineError(answer["error"])
+        return answer[key]
+
+    def quit(self) -> None:
+        """Disconnect from the daemon."""
+        self.close()
+
+    def close(self) -> None:
+        """Disconnect from the daemon."""
+        file, sock, self.file, self.sock = self.file, self.sock, None, None
+        try:
+            if file is not None:
+                file.close()
+        except OSError:
+            pass
+        if sock is not None:
+            sock.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the engine daemon command line."""
+    # Imported here, as the engine module uses this one
+    from src.chess.engine import find_engine
+    from src.chess.engine_pool import EnginePool
+
+    parser = argparse.ArgumentParser(description="Share a pool of engine processes between Chess Vision instances.")
+    parser.add_argument("--socket", help=f"Unix socket path, by default {SOCKET_PATH}")
+    parser.add_argument("--engines", type=int, default=1, help="Number of engine processes")
+    parser.add_argument("--threads", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Threads per engine process")
+    parser.add_argument("--hash", type=int, default=256, help="Hash size per engine process in MB")
+    parser.add_argument("--engine-config", help="Engine configuration file, by default data/config/engine.json")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        parser.error("the engine daemon needs Unix sockets")
+
+    pool = EnginePool(size=args.engines, threads=args.threads, hash_size=args.hash,
+                      engine_path=find_engine(args.engine_config))
+    server = EngineServer(pool, args.socket)
+    server.start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        print("Stopping the engine daemon")
+    finally:
+        server.stop()
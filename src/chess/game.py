@@ -0,0 +1,243 @@
+"""
+Game Tracker Module.
+
+This module provides functionality for reconstructing the full game state (side to
+move, castling rights, en passant square and clocks) from a sequence of detected
+piece placements.
+"""
+
+import chess
+import numpy as np
+
+from src.chess.decoder import GameDecoder
+from src.chess.move_detector import MoveIndex
+from src.chess.position import (
+    Position, placement_from_board, placement_key, piece_code, square_key, touched_squares, EMPTY
+)
+
+
+class GameTracker:
+    """
+    A class for tracking the state of the game shown on screen.
+
+    The detector only sees piece placements. This class keeps a chess.Board
+    with the real game state and advances it by the move that explains each
+    new placement. Pushing the move updates the side to move, the castling
+    rights, the en passant square and the clocks, and the placement is kept
+    in sync by updating only the squares the move touched. When frames were
+    missed and no single move explains the change, the decoder reconstructs
+    the most likely sequence of missed moves.
+    """
+
+    def __init__(self, board=None, decoder=None):
+        """
+        Initialize the game tracker.
+
+        Args:
+            board: The chess.Board to start from, or None for the starting position
+            decoder: The GameDecoder used to reconstruct missed moves, or None for the default
+        """
+        self.board = chess.Board()
+        self.placement = None
+        self.key = 0
+        self.last_move = None
+        self.last_san = None
+        self.last_moves = []
+        self.last_sans = []
+        self.decoder = decoder if decoder is not None else GameDecoder()
+        self._move_index = None
+        self.reset(board)
+
+    def reset(self, board=None):
+        """
+        Reset the tracked game.
+
+        Args:
+            board: The chess.Board to start from, or None for the starting position
+        """
+        self.board = board.copy() if board is not None else chess.Board()
+        self.placement = placement_from_board(self.board)
+        self.key = placement_key(self.placement)
+        self.last_move = None
+        self.last_san = None
+        self.last_moves = []
+        self.last_sans = []
+        self._move_index = None
+
+    @property
+    def move_index(self):
+        """The index of the legal moves of the game position, rebuilt lazily after it changes."""
+        if self._move_index is None:
+            self._move_index = MoveIndex(self.board, self.placement, self.key)
+        return self._move_index
+
+    def position(self):
+        """
+        Get the tracked game state as a position.
+
+        Returns:
+            A Position with the full game state
+        """
+        return Position.from_board(self.board)
+
+    def infer_mover(self, placement):
+        """
+        Infer which color moved from the change in placement.
+
+        The pieces that arrive on changed squares (the moved piece, the
+        castling rook, a promoted piece) all belong to the side that moved.
+
+        Args:
+            placement: The new array of 64 piece codes indexed by chess square
+
+        Returns:
+            chess.WHITE or chess.BLACK, or None if the change is ambiguous
+        """
+        placement = np.asarray(placement)
+        arrived = placement[(placement != self.placement) & (placement >= 0)]
+        if len(arrived) == 0:
+            return None
+
+        # Codes 0-5 are white pieces, 6-11 black pieces
+        white = arrived < 6
+        if white.all():
+            return chess.WHITE
+        if not white.any():
+            return chess.BLACK
+        return None
+
+    def find_move(self, position):
+        """
+        Find the legal move that leads to the placement of a position.
+
+        Args:
+            position: The new Position
+
+        Returns:
+            The chess.Move, or None if no single legal move explains the change
+        """
+        return self.move_index.lookup(position.key)
+
+    def update(self, position):
+        """
+        Advance the tracked game to a newly detected position.
+
+        Args:
+            position: The newly detected Position
+
+        Returns:
+            The last chess.Move that was inferred, or None if the position was
+            unchanged or could not be reached by legal moves. All moves applied
+            by the update are listed in last_moves and last_sans.
+        """
+        self.last_moves = []
+        self.last_sans = []
+        if np.array_equal(position.placement, self.placement):
+            return None
+
+        move = self.find_move(position)
+        if move is not None:
+            self.push(move)
+            return move
+
+        # Only the other side's pieces moved, so the side to move was wrong
+        mover = self.infer_mover(position.placement)
+        if mover is not None and mover != self.board.turn:
+            board = self.board
+            self.board = board.copy(stack=False)
+            self.board.turn = mover
+            self.board.ep_square = None
+            self._move_index = None
+            move = self.find_move(position)
+            if move is not None:
+                print("Side to move corrected from the detected move")
+                self.push(move)
+                return move
+            self.board = board
+            self._move_index = None
+
+        # Frames were missed, decode the most likely sequence of missed moves
+        moves = self.decoder.decode(self.board, self.placement, position.placement, position.confidences)
+        if moves:
+            for move in moves:
+                self.push(move)
+            # The decoded legal position is trusted over detection noise on single squares
+            print(f"Reconstructed missed moves: {' '.join(self.last_sans)}")
+            return self.last_move
+
+        self._resync(position, mover)
+        return None
+
+    def push(self, move):
+        """
+        Apply a move to the tracked game.
+
+        Args:
+            move: The chess.Move to apply
+        """
+        board = self.board
+        self.last_san = board.san(move)
+        self.last_sans.append(self.last_san)
+        self.last_moves.append(move)
+        self.last_move = move
+
+        touched = self.touched_squares(move)
+        board.push(move)
+        self._move_index = None
+
+        for square in touched:
+            piece = board.piece_at(square)
+            code = piece_code(piece) if piece else EMPTY
+            self.key ^= square_key(int(self.placement[square]), square) ^ square_key(code, square)
+            self.placement[square] = code
+
+    def touched_squares(self, move):
+        """
+        Get the squares whose contents a move changes in the tracked game.
+
+        Args:
+            move: A legal chess.Move
+
+        Returns:
+            A list of squares, including the castling rook and en passant capture
+        """
+        return touched_squares(self.board, move)
+
+    def successor_keys(self):
+        """
+        Get the placement keys of all positions one legal move away.
+
+        Returns:
+            A set of placement keys
+        """
+        return self.move_index.successor_keys()
+
+    def _resync(self, position, mover):
+        """
+        Set the tracked game to a placement that no single move explains.
+
+        Args:
+            position: The newly detected Position
+            mover: The color that moved, or None if unknown
+        """
+        board = position.board.copy(stack=False)
+
+        # The other side is to move after the mover; keep the turn if unknown
+        board.turn = (not mover) if mover is not None else self.board.turn
+
+        # Keep only the castling rights that are still possible with this placement
+        board.castling_rights = self.board.castling_rights
+        board.castling_rights = board.clean_castling_rights()
+
+        board.ep_square = None
+        board.halfmove_clock = 0
+        board.fullmove_number = self.board.fullmove_number + (1 if mover == chess.BLACK else 0)
+
+        print(f"Game state resynchronised: {board.fen()}")
+
+        self.board = board
+        self.placement = placement_from_board(board)
+        self.key = placement_key(self.placement)
+        self.last_move = None
+        self.last_san = None
+        self._move_index = None
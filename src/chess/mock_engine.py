@@ -0,0 +1,300 @@
+"""
+Mock UCI Engine Module.
+
+This module provides a small stand-in UCI engine that replays scripted, deterministic
+analysis output, for testing and benchmarking the engine layer without Stockfish.
+
+It runs as its own process:
+    python src/chess/mock_engine.py [--script FILE]
+
+The optional JSON script configures the engine:
+    {
+        "name": "MockFish",            Engine name reported to the GUI
+        "startup_delay": 0.0,          Seconds before answering "uci"
+        "depth_delay": 0.005,          Seconds per search depth (all lines of a depth together)
+        "max_depth": 30,               Depth at which an unlimited search waits for "stop"
+        "nps": 1000000,                Nodes per second of one thread
+        "crash_after_searches": null,  Exit without answering during search N (1-based)
+        "hang_after_searches": null,   Stop answering any command during search N
+        "positions": {                 Scripted lines for specific positions (by FEN)
+            "<fen>": [{"depth": 10, "multipv": 1, "score": "cp 35", "pv": ["e2e4", "e7e5"]}]
+        }
+    }
+
+Positions without scripted lines get generated lines: the PV of line i starts with
+the i-th legal move in UCI order, and the score depends only on the position and depth.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import zlib
+
+import chess
+
+
+DEFAULT_SCRIPT = {
+    "name": "MockFish",
+    "startup_delay": 0.0,
+    "depth_delay": 0.005,
+    "max_depth": 30,
+    "nps": 1000000,
+    "crash_after_searches": None,
+    "hang_after_searches": None,
+    "positions": {}
+}
+
+
+class MockEngine:
+    """
+    A scripted UCI engine.
+
+    Commands are read from stdin on the main thread and each search runs on
+    its own thread, so "stop" and "ponderhit" are handled while searching.
+    """
+
+    def __init__(self, script):
+        """
+        Initialize the mock engine.
+
+        Args:
+            script: The script dictionary, merged over DEFAULT_SCRIPT
+        """
+        self.script = dict(DEFAULT_SCRIPT, **script)
+        self.board = chess.Board()
+        self.options = {"Threads": 1, "Hash": 16, "MultiPV": 1, "SyzygyPath": "", "Ponder": False}
+        self.searches = 0
+        self.hung = False
+        self.search_thread = None
+        self.stop_event = threading.Event()
+        self.ponderhit_event = threading.Event()
+        self.output_lock = threading.Lock()
+
+    def send(self, line):
+        """Write one line to the GUI."""
+        with self.output_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def run(self):
+        """Read and handle commands until "quit"."""
+        for line in sys.stdin:
+            tokens = line.split()
+            if not tokens or self.hung:
+                continue
+
+            command = tokens[0]
+            if command == "uci":
+                time.sleep(self.script["startup_delay"])
+                self.send(f"id name {self.script['name']}")
+                self.send("id author Chess Vision")
+                self.send("option name Threads type spin default 1 min 1 max 512")
+                self.send("option name Hash type spin default 16 min 1 max 33554432")
+                self.send("option name MultiPV type spin default 1 min 1 max 500")
+                self.send("option name SyzygyPath type string default <empty>")
+                self.send("option name Ponder type check default false")
+                self.send("option name Clear Hash type button")
+                self.send("uciok")
+            elif command == "isready":
+                self.send("readyok")
+            elif command == "setoption":
+                self.set_option(tokens)
+            elif command == "ucinewgame":
+                self.board = chess.Board()
+            elif command == "position":
+                self.set_position(tokens)
+            elif command == "go":
+                self.go(tokens)
+            elif command == "stop":
+                self.stop_search()
+            elif command == "ponderhit":
+                self.ponderhit_event.set()
+            elif command == "bench":
+                self.bench(tokens)
+            elif command == "quit":
+                self.stop_search()
+                break
+
+    def set_option(self, tokens):
+        """Handle "setoption name <name> [value <value>]"."""
+        if "value" in tokens:
+            index = tokens.index("value")
+            name = " ".join(tokens[2:index])
+            value = " ".join(tokens[index + 1:])
+        else:
+            name = " ".join(tokens[2:])
+            value = None
+
+        if name in ("Threads", "Hash", "MultiPV"):
+            self.options[name] = int(value)
+        elif name == "Ponder":
+            self.options[name] = value == "true"
+        elif name != "Clear Hash":
+            self.options[name] = value
+
+    def set_position(self, tokens):
+        """Handle "position (startpos | fen <fen>) [moves ...]"."""
+        if tokens[1] == "startpos":
+            self.board = chess.Board()
+            rest = tokens[2:]
+        else:
+            end = tokens.index("moves") if "moves" in tokens else len(tokens)
+            self.board = chess.Board(" ".join(tokens[2:end]))
+            rest = tokens[end:]
+
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                self.board.push_uci(uci)
+
+    def go(self, tokens):
+        """Handle "go" by starting a search thread."""
+        self.stop_search()
+        self.searches += 1
+
+        if self.searches == self.script["crash_after_searches"]:
+            # Simulate a crash in the middle of a search
+            sys.stdout.flush()
+            sys.exit(1)
+
+        if self.searches == self.script["hang_after_searches"]:
+            self.hung = True
+            return
+
+        limits = {}
+        for name in ("depth", "nodes", "movetime"):
+            if name in tokens:
+                limits[name] = int(tokens[tokens.index(name) + 1])
+        ponder = "ponder" in tokens
+
+        self.stop_event.clear()
+        self.ponderhit_event.clear()
+        self.search_thread = threading.Thread(
+            target=self.search, args=(self.board.copy(), limits, ponder), daemon=True
+        )
+        self.search_thread.start()
+
+    def stop_search(self):
+        """Stop the running search and wait for its "bestmove"."""
+        if self.search_thread is not None:
+            self.stop_event.set()
+            self.ponderhit_event.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def search(self, board, limits, ponder):
+        """Send scripted or generated info lines, then "bestmove"."""
+        started = time.monotonic()
+        threads = self.options["Threads"]
+        nps = int(self.script["nps"] * threads ** 0.9)
+        multipv = max(1, self.options["MultiPV"])
+
+        lines = self.script["positions"].get(board.fen())
+        if lines is None:
+            lines = self.generate_lines(board, multipv)
+
+        best = None
+        ponder_move = None
+        nodes = 0
+        for line in lines:
+            depth = line["depth"]
+            if self.stop_event.is_set():
+                break
+            if not ponder and self.limit_reached(limits, depth, nodes, started):
+                break
+
+            if line.get("multipv", 1) == 1:
+                time.sleep(self.script["depth_delay"])
+            elapsed = max(time.monotonic() - started, 1e-6)
+            nodes = int(nps * elapsed)
+
+            self.send(
+                f"info depth {depth} seldepth {depth + 2} multipv {line.get('multipv', 1)} "
+                f"score {line['score']} nodes {nodes} nps {int(nodes / elapsed)} "
+                f"time {int(elapsed * 1000)} pv {' '.join(line['pv'])}"
+            )
+            if line.get("multipv", 1) == 1 and line["pv"]:
+                best = line["pv"][0]
+                ponder_move = line["pv"][1] if len(line["pv"]) > 1 else None
+
+        # An unlimited or pondering search only returns on "stop" (or "ponderhit")
+        if ("depth" not in limits and "nodes" not in limits and "movetime" not in limits) or ponder:
+            if ponder:
+                self.ponderhit_event.wait()
+            else:
+                self.stop_event.wait()
+
+        if best is None:
+            moves = sorted(board.legal_moves, key=lambda move: move.uci())
+            best = moves[0].uci() if moves else "0000"
+        self.send(f"bestmove {best}" + (f" ponder {ponder_move}" if ponder_move else ""))
+
+    def limit_reached(self, limits, depth, nodes, started):
+        """Check the depth, node and time limits of a search."""
+        if "depth" in limits and depth > limits["depth"]:
+            return True
+        if "nodes" in limits and nodes >= limits["nodes"]:
+            return True
+        if "movetime" in limits and (time.monotonic() - started) * 1000 >= limits["movetime"]:
+            return True
+        return False
+
+    def generate_lines(self, board, multipv):
+        """Generate deterministic lines for every depth up to max_depth, one depth at a time."""
+        moves = sorted(board.legal_moves, key=lambda move: move.uci())[:multipv]
+        seed = zlib.crc32(board.board_fen().encode())
+        pvs = [self.continuation(board, move, 6) for move in moves]
+
+        for depth in range(1, self.script["max_depth"] + 1):
+            for index, pv in enumerate(pvs):
+                yield {
+                    "depth": depth,
+                    "multipv": index + 1,
+                    "score": f"cp {(seed % 200) - 100 - 10 * index + depth % 3}",
+                    "pv": pv[:depth]
+                }
+
+    @staticmethod
+    def continuation(board, move, length):
+        """Extend a first move into a legal PV by always playing the first legal move in UCI order."""
+        board = board.copy(stack=False)
+        pv = []
+        while len(pv) < length and move is not None:
+            pv.append(move.uci())
+            board.push(move)
+            replies = sorted(board.legal_moves, key=lambda reply: reply.uci())
+            move = replies[0] if replies else None
+        return pv
+
+    def bench(self, tokens):
+        """Handle "bench [hash] [threads] ..." like Stockfish, reporting nodes and speed."""
+        threads = int(tokens[2]) if len(tokens) > 2 else self.options["Threads"]
+        nps = int(self.script["nps"] * threads ** 0.9)
+        duration = self.script["depth_delay"] * 10
+        time.sleep(duration)
+        nodes = int(nps * duration)
+        with self.output_lock:
+            sys.stderr.write("===========================\n")
+            sys.stderr.write(f"Total time (ms) : {int(duration * 1000)}\n")
+            sys.stderr.write(f"Nodes searched  : {nodes}\n")
+            sys.stderr.write(f"Nodes/second    : {nps}\n")
+            sys.stderr.flush()
+
+
+def main():
+    """Run the mock engine."""
+    parser = argparse.ArgumentParser(description="Scripted mock UCI engine.")
+    parser.add_argument("--script", help="JSON file with the engine script")
+    args = parser.parse_args()
+
+    script = {}
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    MockEngine(script).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Move Detector Module.
+
+This module provides functionality for detecting the move between two consecutive
+board states with a single lookup.
+"""
+
+import chess
+import numpy as np
+
+from src.chess.position import EMPTY, piece_code, placement_from_board, placement_key, square_key
+
+
+def move_changes(board, placement, move):
+    """
+    Get the new contents of the squares a move changes, without playing it.
+
+    Args:
+        board: The chess.Board before the move
+        placement: The array of 64 piece codes of the board
+        move: A legal chess.Move
+
+    Returns:
+        A list of (square, piece code) pairs
+    """
+    moving = int(placement[move.from_square])
+
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        rook = int(placement[chess.square(7 if board.is_kingside_castling(move) else 0, rank)])
+        if board.is_kingside_castling(move):
+            return [(move.from_square, EMPTY), (chess.square(7, rank), EMPTY),
+                    (chess.square(6, rank), moving), (chess.square(5, rank), rook)]
+        return [(move.from_square, EMPTY), (chess.square(0, rank), EMPTY),
+                (chess.square(2, rank), moving), (chess.square(3, rank), rook)]
+
+    if move.promotion:
+        moving = piece_code(chess.Piece(move.promotion, board.turn))
+
+    changes = [(move.from_square, EMPTY), (move.to_square, moving)]
+    if board.is_en_passant(move):
+        captured = chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square))
+        changes.append((captured, EMPTY))
+    return changes
+
+
+class MoveIndex:
+    """
+    An index of the legal moves of a position by their square-change signature.
+
+    The signature of a move is the XOR of the Zobrist values of the contents
+    it removes from and adds to the squares it touches (vacated and occupied
+    squares, the castling rook, the en passant capture and the promoted
+    piece). It equals the XOR of the placement keys before and after the
+    move, so the move leading to a new placement is found with one XOR and
+    one dictionary lookup.
+    """
+
+    def __init__(self, board, placement=None, key=None):
+        """
+        Build the index for a position.
+
+        Args:
+            board: The chess.Board of the position, which is not modified
+            placement: The array of 64 piece codes of the board, or None to compute it
+            key: The placement key of the board, or None to compute it
+        """
+        if placement is None:
+            placement = placement_from_board(board)
+        if key is None:
+            key = placement_key(placement)
+
+        self.key = key
+        self.moves = {}
+
+        for move in board.legal_moves:
+            signature = 0
+            for square, code in move_changes(board, placement, move):
+                signature ^= square_key(int(placement[square]), square) ^ square_key(code, square)
+            self.moves[signature] = move
+
+    def __len__(self):
+        """Return the number of indexed moves."""
+        return len(self.moves)
+
+    def successor_keys(self):
+        """
+        Get the placement keys of all positions one legal move away.
+
+        Returns:
+            A set of placement keys
+        """
+        return {self.key ^ signature for signature in self.moves}
+
+    def lookup(self, key):
+        """
+        Find the legal move that leads to a placement.
+
+        Args:
+            key: The placement key of the new placement
+
+        Returns:
+            The chess.Move, or None if no single legal move leads to it
+        """
+        return self.moves.get(self.key ^ key)
+
+    def lookup_placement(self, placement):
+        """
+        Find the legal move that leads to a placement.
+
+        Args:
+            placement: The array of 64 piece codes of the new placement
+
+        Returns:
+            The chess.Move, or None if no single legal move leads to it
+        """
+        return self.lookup(placement_key(np.asarray(placement)))
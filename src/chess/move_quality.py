@@ -0,0 +1,164 @@
+"""
+Move Quality Module.
+
+This module provides maps of how good every legal move of a position is, each from
+a single MultiPV search, so the board view can colour move targets without waiting
+for the engine.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import chess
+import chess.engine
+
+from src.chess.analysis_cache import position_hash
+from src.chess.engine_pool import EnginePool
+from src.chess.review import MATE_SCORE, MAX_LOSS
+
+
+# Queue priority of quality map jobs; they are interactive, so they run before review jobs
+QUALITY_PRIORITY = 10
+
+
+class MoveQualityMap:
+    """
+    Per-position maps of the centipawn loss of each legal move.
+
+    A position is searched once on an engine pool, to a modest depth, with
+    as many lines as it has legal moves (up to `max_lines`), so every move
+    gets a score from the same search instead of one search per move. The
+    loss of a move is its score's distance from the best line, from the
+    mover's point of view; with more legal moves than lines, the weakest
+    moves are not in the map.
+
+    Only the most recently requested position is searched: requesting a
+    new one cancels a request that is still queued. Maps are kept in a
+    small LRU cache, and lookups never call the engine.
+    """
+
+    def __init__(self, pool: EnginePool, depth: int = 10, max_lines: int = 50, capacity: int = 256,
+                 on_ready: Optional[Callable[[chess.Board, Dict[chess.Move, int]], None]] = None):
+        """
+        Initialize the move quality map.
+
+        Args:
+            pool: The engine pool to search on
+            depth: Search depth of each position
+            max_lines: Maximum number of lines (MultiPV) of a search
+            capacity: Number of positions whose maps are kept
+            on_ready: Called from a pool thread with the board and its map when a map is ready
+        """
+        self.pool = pool
+        self.depth = depth
+        self.max_lines = max_lines
+        self.capacity = capacity
+        self.on_ready = on_ready
+
+        self.maps = OrderedDict()  # Position hash -> {move: centipawn loss}
+        self.pending = None        # (position hash, future) of the queued or running search
+        self.lock = threading.Lock()
+
+    def get(self, board: chess.Board) -> Optional[Dict[chess.Move, int]]:
+        """
+        Get the cached map of a position.
+
+        Args:
+            board: The chess board position
+
+        Returns:
+            A dictionary from each mapped legal move to its centipawn loss, or
+            None if the position has not been searched yet
+        """
+        key = position_hash(board)
+        with self.lock:
+            quality = self.maps.get(key)
+            if quality is not None:
+                self.maps.move_to_end(key)
+            return quality
+
+    def request(self, board: chess.Board) -> Optional[Dict[chess.Move, int]]:
+        """
+        Get the map of a position, queuing its search if it is not cached.
+
+        Args:
+            board: The chess board position, which is copied
+
+        Returns:
+            The cached map, or None if the search was queued (or there is
+            nothing to search because the game is over)
+        """
+        quality = self.get(board)
+        if quality is not None or board.is_game_over():
+            return quality
+
+        key = position_hash(board)
+        with self.lock:
+            if self.pending is not None and self.pending[0] == key:
+                return None
+            stale = self.pending
+
+            lines = min(board.legal_moves.count(), self.max_lines)
+            future = self.pool.submit(board, chess.engine.Limit(depth=self.depth), multipv=lines,
+                                      priority=QUALITY_PRIORITY)
+            self.pending = (key, future)
+
+        # A search that has not started yet is no longer needed; cancelling runs
+        # its callback, so it happens outside the lock
+        if stale is not None:
+            stale[1].cancel()
+
+        board = board.copy(stack=False)
+        future.add_done_callback(lambda done: self._on_done(key, board, done))
+        return None
+
+    def _on_done(self, key: int, board: chess.Board, future) -> None:
+        """Store the map of a finished search."""
+        with self.lock:
+            if self.pending is not None and self.pending[1] is future:
+                self.pending = None
+
+        if future.cancelled():
+            return
+        try:
+            lines = future.result()
+        except Exception as e:
+            print(f"Error mapping move quality of {board.fen()}: {e}")
+            return
+
+        quality = self._losses(board, lines)
+        if not quality:
+            return
+
+        with self.lock:
+            self.maps[key] = quality
+            self.maps.move_to_end(key)
+            while len(self.maps) > self.capacity:
+                self.maps.popitem(last=False)
+
+        if self.on_ready is not None:
+            self.on_ready(board, quality)
+
+    @staticmethod
+    def _losses(board: chess.Board, lines) -> Dict[chess.Move, int]:
+        """Get the centipawn loss of the first move of each line."""
+        scores = {}
+        for info in lines:
+            if info.get("pv") and "score" in info:
+                move = info["pv"][0]
+                score = info["score"].pov(board.turn).score(mate_score=MATE_SCORE)
+                scores.setdefault(move, score)
+
+        if not scores:
+            return {}
+        best = max(scores.values())
+        return {move: min(MAX_LOSS, best - score) for move, score in scores.items()}
+
+    def clear(self) -> None:
+        """Forget all maps and cancel the queued search."""
+        with self.lock:
+            self.maps.clear()
+            pending, self.pending = self.pending, None
+        if pending is not None:
+            pending[1].cancel()
@@ -0,0 +1,75 @@
+"""
+Opening Book Module.
+
+This module provides lookups in a local Polyglot opening book.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import chess
+import chess.polyglot
+
+
+class OpeningBook:
+    """
+    A Polyglot opening book.
+
+    The .bin file is opened with python-chess's memory-mapped reader, which
+    binary-searches the sorted 16-byte entries for the Zobrist key of a
+    position, so a lookup costs a few page reads and nothing is loaded up front.
+    A missing book file simply disables the book.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_weight: int = 1):
+        """
+        Initialize the opening book.
+
+        Args:
+            path: Path to the Polyglot .bin file, or None for no book
+            min_weight: Minimum weight of the book moves to report
+        """
+        self.path = path
+        self.min_weight = min_weight
+        self.reader = None
+
+        if path is not None and os.path.exists(path):
+            try:
+                self.reader = chess.polyglot.open_reader(path)
+                print(f"Opened opening book {path}")
+            except (OSError, ValueError) as e:
+                print(f"Error opening book {path}: {e}")
+
+    def is_open(self) -> bool:
+        """
+        Check if a book is open.
+
+        Returns:
+            True if lookups can be made, False otherwise
+        """
+        return self.reader is not None
+
+    def lookup(self, board: chess.Board) -> List[Tuple[chess.Move, int]]:
+        """
+        Get the book moves of a position.
+
+        Args:
+            board: The chess board position
+
+        Returns:
+            A list of (move, weight) pairs sorted by decreasing weight, empty
+            if the position is not in the book
+        """
+        if self.reader is None:
+            return []
+
+        entries = [(entry.move, entry.weight)
+                   for entry in self.reader.find_all(board, minimum_weight=self.min_weight)]
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        return entries
+
+    def close(self) -> None:
+        """Close the book file."""
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
@@ -0,0 +1,290 @@
+"""
+Position Module.
+
+This module provides compact integer keys for piece placements, so that detected
+positions can be compared without building FEN strings or chess.Board objects,
+and an immutable position object that carries them through the pipeline.
+"""
+
+import chess
+import numpy as np
+
+
+# Piece codes used in placement arrays (-1 marks an empty square)
+PIECE_SYMBOLS = 'PNBRQKpnbrqk'
+EMPTY = -1
+
+# Zobrist table with one random 64-bit value per (piece code, square)
+_ZOBRIST = np.random.default_rng(0x5EED).integers(
+    0, np.iinfo(np.uint64).max, size=(len(PIECE_SYMBOLS), 64), dtype=np.uint64, endpoint=True
+)
+
+_SQUARES = np.arange(64, dtype=np.intp)
+
+
+def piece_code(piece):
+    """
+    Get the placement code of a chess piece.
+
+    Args:
+        piece: A chess.Piece
+
+    Returns:
+        The piece code (0-11)
+    """
+    return PIECE_SYMBOLS.index(piece.symbol())
+
+
+def empty_placement():
+    """
+    Create an empty placement.
+
+    Returns:
+        An int8 array of 64 piece codes indexed by chess square
+    """
+    return np.full(64, EMPTY, dtype=np.int8)
+
+
+def placement_key(placement):
+    """
+    Compute the Zobrist key of a placement.
+
+    Args:
+        placement: An array of 64 piece codes indexed by chess square
+
+    Returns:
+        The key as a Python int
+    """
+    placement = np.asarray(placement)
+    occupied = placement >= 0
+    return int(np.bitwise_xor.reduce(_ZOBRIST[placement[occupied], _SQUARES[occupied]]))
+
+
+def square_key(code, square):
+    """
+    Get the Zobrist value of a piece code on a square.
+
+    XOR-ing it into a key adds or removes the piece, so keys can be updated
+    incrementally when only a few squares change.
+
+    Args:
+        code: The piece code (0-11), or EMPTY
+        square: The chess square
+
+    Returns:
+        The value as a Python int (0 for EMPTY)
+    """
+    if code < 0:
+        return 0
+    return int(_ZOBRIST[code, square])
+
+
+def placement_from_board(board):
+    """
+    Get the placement of a chess board.
+
+    Args:
+        board: A chess.Board
+
+    Returns:
+        An int8 array of 64 piece codes indexed by chess square
+    """
+    placement = empty_placement()
+    for square, piece in board.piece_map().items():
+        placement[square] = piece_code(piece)
+    return placement
+
+
+def placement_board_fen(placement):
+    """
+    Build the board part of a FEN string from a placement.
+
+    Args:
+        placement: An array of 64 piece codes indexed by chess square
+
+    Returns:
+        The board FEN, as returned by chess.Board.board_fen()
+    """
+    codes = np.asarray(placement).tolist()
+    rows = []
+
+    for rank in range(7, -1, -1):
+        row = ""
+        empty = 0
+        for code in codes[rank * 8:rank * 8 + 8]:
+            if code < 0:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += PIECE_SYMBOLS[code]
+        if empty:
+            row += str(empty)
+        rows.append(row)
+
+    return "/".join(rows)
+
+
+def touched_squares(board, move):
+    """
+    Get the squares whose contents a move changes.
+
+    Args:
+        board: The chess.Board before the move
+        move: A legal chess.Move
+
+    Returns:
+        A list of squares, including the castling rook and en passant capture
+    """
+    touched = [move.from_square, move.to_square]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        if board.is_kingside_castling(move):
+            touched += [chess.square(7, rank), chess.square(5, rank)]
+        else:
+            touched += [chess.square(0, rank), chess.square(3, rank)]
+    elif board.is_en_passant(move):
+        touched.append(chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square)))
+    return touched
+
+
+def board_key(board):
+    """
+    Compute the placement key of a chess board.
+
+    Args:
+        board: A chess.Board
+
+    Returns:
+        The key as a Python int, equal to placement_key() of its placement
+    """
+    return placement_key(placement_from_board(board))
+
+
+class Position:
+    """
+    An immutable chess position passed through the detection pipeline.
+
+    A position is created once per accepted detection and handed by reference
+    to the board view, the history and the engine. The key, the placement,
+    the board and the FEN are computed lazily and cached, so nothing is parsed
+    more than once. The board returned by the board property is shared and
+    must not be modified in place; copy it first.
+    """
+
+    __slots__ = ('_key', '_placement', '_board', '_board_fen', '_state', '_confidences')
+
+    def __init__(self, placement=None, key=None, board=None, state="w KQkq - 0 1", confidences=None):
+        """
+        Initialize the position.
+
+        Args:
+            placement: An array of 64 piece codes indexed by chess square
+            key: The Zobrist key of the placement, or None to compute it lazily
+            board: A chess.Board for the position, which the position takes ownership of
+            state: The FEN fields after the placement (side to move, castling,
+                en passant, clocks), used when no board is given
+            confidences: An array of 64 detection confidences indexed by chess
+                square (0 for empty squares), or None if not detected
+        """
+        if placement is None and board is None:
+            raise ValueError("A position needs a placement or a board")
+
+        if placement is not None:
+            placement = np.array(placement, dtype=np.int8)
+            placement.setflags(write=False)
+
+        if confidences is not None:
+            confidences = np.array(confidences, dtype=np.float32)
+            confidences.setflags(write=False)
+
+        object.__setattr__(self, '_placement', placement)
+        object.__setattr__(self, '_key', key)
+        object.__setattr__(self, '_board', board)
+        object.__setattr__(self, '_board_fen', None)
+        object.__setattr__(self, '_state', state)
+        object.__setattr__(self, '_confidences', confidences)
+
+    def __setattr__(self, name, value):
+        """Positions are immutable."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Create a position from a chess board.
+
+        Args:
+            board: A chess.Board, which is copied
+
+        Returns:
+            The position
+        """
+        return cls(board=board.copy(stack=False))
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Create a position by parsing a FEN string.
+
+        Args:
+            fen: The FEN string
+
+        Returns:
+            The position
+
+        Raises:
+            ValueError: If the FEN string is invalid
+        """
+        return cls(board=chess.Board(fen))
+
+    @property
+    def placement(self):
+        """The read-only array of 64 piece codes indexed by chess square."""
+        if self._placement is None:
+            placement = placement_from_board(self._board)
+            placement.setflags(write=False)
+            object.__setattr__(self, '_placement', placement)
+        return self._placement
+
+    @property
+    def confidences(self):
+        """The read-only array of 64 detection confidences, or None if not detected."""
+        return self._confidences
+
+    @property
+    def key(self):
+        """The Zobrist key of the placement."""
+        if self._key is None:
+            object.__setattr__(self, '_key', placement_key(self.placement))
+        return self._key
+
+    @property
+    def board_fen(self):
+        """The board part of the FEN string."""
+        if self._board_fen is None:
+            if self._board is not None:
+                board_fen = self._board.board_fen()
+            else:
+                board_fen = placement_board_fen(self._placement)
+            object.__setattr__(self, '_board_fen', board_fen)
+        return self._board_fen
+
+    @property
+    def fen(self):
+        """The full FEN string."""
+        if self._board is not None:
+            return self._board.fen()
+        return f"{self.board_fen} {self._state}"
+
+    @property
+    def board(self):
+        """The shared chess.Board for the position; copy it before modifying."""
+        if self._board is None:
+            object.__setattr__(self, '_board', chess.Board(self.fen))
+        return self._board
+
+    def __repr__(self):
+        """Return a string representation of the position."""
+        return f"Position('{self.fen}')"
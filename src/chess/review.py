@@ -0,0 +1,346 @@
+"""
+Game Review Module.
+
+This module provides incremental background review of the moves of a game as they
+are detected, so the review of the whole game is ready when the game ends.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import chess
+import chess.engine
+import chess.polyglot
+
+from src.chess.engine_pool import EnginePool
+
+
+# Queue priority of review jobs; interactive work on a shared pool uses lower values
+REVIEW_PRIORITY = 100
+
+# Centipawn loss thresholds of inaccuracies, mistakes and blunders
+INACCURACY = 50
+MISTAKE = 100
+BLUNDER = 300
+
+# Mates count as this many centipawns, and a single move loses at most this much
+MATE_SCORE = 10000
+MAX_LOSS = 1000
+
+
+class MoveReview:
+    """The review of one move: the evaluations around it and the best alternative."""
+
+    __slots__ = ('ply', 'move', 'san', 'color', 'eval_before', 'eval_after',
+                 'best_move', 'best_san', 'cp_loss', 'failed')
+
+    def __init__(self, ply, move, san, color):
+        self.ply = ply
+        self.move = move
+        self.san = san
+        self.color = color
+        self.eval_before = None  # White-relative centipawns of the best move before the move
+        self.eval_after = None   # White-relative centipawns after the move
+        self.best_move = None    # The engine's best move other than the played one
+        self.best_san = None
+        self.cp_loss = None      # Centipawns lost by the mover, 0 to MAX_LOSS
+        self.failed = False      # Whether a position of the move could not be analysed
+
+    @property
+    def is_reviewed(self) -> bool:
+        """True once both evaluations are known."""
+        return self.cp_loss is not None
+
+    @property
+    def is_done(self) -> bool:
+        """True once the move is reviewed or its review has failed."""
+        return self.is_reviewed or self.failed
+
+    @property
+    def judgement(self) -> Optional[str]:
+        """"Blunder", "Mistake" or "Inaccuracy", or None for a good or unreviewed move."""
+        if self.cp_loss is None:
+            return None
+        if self.cp_loss >= BLUNDER:
+            return "Blunder"
+        if self.cp_loss >= MISTAKE:
+            return "Mistake"
+        if self.cp_loss >= INACCURACY:
+            return "Inaccuracy"
+        return None
+
+
+class GameReview:
+    """
+    Reviews the moves of a game in the background as they are played.
+
+    Every position of the game is analysed once at a fixed node budget with
+    two lines: the evaluation after a move is the evaluation before the next
+    one, and the second line gives the best alternative when the played move
+    was the engine's first choice. Jobs run one at a time on an engine pool
+    (normally a single low-priority engine with one thread), queued at
+    REVIEW_PRIORITY, and after each job the worker pauses so the review uses
+    at most `duty_cycle` of one core.
+
+    A position whose search fails is queued again, behind the other
+    positions, up to `max_retries` times; after that the moves around it
+    are marked as failed, so the review of the game still finishes.
+
+    Stopping the review pauses it: adding moves queues them but does not
+    restart the thread, only start() does.
+    """
+
+    def __init__(self, pool: EnginePool, nodes: int = 200000, duty_cycle: float = 0.5,
+                 max_retries: int = 2, on_reviewed: Optional[Callable[[MoveReview], None]] = None):
+        """
+        Initialize the game review.
+
+        Args:
+            pool: The engine pool to analyse on
+            nodes: Node budget of each position
+            duty_cycle: Maximum fraction of the time the review keeps an engine busy
+            max_retries: Number of times a failed position is searched again
+            on_reviewed: Called from the review thread with each completed or failed MoveReview
+        """
+        self.pool = pool
+        self.nodes = nodes
+        self.duty_cycle = duty_cycle
+        self.max_retries = max_retries
+        self.on_reviewed = on_reviewed
+
+        self.moves = []        # MoveReview of each move, in game order
+        self.boards = []       # (board before, board after) of each move
+        self.evals = {}        # Zobrist hash -> (white-relative score, [best moves])
+        self.queue = deque()   # (hash, board) positions waiting for analysis
+        self.queued = set()
+        self.failures = {}     # Zobrist hash -> number of failed searches of the position
+        self.failed = set()    # Zobrist hashes of positions given up on
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.paused = False    # Set by stop(), so new moves do not restart the thread
+
+    def start(self) -> None:
+        """Start the review thread, resuming a stopped review."""
+        with self.condition:
+            self.paused = False
+            if self.running:
+                return
+            self.running = True
+
+            # A stopped worker that is still finishing a search has not left its loop
+            # yet, and simply carries on, so there is never a second worker
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Stop the review thread, pausing the review until start() is called.
+
+        Args:
+            timeout: Maximum time in seconds to wait for the thread
+        """
+        with self.condition:
+            self.paused = True
+            self.running = False
+            self.condition.notify_all()
+            thread = self.thread
+
+        # The worker forgets itself when it leaves its loop; one still inside an
+        # engine call is left to finish it
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                print("Game review is still finishing a search, it stops afterwards")
+
+    def reset(self) -> None:
+        """Forget the reviewed game, e.g. when a new game starts."""
+        with self.condition:
+            self.moves = []
+            self.boards = []
+            self.evals = {}
+            self.queue.clear()
+            self.queued.clear()
+            self.failures.clear()
+            self.failed.clear()
+
+    def add_move(self, board: chess.Board, move: chess.Move) -> MoveReview:
+        """
+        Queue a move for review.
+
+        Args:
+            board: The position before the move, which is copied
+            move: The move played
+
+        Returns:
+            The MoveReview, filled in once the review thread reaches it
+        """
+        before = board.copy(stack=False)
+        after = before.copy(stack=False)
+        after.push(move)
+
+        with self.condition:
+            review = MoveReview(len(self.moves), move, before.san(move), before.turn)
+            self.moves.append(review)
+            self.boards.append((before, after))
+
+            for position in (before, after):
+                key = chess.polyglot.zobrist_hash(position)
+                if key in self.evals or key in self.queued or key in self.failed:
+                    continue
+                if position.is_game_over():
+                    # Finished games need no search
+                    self.evals[key] = (self._final_score(position), [])
+                else:
+                    self.queue.append((key, position))
+                    self.queued.add(key)
+
+            completed = self._complete()
+            self.condition.notify_all()
+
+        if self.on_reviewed is not None:
+            for done in completed:
+                self.on_reviewed(done)
+
+        if not self.running and not self.paused:
+            self.start()
+        return review
+
+    @staticmethod
+    def _final_score(board: chess.Board) -> int:
+        """The white-relative score of a finished game."""
+        if board.is_checkmate():
+            return -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+        return 0
+
+    def _worker_loop(self) -> None:
+        """Analyse queued positions one at a time."""
+        limit = chess.engine.Limit(nodes=self.nodes)
+
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.running:
+                    self.thread = None
+                    break
+                key, board = self.queue.popleft()
+
+            started = time.perf_counter()
+            try:
+                lines = self.pool.submit(board, limit, multipv=2, priority=REVIEW_PRIORITY).result()
+            except Exception as e:
+                print(f"Error reviewing position {board.fen()}: {e}")
+                lines = []
+
+            with self.condition:
+                if lines and "score" in lines[0]:
+                    score = lines[0]["score"].white().score(mate_score=MATE_SCORE)
+                    best = [info["pv"][0] for info in lines if info.get("pv")]
+                    self.evals[key] = (score, best)
+                    self.queued.discard(key)
+                    self.failures.pop(key, None)
+                elif key in self.queued:
+                    # Try again after the other positions, or give up on the position
+                    self.failures[key] = self.failures.get(key, 0) + 1
+                    if self.failures[key] <= self.max_retries:
+                        self.queue.append((key, board))
+                    else:
+                        print(f"Giving up reviewing position {board.fen()} after {self.failures[key]} failures")
+                        self.queued.discard(key)
+                        self.failed.add(key)
+                completed = self._complete()
+
+            if self.on_reviewed is not None:
+                for review in completed:
+                    self.on_reviewed(review)
+
+            # Leave the engine idle for a while so live analysis keeps its CPU time
+            busy = time.perf_counter() - started
+            if self.duty_cycle < 1.0:
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.running,
+                                            busy * (1.0 - self.duty_cycle) / self.duty_cycle)
+
+    def _complete(self) -> List[MoveReview]:
+        """
+        Fill in the moves whose positions have both been analysed, and mark the
+        moves with a position that could not be analysed as failed.
+
+        Must be called with the condition held.
+
+        Returns:
+            The newly completed or failed move reviews
+        """
+        completed = []
+        for review, (before, after) in zip(self.moves, self.boards):
+            if review.is_done:
+                continue
+
+            before_key = chess.polyglot.zobrist_hash(before)
+            after_key = chess.polyglot.zobrist_hash(after)
+            if before_key in self.failed or after_key in self.failed:
+                review.failed = True
+                completed.append(review)
+                continue
+
+            before_eval = self.evals.get(before_key)
+            after_eval = self.evals.get(after_key)
+            if before_eval is None or after_eval is None:
+                continue
+
+            review.eval_before, best_moves = before_eval
+            review.eval_after = after_eval[0]
+
+            # The loss is measured from the mover's point of view
+            sign = 1 if review.color == chess.WHITE else -1
+            loss = sign * (review.eval_before - review.eval_after)
+            review.cp_loss = max(0, min(MAX_LOSS, loss))
+
+            alternatives = [move for move in best_moves if move != review.move]
+            if alternatives:
+                review.best_move = alternatives[0]
+                review.best_san = before.san(review.best_move)
+
+            completed.append(review)
+        return completed
+
+    def is_complete(self) -> bool:
+        """
+        Check if every move added so far has been reviewed or has failed.
+
+        Returns:
+            True if all moves are done
+        """
+        with self.condition:
+            return all(review.is_done for review in self.moves)
+
+    def summary(self) -> Dict:
+        """
+        Get a summary of the review.
+
+        Returns:
+            A dictionary with the numbers of moves, of reviewed moves and of
+            moves whose review failed, and for
+            each color ("white", "black") the average centipawn loss and the
+            numbers of inaccuracies, mistakes and blunders
+        """
+        with self.condition:
+            moves = list(self.moves)
+
+        summary = {"moves": len(moves), "reviewed": sum(review.is_reviewed for review in moves),
+                   "failed": sum(review.failed for review in moves)}
+        for color, name in ((chess.WHITE, "white"), (chess.BLACK, "black")):
+            reviewed = [review for review in moves if review.color == color and review.is_reviewed]
+            judgements = [review.judgement for review in reviewed]
+            summary[name] = {
+                "average_loss": sum(review.cp_loss for review in reviewed) / len(reviewed) if reviewed else 0.0,
+                "inaccuracies": judgements.count("Inaccuracy"),
+                "mistakes": judgements.count("Mistake"),
+                "blunders": judgements.count("Blunder")
+            }
+        return summary
@@ -0,0 +1,148 @@
+"""
+Tablebase Module.
+
+This module provides cached probing of local Syzygy endgame tablebases.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import chess
+import chess.polyglot
+import chess.syzygy
+
+
+class Tablebase:
+    """
+    Local Syzygy WDL/DTZ tablebases with a cache of probe results.
+
+    A position is probed if it has no castling rights and at most max_pieces
+    pieces. The result of each probe, including the best move, is cached by
+    the Zobrist hash of the position, so a position shown again costs one
+    dictionary lookup. The cache is shared by the threads that probe (e.g. the
+    GUI and the game review), so it is guarded by a lock; the probes themselves
+    run outside it. A missing tablebase directory disables probing.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_pieces: int = 7, cache_size: int = 10000):
+        """
+        Initialize the tablebase.
+
+        Args:
+            path: Directory of the Syzygy .rtbw/.rtbz files, or None for no tablebases
+            max_pieces: Maximum number of pieces of the available tables
+            cache_size: Maximum number of cached probe results
+        """
+        self.path = path
+        self.max_pieces = max_pieces
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.tablebase = None
+
+        if path is not None and os.path.isdir(path):
+            try:
+                self.tablebase = chess.syzygy.open_tablebase(path)
+                print(f"Opened Syzygy tablebases in {path}")
+            except OSError as e:
+                print(f"Error opening tablebases in {path}: {e}")
+
+    def is_open(self) -> bool:
+        """
+        Check if tablebases are available.
+
+        Returns:
+            True if positions can be probed, False otherwise
+        """
+        return self.tablebase is not None
+
+    def can_probe(self, board: chess.Board) -> bool:
+        """
+        Check if a position may be in the tablebases.
+
+        Args:
+            board: The chess board position
+
+        Returns:
+            True if the position has few enough pieces and no castling rights
+        """
+        return (self.tablebase is not None
+                and chess.popcount(board.occupied) <= self.max_pieces
+                and not board.castling_rights)
+
+    def probe(self, board: chess.Board) -> Optional[Tuple[int, int, Optional[chess.Move]]]:
+        """
+        Probe a position.
+
+        Args:
+            board: The chess board position
+
+        Returns:
+            A tuple (wdl, dtz, best move) from the side to move's point of view
+            (wdl 2 is a win, 0 a draw, -2 a loss; 1 and -1 are wins and losses
+            spoiled by the 50-move rule), or None if the position is not in the
+            tablebases
+        """
+        if not self.can_probe(board):
+            return None
+
+        key = chess.polyglot.zobrist_hash(board)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        try:
+            wdl = self.tablebase.probe_wdl(board)
+            dtz = self.tablebase.probe_dtz(board)
+            result = (wdl, dtz, self._best_move(board))
+        except KeyError:
+            # A table of this material is missing (MissingTableError)
+            result = None
+
+        with self.lock:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def _best_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """
+        Find the best move of a tablebase position.
+
+        Winning moves that reset the 50-move counter are preferred, then the
+        shortest distance to zeroing; losing sides take the longest one.
+        """
+        # Work on a copy, since the board may be shared with the GUI
+        board = board.copy(stack=False)
+        best = None
+        best_rank = None
+
+        for move in list(board.legal_moves):
+            zeroing = board.is_zeroing(move)
+            board.push(move)
+            try:
+                result = -self.tablebase.probe_wdl(board)
+                dtz = abs(self.tablebase.probe_dtz(board))
+            finally:
+                board.pop()
+
+            if result > 0:
+                rank = (result, zeroing, -dtz)
+            elif result < 0:
+                rank = (result, False, dtz)
+            else:
+                rank = (result, False, 0)
+
+            if best_rank is None or rank > best_rank:
+                best, best_rank = move, rank
+
+        return best
+
+    def close(self) -> None:
+        """Close the tablebase files."""
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
@@ -0,0 +1,298 @@
+"""
+Engine Tuning Module.
+
+This module calibrates the Threads and Hash options of the engine on the current
+machine by measuring its search speed, and saves the fastest configuration.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import chess
+import chess.engine
+
+
+# Saved tuning of this machine
+TUNING_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "config", "engine_tuning.json")
+
+# Positions searched when the engine has no bench command
+SEARCH_POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"
+]
+
+NPS_PATTERN = re.compile(r"Nodes/second\s*:\s*(\d+)")
+
+
+def engine_identity(engine_path: Union[str, List[str]]) -> str:
+    """
+    Identify an engine binary by name, size and modification time.
+
+    Args:
+        engine_path: The path to the engine executable, or the command line of the mock engine
+
+    Returns:
+        The identity string
+    """
+    try:
+        stat = os.stat(engine_path)
+        return f"{os.path.basename(engine_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+    except (OSError, TypeError):
+        # The mock engine is a command line rather than a binary
+        return str(engine_path)
+
+
+def load_tuning(engine_path: Union[str, List[str]], path: Optional[str] = None) -> Optional[Dict]:
+    """
+    Load the saved tuning of an engine.
+
+    The tuning only applies to the engine binary and the number of CPU cores
+    it was measured with.
+
+    Args:
+        engine_path: The path to the engine executable, or the command line of the mock engine
+        path: Path to the tuning file, or None for data/config/engine_tuning.json
+
+    Returns:
+        The tuning dictionary with "threads" and "hash" entries, or None if there
+        is no tuning for this engine and machine
+    """
+    path = path if path is not None else TUNING_CONFIG
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            tuning = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading engine tuning: {e}")
+        return None
+
+    if tuning.get("engine") != engine_identity(engine_path) or tuning.get("cpu_count") != os.cpu_count():
+        print("Engine tuning was measured with another engine or machine, ignoring it")
+        return None
+    return tuning
+
+
+class EngineTuner:
+    """
+    Measures the engine's nodes per second across thread counts and hash sizes.
+
+    The engine's bench command is run with each configuration, in a separate
+    process per run, so the live engine is not disturbed; engines without a
+    bench command are measured with fixed-node searches instead. Threads are
+    measured first, at `base_hash`, then hash sizes at the chosen thread
+    count. The engine may only use the cores the search budget allows,
+    so the cores reserved for detection are never measured or recommended.
+
+    More threads or hash only pay when they are clearly faster: the fewest
+    threads within `tolerance` of the fastest thread count are chosen, and
+    the largest hash within `tolerance` of the fastest hash size, since a
+    larger table helps long analyses without costing speed.
+    """
+
+    def __init__(self, engine_path: Union[str, List[str]], max_threads: Optional[int] = None,
+                 base_hash: int = 64, hash_sizes: Sequence[int] = (16, 64, 128, 256, 512), depth: int = 13,
+                 nodes: int = 1000000, tolerance: float = 0.05, timeout: float = 300.0):
+        """
+        Initialize the tuner.
+
+        Args:
+            engine_path: The path to the engine executable, or the command line of the mock engine
+            max_threads: Maximum number of threads, e.g. SearchBudget.threads(), or None for all cores
+            base_hash: Hash size in MB at which the thread counts are measured
+            hash_sizes: Hash sizes in MB to measure at the chosen thread count
+            depth: Search depth of each bench position
+            nodes: Node budget of each position of the fixed-node searches
+            tolerance: Fraction of the best speed within which a cheaper configuration is preferred
+            timeout: Maximum time in seconds of one bench run
+        """
+        self.engine_path = engine_path
+        self.max_threads = max_threads if max_threads is not None else (os.cpu_count() or 1)
+        self.base_hash = base_hash
+        self.hash_sizes = list(hash_sizes)
+        self.depth = depth
+        self.nodes = nodes
+        self.tolerance = tolerance
+        self.timeout = timeout
+        self.use_bench = True  # Cleared when the engine turns out to have no bench command
+
+    def thread_counts(self) -> List[int]:
+        """
+        Get the thread counts to measure: powers of two up to the maximum, and the maximum.
+
+        Returns:
+            The thread counts in increasing order
+        """
+        counts = []
+        threads = 1
+        while threads < self.max_threads:
+            counts.append(threads)
+            threads *= 2
+        counts.append(self.max_threads)
+        return counts
+
+    def measure(self, threads: int, hash_size: int) -> int:
+        """
+        Measure the speed of one configuration.
+
+        Args:
+            threads: Number of engine threads
+            hash_size: Hash size in MB
+
+        Returns:
+            The nodes per second
+        """
+        if self.use_bench:
+            nps = self._bench(threads, hash_size)
+            if nps is not None:
+                return nps
+            print("Engine has no bench command, measuring fixed-node searches")
+            self.use_bench = False
+        return self._search(threads, hash_size)
+
+    def _bench(self, threads: int, hash_size: int) -> Optional[int]:
+        """Run the engine's bench command and read its nodes per second."""
+        command = list(self.engine_path) if isinstance(self.engine_path, (list, tuple)) else [self.engine_path]
+        commands = f"uci\nsetoption name Threads value {threads}\nsetoption name Hash value {hash_size}\n" \
+                   f"bench {hash_size} {threads} {self.depth} default depth\nquit\n"
+        try:
+            result = subprocess.run(command, input=commands, capture_output=True, text=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error running engine bench: {e}")
+            return None
+
+        # Stockfish writes the bench summary to stderr
+        match = NPS_PATTERN.search(result.stderr) or NPS_PATTERN.search(result.stdout)
+        return int(match.group(1)) if match else None
+
+    def _search(self, threads: int, hash_size: int) -> int:
+        """Search fixed-node positions and measure the nodes per second."""
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
+        try:
+            engine.configure({"Threads": threads, "Hash": hash_size})
+            nodes = 0
+            elapsed = 0.0
+            for fen in SEARCH_POSITIONS:
+                board = chess.Board(fen)
+                started = time.perf_counter()
+                info = engine.analyse(board, chess.engine.Limit(nodes=self.nodes), game=object())
+                elapsed += time.perf_counter() - started
+                nodes += info.get("nodes", 0)
+        finally:
+            engine.quit()
+        return int(nodes / elapsed) if elapsed > 0 else 0
+
+    def _choose(self, speeds: Dict[int, int], prefer_larger: bool) -> int:
+        """Choose the smallest (or largest) value whose speed is within the tolerance of the best."""
+        best = max(speeds.values())
+        good = [value for value, nps in speeds.items() if nps >= best * (1.0 - self.tolerance)]
+        return max(good) if prefer_larger else min(good)
+
+    def run(self) -> Dict:
+        """
+        Measure the scaling curve and choose the configuration.
+
+        Returns:
+            The tuning dictionary: the engine identity, the CPU count and the
+            maximum threads, the chosen "threads" and "hash" with their nodes per
+            second, and the measured "threads_curve" and "hash_curve"
+        """
+        thread_speeds = {}
+        for threads in self.thread_counts():
+            thread_speeds[threads] = self.measure(threads, self.base_hash)
+            print(f"Threads {threads:3d}, Hash {self.base_hash:5d} MB: {thread_speeds[threads]:12,d} nodes/s")
+        threads = self._choose(thread_speeds, prefer_larger=False)
+
+        # The base hash size was measured with the chosen thread count already
+        hash_speeds = {self.base_hash: thread_speeds[threads]}
+        for hash_size in self.hash_sizes:
+            if hash_size in hash_speeds:
+                continue
+            hash_speeds[hash_size] = self.measure(threads, hash_size)
+            print(f"Threads {threads:3d}, Hash {hash_size:5d} MB: {hash_speeds[hash_size]:12,d} nodes/s")
+        hash_size = self._choose(hash_speeds, prefer_larger=True)
+
+        return {
+            "engine": engine_identity(self.engine_path),
+            "cpu_count": os.cpu_count(),
+            "max_threads": self.max_threads,
+            "method": "bench" if self.use_bench else "search",
+            "threads": threads,
+            "hash": hash_size,
+            "nps": hash_speeds[hash_size],
+            "threads_curve": [[count, nps] for count, nps in sorted(thread_speeds.items())],
+            "hash_curve": [[size, nps] for size, nps in sorted(hash_speeds.items())],
+            "measured": time.time()
+        }
+
+    @staticmethod
+    def save(tuning: Dict, path: Optional[str] = None) -> None:
+        """
+        Save a tuning.
+
+        Args:
+            tuning: The tuning dictionary returned by run
+            path: Path to the tuning file, or None for data/config/engine_tuning.json
+        """
+        path = path if path is not None else TUNING_CONFIG
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(tuning, f, indent=4)
+
+    @staticmethod
+    def report(tuning: Dict) -> str:
+        """
+        Format the measured scaling curve.
+
+        Args:
+            tuning: The tuning dictionary returned by run
+
+        Returns:
+            A table of the speed, speedup and per-thread efficiency of each thread
+            count, the speed of each hash size, and the chosen configuration
+        """
+        curve = tuning["threads_curve"]
+        single = curve[0][1] or 1
+        lines = [f"Engine scaling ({tuning['method']}, {tuning['max_threads']} of {tuning['cpu_count']} cores):",
+                 "Threads      Nodes/s  Speedup  Efficiency"]
+        for threads, nps in curve:
+            speedup = nps / single
+            lines.append(f"{threads:7d} {nps:12,d} {speedup:7.2f}x {speedup / threads:10.0%}")
+
+        lines.append("Hash (MB)    Nodes/s")
+        for hash_size, nps in tuning["hash_curve"]:
+            lines.append(f"{hash_size:9d} {nps:10,d}")
+
+        lines.append(f"Chosen: Threads {tuning['threads']}, Hash {tuning['hash']} MB, {tuning['nps']:,d} nodes/s")
+        return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the engine tuning command line."""
+    # Imported here, as the engine module uses this one
+    from src.chess.budget import SearchBudget
+    from src.chess.engine import find_engine
+
+    parser = argparse.ArgumentParser(description="Measure the engine speed and save the fastest Threads and Hash.")
+    parser.add_argument("--cpu-share", type=float, default=0.5,
+                        help="Fraction of the CPU cores the engine may use; detection keeps the rest")
+    parser.add_argument("--hash", type=int, nargs="+", default=[16, 64, 128, 256, 512], help="Hash sizes in MB")
+    parser.add_argument("--depth", type=int, default=13, help="Search depth of each bench position")
+    parser.add_argument("--engine-config", help="Engine configuration file, by default data/config/engine.json")
+    parser.add_argument("-o", "--output", help="Tuning file, by default data/config/engine_tuning.json")
+    args = parser.parse_args(argv)
+
+    tuner = EngineTuner(find_engine(args.engine_config), max_threads=SearchBudget(cpu_share=args.cpu_share).threads(),
+                        hash_sizes=args.hash, depth=args.depth)
+    tuning = tuner.run()
+    EngineTuner.save(tuning, args.output)
+    print(EngineTuner.report(tuning))
@@ -0,0 +1,298 @@
+"""
+Engine Watchdog Module.
+
+This module provides health checking and instant failover of engine processes: a
+supervisor pings the engine with isready and keeps a pre-started, pre-configured
+standby process to switch to when the engine dies or hangs.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import chess.engine
+
+
+class EngineHealth:
+    """Crash, hang and restart metrics of an engine."""
+
+    def __init__(self, history: int = 100):
+        """
+        Initialize the metrics.
+
+        Args:
+            history: Number of failover and respawn times to remember
+        """
+        self.crashes = 0
+        self.hangs = 0
+        self.ping_failures = 0
+        self.failovers = 0
+        self.cold_restarts = 0  # Failures without a ready standby
+        self.failover_times = deque(maxlen=history)  # Seconds to switch to another process
+        self.respawn_times = deque(maxlen=history)   # Seconds to start a standby process
+        self.last_failure = None
+
+    def record_failure(self, reason: str) -> None:
+        """
+        Record an engine failure.
+
+        Args:
+            reason: "crash", "hang" or "ping"
+        """
+        if reason == "crash":
+            self.crashes += 1
+        elif reason == "hang":
+            self.hangs += 1
+        else:
+            self.ping_failures += 1
+        self.last_failure = time.time()
+
+    def record_failover(self, seconds: float, standby: bool) -> None:
+        """Record a switch to a new engine process, from the standby or cold."""
+        self.failovers += 1
+        if not standby:
+            self.cold_restarts += 1
+        self.failover_times.append(seconds)
+        print(f"Engine failover to {'standby' if standby else 'new'} process in {seconds * 1000:.1f} ms")
+
+    def record_respawn(self, seconds: float) -> None:
+        """Record the start of a standby process."""
+        self.respawn_times.append(seconds)
+
+    def stats(self) -> Dict:
+        """
+        Get the metrics.
+
+        Returns:
+            A dictionary with the failure counts, the number of failovers and
+            cold restarts, and the mean and maximum failover and respawn times
+            in seconds
+        """
+        failovers = list(self.failover_times)
+        respawns = list(self.respawn_times)
+        return {
+            "crashes": self.crashes,
+            "hangs": self.hangs,
+            "ping_failures": self.ping_failures,
+            "failovers": self.failovers,
+            "cold_restarts": self.cold_restarts,
+            "mean_failover": sum(failovers) / len(failovers) if failovers else 0.0,
+            "max_failover": max(failovers) if failovers else 0.0,
+            "mean_respawn": sum(respawns) / len(respawns) if respawns else 0.0,
+            "last_failure": self.last_failure
+        }
+
+
+class EngineSupervisor:
+    """
+    Keeps a StockfishEngine's process healthy.
+
+    A standby process is started and configured in the background, so a
+    failed engine is replaced by swapping in the standby, which takes
+    milliseconds; a new standby is then started in the background. A watchdog
+    thread pings the idle engine and the standby with isready. A ping would
+    stop a running search, so the engine is only pinged while it is idle
+    (its lock is free); a search that does not return is caught by the
+    command timeout of the engines it opens, which is shorter than the
+    python-chess default. The standby is taken out of its slot while it is
+    pinged, so a failover never waits for a ping or takes an engine that is
+    being pinged, and a standby that failed its ping is never handed out.
+    """
+
+    def __init__(self, config, ping_interval: float = 2.0, ping_timeout: float = 2.0,
+                 command_timeout: float = 3.0):
+        """
+        Initialize the supervisor.
+
+        Args:
+            config: The StockfishEngine whose path, options and lock are used
+            ping_interval: Seconds between health checks
+            ping_timeout: Seconds to wait for readyok before the engine counts as hung
+            command_timeout: Seconds an engine command may take beyond its search
+                time limit before the engine counts as hung
+        """
+        self.config = config
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.command_timeout = command_timeout
+        self.health = EngineHealth()
+
+        self.standby = None
+        self.standby_lock = threading.Lock()
+        self.spawning = False
+        self.running = False
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        """Start the standby process and the watchdog thread."""
+        if self.running:
+            return
+        self.running = True
+        self.wake.clear()
+        self._respawn()
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the watchdog thread and quit the standby process."""
+        self.running = False
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(self.ping_timeout + 1.0)
+        self.thread = None
+
+        with self.standby_lock:
+            standby, self.standby = self.standby, None
+        self._close(standby)
+
+    def open_engine(self) -> chess.engine.SimpleEngine:
+        """
+        Start and configure an engine process.
+
+        Returns:
+            The engine
+        """
+        engine = chess.engine.SimpleEngine.popen_uci(self.config.engine_path, timeout=self.command_timeout)
+        engine.configure(self.config.engine_options())
+        return engine
+
+    def configure(self, options: Dict) -> None:
+        """
+        Apply changed UCI options to the standby process.
+
+        Args:
+            options: The changed option values
+        """
+        with self.standby_lock:
+            if self.standby is not None:
+                try:
+                    self.standby.configure(options)
+                except Exception as e:
+                    print(f"Error configuring the standby engine: {e}")
+
+    def failover(self, failed: Optional[chess.engine.SimpleEngine],
+                 reason: str = "crash") -> Optional[chess.engine.SimpleEngine]:
+        """
+        Replace a failed engine process.
+
+        Args:
+            failed: The failed engine, which is closed in the background, or None
+            reason: "crash", "hang" or "ping"
+
+        Returns:
+            The standby engine if one is ready, otherwise a newly started one,
+            or None if no engine could be started
+        """
+        started = time.perf_counter()
+        self.health.record_failure(reason)
+        if failed is not None:
+            threading.Thread(target=self._close, args=(failed,), daemon=True).start()
+
+        with self.standby_lock:
+            engine, self.standby = self.standby, None
+
+        standby = engine is not None
+        if engine is None:
+            try:
+                engine = self.open_engine()
+            except Exception as e:
+                print(f"Error starting a replacement engine: {e}")
+                engine = None
+
+        if engine is not None:
+            self.health.record_failover(time.perf_counter() - started, standby)
+
+        # Prepare the next standby
+        if self.running:
+            self._respawn()
+        return engine
+
+    def _respawn(self) -> None:
+        """Start a standby process in the background unless one is ready or starting."""
+        with self.standby_lock:
+            if self.standby is not None or self.spawning:
+                return
+            self.spawning = True
+        threading.Thread(target=self._spawn_standby, daemon=True).start()
+
+    def _spawn_standby(self) -> None:
+        """Start and configure a standby process."""
+        started = time.perf_counter()
+        try:
+            engine = self.open_engine()
+        except Exception as e:
+            print(f"Error starting the standby engine: {e}")
+            engine = None
+
+        with self.standby_lock:
+            self.spawning = False
+            if engine is not None and self.running and self.standby is None:
+                self.standby = engine
+                engine = None
+                self.health.record_respawn(time.perf_counter() - started)
+
+        # Not needed any more
+        self._close(engine)
+
+    def _ping(self, engine: chess.engine.SimpleEngine) -> bool:
+        """Check that an idle engine, which no one else is using, answers isready within the ping timeout."""
+        # SimpleEngine.ping waits for the engine's command timeout
+        timeout, engine.timeout = engine.timeout, self.ping_timeout
+        try:
+            engine.ping()
+            return True
+        except Exception:
+            return False
+        finally:
+            engine.timeout = timeout
+
+    def _watch(self) -> None:
+        """Ping the idle engine and the standby until stopped."""
+        while not self.wake.wait(self.ping_interval):
+            if not self.running:
+                break
+
+            # The engine is only pinged while no search holds its lock
+            config = self.config
+            if config.engine is not None and config.lock.acquire(blocking=False):
+                try:
+                    if config.engine is not None and not self._ping(config.engine):
+                        print("Engine did not answer isready, failing over")
+                        config.engine = self.failover(config.engine, "ping")
+                finally:
+                    config.lock.release()
+
+            # The standby is taken out of its slot while it is pinged, so a failover
+            # meanwhile starts a new engine instead of waiting for the ping
+            with self.standby_lock:
+                standby, self.standby = self.standby, None
+            if standby is None:
+                continue
+
+            if self._ping(standby):
+                with self.standby_lock:
+                    if self.running and self.standby is None:
+                        self.standby, standby = standby, None
+                # A new standby was started meanwhile, or the supervisor stopped
+                self._close(standby)
+                continue
+
+            print("Standby engine did not answer isready, respawning")
+            self.health.record_failure("ping")
+            self._close(standby)
+            self._respawn()
+
+    @staticmethod
+    def _close(engine: Optional[chess.engine.SimpleEngine]) -> None:
+        """Quit an engine process, killing it if it does not answer."""
+        if engine is None:
+            return
+        try:
+            engine.quit()
+        except Exception:
+            try:
+                engine.close()
+            except Exception:
+                pass
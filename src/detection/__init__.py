@@ -6,5 +6,8 @@ This module provides functionality for detecting chess pieces using a YOLO model
 
 from src.detection.detector import ChessPieceDetector
 from src.detection.fen_generator import FENGenerator
+from src.detection.grid import BoardGrid
+from src.detection.prefilter import PlausibilityFilter
+from src.detection.stability import StabilityTracker
 
-__all__ = ['ChessPieceDetector', 'FENGenerator']
+__all__ = ['ChessPieceDetector', 'FENGenerator', 'BoardGrid', 'PlausibilityFilter', 'StabilityTracker']
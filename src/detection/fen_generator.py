@@ -5,6 +5,22 @@ This module provides functionality for generating FEN notation from detected che
 """
 
 import chess
+import numpy as np
+
+from src.chess.position import (
+    EMPTY, empty_placement, piece_code, placement_board_fen, placement_key
+)
+from src.detection.grid import BoardGrid
+from src.detection.orientation import OrientationTracker
+
+
+# Chess squares for each screen cell (row * 8 + column, row 0 at the top)
+_CELL_TO_SQUARE_WHITE_BOTTOM = np.array(
+    [chess.square(cell % 8, 7 - cell // 8) for cell in range(64)], dtype=np.intp
+)
+_CELL_TO_SQUARE_BLACK_BOTTOM = np.array(
+    [chess.square(7 - cell % 8, cell // 8) for cell in range(64)], dtype=np.intp
+)
 
 
 class FENGenerator:
@@ -22,9 +38,12 @@ class FENGenerator:
         Args:
             board_size: Size of the chess board (width, height)
         """
-        self.board_size = board_size
+        self.board_size = tuple(board_size)
         self.square_size = (board_size[0] // 8, board_size[1] // 8)
 
+        # Pixel-to-square lookup table for the captured region
+        self.grid = BoardGrid(board_size)
+
         # Initialize the chess board
         self.board = chess.Board()
 
@@ -44,36 +63,86 @@ class FENGenerator:
             'bk': chess.Piece(chess.KING, chess.BLACK)
         }
 
+        # Map piece classes to placement codes
+        self.class_codes = {piece_class: piece_code(piece) for piece_class, piece in self.piece_map.items()}
+
         # Flag to track board orientation (True if white is at the bottom)
         self.white_at_bottom = True
 
-    def detect_orientation(self, detected_pieces):
+        # Orientation tracker that caches the orientation for the current game
+        self.orientation = OrientationTracker()
+
+    def set_board_size(self, board_size):
+        """
+        Set the size of the captured board region.
+
+        This rebuilds the pixel-to-square lookup table and discards any
+        previous grid calibration.
+
+        Args:
+            board_size: Size of the captured board region (width, height)
+        """
+        self.board_size = tuple(board_size)
+        self.square_size = (board_size[0] // 8, board_size[1] // 8)
+        self.grid.set_board_size(board_size)
+
+    def _map_detections(self, detected_pieces):
+        """
+        Map the detected pieces to screen cells.
+
+        The grid is calibrated from the first confident frame. All centers are
+        then mapped to screen cells with a single lookup table gather.
+
+        Args:
+            detected_pieces: List of detected pieces
+
+        Returns:
+            A tuple (classes, cells) of piece class names and screen cell indices
+        """
+        classes = [piece["class"] for piece in detected_pieces]
+        centers = np.array([piece["center"] for piece in detected_pieces], dtype=np.intp).reshape(-1, 2)
+
+        if not self.grid.calibrated:
+            confidences = [piece.get("confidence", 1.0) for piece in detected_pieces]
+            self.grid.calibrate(centers, confidences)
+
+        return classes, self.grid.map_centers(centers)
+
+    def detect_orientation(self, detected_pieces, cells=None):
         """
         Detect the orientation of the chess board.
 
+        The orientation is cached per game by the orientation tracker, so in
+        steady state this does no per-frame work.
+
         Args:
             detected_pieces: List of detected pieces
+            cells: Screen cell indices of the pieces, or None to compute them
 
         Returns:
             True if white is at the bottom, False otherwise
         """
-        # Count white and black pieces in the bottom half of the board
-        white_bottom = 0
-        black_bottom = 0
+        if cells is None:
+            classes, cells = self._map_detections(detected_pieces)
+        else:
+            classes = [piece["class"] for piece in detected_pieces]
 
-        for piece in detected_pieces:
-            # Get the piece center
-            _, center_y = piece["center"]
+        self.white_at_bottom = self.orientation.update(classes, cells)
+        return self.white_at_bottom
+
+    def reset_orientation(self):
+        """Forget the cached board orientation, e.g. when a new game starts."""
+        self.orientation.reset()
+        self.white_at_bottom = self.orientation.white_at_bottom
 
-            # Check if the piece is in the bottom half of the board
-            if center_y > self.board_size[1] // 2:
-                if piece["class"].startswith("w"):
-                    white_bottom += 1
-                elif piece["class"].startswith("b"):
-                    black_bottom += 1
+    def flip_orientation(self):
+        """
+        Flip the cached board orientation in response to an explicit flip event.
 
-        # Determine orientation based on which color has more pieces in the bottom half
-        self.white_at_bottom = white_bottom >= black_bottom
+        Returns:
+            True if white is now at the bottom, False otherwise
+        """
+        self.white_at_bottom = self.orientation.flip()
         return self.white_at_bottom
 
     def center_to_square(self, center):
@@ -86,59 +155,71 @@ class FENGenerator:
         Returns:
             A chess.Square representing the square
         """
-        x, y = center
+        cell = self.grid.map_centers([center])[0]
+        return int(self._cell_to_square()[cell])
 
-        # Calculate the file and rank indices (0-7)
-        file_idx = min(7, max(0, int(x * 8 / self.board_size[0])))
-        rank_idx = min(7, max(0, int(y * 8 / self.board_size[1])))
+    def _cell_to_square(self):
+        """
+        Get the screen cell to chess square table for the current orientation.
 
-        # Adjust for board orientation
+        Returns:
+            An array of 64 chess squares indexed by screen cell
+        """
+        # If white is at the bottom, rank 0 is at the bottom (rows are flipped);
+        # if black is at the bottom, file 0 is at the right (columns are flipped)
         if self.white_at_bottom:
-            # If white is at the bottom, rank 0 is at the bottom (rank_idx needs to be flipped)
-            rank_idx = 7 - rank_idx
-        else:
-            # If black is at the bottom, file 0 is at the right (file_idx needs to be flipped)
-            file_idx = 7 - file_idx
-
-        # Convert to chess.Square
-        return chess.square(file_idx, rank_idx)
+            return _CELL_TO_SQUARE_WHITE_BOTTOM
+        return _CELL_TO_SQUARE_BLACK_BOTTOM
 
-    def generate_fen(self, detected_pieces):
+    def generate_placement(self, detected_pieces):
         """
-        Generate FEN notation from detected pieces.
+        Resolve detected pieces into a placement and its integer key.
+
+        This is the per-frame path: no FEN string or chess.Board is built.
+        When several pieces map to the same square, the most confident wins.
 
         Args:
             detected_pieces: List of detected pieces
 
         Returns:
-            The FEN notation for the detected position
+            A tuple (key, placement, confidences) where placement is an int8
+            array of 64 piece codes indexed by chess square, key is its Zobrist
+            key and confidences holds the detection confidence of each square
+            (0 for empty squares)
         """
-        # Detect board orientation
-        self.detect_orientation(detected_pieces)
+        # Map all detections to screen cells in one gather
+        classes, cells = self._map_detections(detected_pieces)
 
-        # Create a new empty board
-        self.board.clear()
+        # Detect board orientation (cached per game by the orientation tracker)
+        self.white_at_bottom = self.orientation.update(classes, cells)
 
-        # Place the detected pieces on the board
-        for piece in detected_pieces:
-            # Get the piece class and center
-            piece_class = piece["class"]
-            center = piece["center"]
+        # Convert the screen cells to chess squares for this orientation
+        squares = self._cell_to_square()[cells]
 
-            # Skip if the piece class is not in the piece map
-            if piece_class not in self.piece_map:
-                continue
+        # Look up the piece codes, skipping classes that are not in the piece map
+        codes = np.array([self.class_codes.get(piece_class, EMPTY) for piece_class in classes], dtype=np.int8)
+        confidences = np.array([piece.get("confidence", 1.0) for piece in detected_pieces])
+        known = codes >= 0
 
-            # Get the chess piece and square
-            chess_piece = self.piece_map[piece_class]
-            square = self.center_to_square(center)
+        # Place the pieces in order of increasing confidence, so the most confident one wins a square
+        order = np.argsort(confidences[known], kind='stable')
+        placement = empty_placement()
+        placement[squares[known][order]] = codes[known][order]
+        square_confidences = np.zeros(64, dtype=np.float32)
+        square_confidences[squares[known][order]] = confidences[known][order]
 
-            # Place the piece on the board
-            self.board.set_piece_at(square, chess_piece)
+        return placement_key(placement), placement, square_confidences
 
-        # Generate the board part of the FEN
-        board_fen = self.board.board_fen()
+    def placement_to_fen(self, placement):
+        """
+        Build a FEN string from a placement.
+
+        Args:
+            placement: An array of 64 piece codes indexed by chess square
 
+        Returns:
+            The FEN notation for the placement
+        """
         # Set default values for the rest of the FEN components
         # Assume white to move, all castling rights, no en passant, 0 halfmove clock, 1 fullmove number
         side_to_move = 'w'
@@ -148,9 +229,25 @@ class FENGenerator:
         fullmove_number = '1'
 
         # Combine all components to create the full FEN
-        fen = f"{board_fen} {side_to_move} {castling} {en_passant} {halfmove_clock} {fullmove_number}"
+        board_fen = placement_board_fen(placement)
+        return f"{board_fen} {side_to_move} {castling} {en_passant} {halfmove_clock} {fullmove_number}"
+
+    def generate_fen(self, detected_pieces):
+        """
+        Generate FEN notation from detected pieces.
+
+        Args:
+            detected_pieces: List of detected pieces
+
+        Returns:
+            The FEN notation for the detected position
+        """
+        _, placement, _ = self.generate_placement(detected_pieces)
+
+        # Keep the board in sync with the generated position
+        self.board.set_board_fen(placement_board_fen(placement))
 
-        return fen
+        return self.placement_to_fen(placement)
 
     def get_board(self):
         """
@@ -0,0 +1,166 @@
+"""
+Board Grid Module.
+
+This module provides a pixel-to-square lookup table for the captured board region,
+together with a calibration step that fits the 8x8 grid to the observed board.
+"""
+
+import numpy as np
+
+
+class BoardGrid:
+    """
+    A calibrated 8x8 grid over the captured board region.
+
+    The grid is described by the pixel edges of its files and rows. From these
+    edges a lookup table is built that maps every pixel of the region to a
+    screen cell index (row * 8 + column, row 0 at the top), so that mapping all
+    detections of a frame is a single NumPy gather.
+    """
+
+    # Minimum number of detections required to calibrate the grid
+    MIN_CALIBRATION_PIECES = 12
+
+    # Minimum mean confidence of a frame used for calibration
+    MIN_CALIBRATION_CONFIDENCE = 0.7
+
+    # Maximum relative deviation of a fitted cell size from the nominal one
+    MAX_CELL_DEVIATION = 0.2
+
+    def __init__(self, board_size=(395, 395)):
+        """
+        Initialize the board grid.
+
+        Args:
+            board_size: Size of the captured board region (width, height)
+        """
+        self.board_size = (0, 0)
+        self.calibrated = False
+        self.set_board_size(board_size)
+
+    def set_board_size(self, board_size):
+        """
+        Set the size of the captured region and reset the grid to a uniform one.
+
+        Args:
+            board_size: Size of the captured board region (width, height)
+        """
+        width, height = int(board_size[0]), int(board_size[1])
+        self.board_size = (width, height)
+        self.calibrated = False
+        self._set_edges(
+            np.linspace(0.0, width, 9),
+            np.linspace(0.0, height, 9)
+        )
+
+    def _set_edges(self, x_edges, y_edges):
+        """
+        Set the grid edges and rebuild the lookup table.
+
+        Args:
+            x_edges: Array of 9 column edges in pixels
+            y_edges: Array of 9 row edges in pixels
+        """
+        self.x_edges = np.asarray(x_edges, dtype=np.float64)
+        self.y_edges = np.asarray(y_edges, dtype=np.float64)
+
+        width, height = self.board_size
+
+        # Map every pixel column/row to a grid column/row, clamped to the board
+        columns = np.searchsorted(self.x_edges[1:-1], np.arange(width) + 0.5, side='right')
+        rows = np.searchsorted(self.y_edges[1:-1], np.arange(height) + 0.5, side='right')
+
+        # Lookup table from (y, x) pixel to screen cell index
+        self.lut = (rows[:, None] * 8 + columns[None, :]).astype(np.int8)
+
+    @property
+    def cell_size(self):
+        """The mean cell size (width, height) in pixels."""
+        return (
+            (self.x_edges[-1] - self.x_edges[0]) / 8.0,
+            (self.y_edges[-1] - self.y_edges[0]) / 8.0
+        )
+
+    def map_centers(self, centers):
+        """
+        Map pixel centers to screen cell indices.
+
+        Args:
+            centers: Array-like of shape (n, 2) with (x, y) pixel coordinates
+
+        Returns:
+            An int array of n cell indices (row * 8 + column, row 0 at the top)
+        """
+        centers = np.asarray(centers, dtype=np.intp).reshape(-1, 2)
+        xs = np.clip(centers[:, 0], 0, self.board_size[0] - 1)
+        ys = np.clip(centers[:, 1], 0, self.board_size[1] - 1)
+        return self.lut[ys, xs].astype(np.intp)
+
+    def calibrate(self, centers, confidences):
+        """
+        Fit the grid to the observed piece centers.
+
+        Each piece is assumed to sit in the middle of its cell, so the center
+        of a piece in column c is x0 + (c + 0.5) * w. The offset and the cell
+        size are fitted by least squares, independently for both axes, which
+        accounts for board borders and non-square cells.
+
+        Args:
+            centers: Array-like of shape (n, 2) with (x, y) pixel coordinates
+            confidences: Array-like of n detection confidences
+
+        Returns:
+            True if the grid was calibrated from this frame, False otherwise
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        confidences = np.asarray(confidences, dtype=np.float64)
+
+        # Only calibrate from a confident frame with enough pieces
+        if len(centers) < self.MIN_CALIBRATION_PIECES:
+            return False
+        if confidences.mean() < self.MIN_CALIBRATION_CONFIDENCE:
+            return False
+
+        x_fit = self._fit_axis(centers[:, 0], self.x_edges, self.board_size[0])
+        y_fit = self._fit_axis(centers[:, 1], self.y_edges, self.board_size[1])
+
+        if x_fit is None or y_fit is None:
+            return False
+
+        self._set_edges(x_fit, y_fit)
+        self.calibrated = True
+        return True
+
+    def _fit_axis(self, coords, edges, extent):
+        """
+        Fit the grid edges along one axis.
+
+        Args:
+            coords: Piece center coordinates along the axis
+            edges: Current grid edges along the axis
+            extent: Size of the captured region along the axis
+
+        Returns:
+            An array of 9 fitted edges, or None if the fit is not plausible
+        """
+        nominal = extent / 8.0
+
+        for _ in range(3):
+            # Assign each center to a cell index using the current edges
+            indices = np.clip(np.searchsorted(edges[1:-1], coords, side='right'), 0, 7)
+
+            # At least two distinct cells are needed to fit a slope
+            if len(np.unique(indices)) < 2:
+                return None
+
+            # Least-squares fit of coords = origin + (index + 0.5) * size
+            design = np.column_stack((np.ones_like(coords), indices + 0.5))
+            (origin, size), *_ = np.linalg.lstsq(design, coords, rcond=None)
+
+            # Reject fits that are far from the expected cell size
+            if abs(size - nominal) > self.MAX_CELL_DEVIATION * nominal:
+                return None
+
+            edges = origin + size * np.arange(9)
+
+        return edges
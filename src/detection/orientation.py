@@ -0,0 +1,135 @@
+"""
+Board Orientation Module.
+
+This module provides functionality for determining whether white or black pieces
+are at the bottom of the captured board, with hysteresis across frames.
+"""
+
+import numpy as np
+
+
+class OrientationTracker:
+    """
+    A class for tracking the board orientation over a game.
+
+    The orientation is decided once from strong evidence (the rows of the kings
+    and pawns) and cached. Once locked, the evidence is only re-examined every
+    few frames, and the orientation changes only after sustained contrary
+    evidence or an explicit flip.
+    """
+
+    # Piece classes that indicate which side of the board a color plays from
+    EVIDENCE_CLASSES = {'wp': 1.0, 'wk': 1.0, 'bp': -1.0, 'bk': -1.0}
+
+    # Minimum number of kings and pawns required for a decision
+    MIN_EVIDENCE_PIECES = 4
+
+    # Minimum mean row offset (in rows from the middle) for strong evidence
+    STRONG_MARGIN = 1.5
+
+    # Number of frames between evidence checks once the orientation is locked
+    RECHECK_INTERVAL = 30
+
+    # Number of consecutive contrary checks required to change the orientation
+    FLIP_AFTER = 3
+
+    def __init__(self):
+        """Initialize the orientation tracker."""
+        self.white_at_bottom = True
+        self.locked = False
+        self.frames_since_check = 0
+        self.contrary_checks = 0
+
+    def reset(self):
+        """Forget the cached orientation, e.g. when a new game starts."""
+        self.white_at_bottom = True
+        self.locked = False
+        self.frames_since_check = 0
+        self.contrary_checks = 0
+
+    def flip(self):
+        """
+        Flip the cached orientation in response to an explicit flip event.
+
+        Returns:
+            True if white is now at the bottom, False otherwise
+        """
+        self.set_orientation(not self.white_at_bottom)
+        return self.white_at_bottom
+
+    def set_orientation(self, white_at_bottom):
+        """
+        Set and lock the orientation.
+
+        Args:
+            white_at_bottom: True if white is at the bottom, False otherwise
+        """
+        self.white_at_bottom = white_at_bottom
+        self.locked = True
+        self.frames_since_check = 0
+        self.contrary_checks = 0
+
+    def evidence(self, classes, cells):
+        """
+        Measure the orientation evidence in a frame.
+
+        White kings and pawns below the middle of the board and black ones
+        above it count towards white being at the bottom.
+
+        Args:
+            classes: List of piece class names
+            cells: Array of screen cell indices (row * 8 + column, row 0 at the top)
+
+        Returns:
+            A tuple (score, count) where score is the mean row offset from the
+            middle (positive if white is at the bottom) and count is the number
+            of pieces that contributed
+        """
+        signs = np.array([self.EVIDENCE_CLASSES.get(piece_class, 0.0) for piece_class in classes])
+        mask = signs != 0.0
+        count = int(np.count_nonzero(mask))
+        if count == 0:
+            return 0.0, 0
+
+        offsets = np.asarray(cells)[mask] // 8 - 3.5
+        return float(np.mean(signs[mask] * offsets)), count
+
+    def update(self, classes, cells):
+        """
+        Update the orientation from a frame.
+
+        Args:
+            classes: List of piece class names
+            cells: Array of screen cell indices (row * 8 + column, row 0 at the top)
+
+        Returns:
+            True if white is at the bottom, False otherwise
+        """
+        if self.locked:
+            # In steady state the cached orientation is returned without any work
+            self.frames_since_check += 1
+            if self.frames_since_check < self.RECHECK_INTERVAL:
+                return self.white_at_bottom
+            self.frames_since_check = 0
+
+            score, count = self.evidence(classes, cells)
+            if count >= self.MIN_EVIDENCE_PIECES and abs(score) >= self.STRONG_MARGIN \
+                    and (score > 0) != self.white_at_bottom:
+                self.contrary_checks += 1
+                if self.contrary_checks >= self.FLIP_AFTER:
+                    print(f"Board orientation changed after {self.contrary_checks} contrary checks")
+                    self.set_orientation(score > 0)
+            else:
+                self.contrary_checks = 0
+            return self.white_at_bottom
+
+        score, count = self.evidence(classes, cells)
+
+        if count >= self.MIN_EVIDENCE_PIECES and abs(score) >= self.STRONG_MARGIN:
+            # Strong evidence, lock the orientation for the rest of the game
+            self.set_orientation(score > 0)
+        elif count > 0:
+            # Weak evidence, use it provisionally without locking
+            self.white_at_bottom = score >= 0
+
+        return self.white_at_bottom
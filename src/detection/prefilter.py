@@ -0,0 +1,127 @@
+"""
+Plausibility Prefilter Module.
+
+This module provides a cheap check on the raw detections of a frame, so that
+implausible frames are rejected before any position is built from them.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+
+class PlausibilityFilter:
+    """
+    A class for rejecting implausible frames from their raw detections.
+
+    The checks work on the piece counts per class and the screen rows of the
+    pawns, and compare the total piece count with the last accepted game
+    position (after move reconstruction, so a detection error that the game
+    corrected does not carry over into the reference).
+    Rejections are counted per reason.
+    """
+
+    # Detector classes in placement code order (white pieces, then black pieces)
+    CLASSES = ['wp', 'wn', 'wb', 'wr', 'wq', 'wk', 'bp', 'bn', 'bb', 'br', 'bq', 'bk']
+
+    def __init__(self, max_missing=4, max_extra=0, patience=20):
+        """
+        Initialize the plausibility filter.
+
+        Args:
+            max_missing: Maximum number of pieces fewer than the last accepted position
+            max_extra: Maximum number of pieces more than the last accepted position
+            patience: Number of consecutive frames rejected only for their piece
+                count after which the new count is trusted (e.g. a new game)
+        """
+        self.class_codes = {piece_class: code for code, piece_class in enumerate(self.CLASSES)}
+        self.max_missing = max_missing
+        self.max_extra = max_extra
+        self.patience = patience
+        self.reference_count = None
+        self.count_rejections_in_row = 0
+        self.rejections = Counter()
+        self.checked = 0
+
+    def reset(self):
+        """Forget the last accepted position, e.g. when a new game starts."""
+        self.reference_count = None
+        self.count_rejections_in_row = 0
+
+    def set_reference(self, piece_count):
+        """
+        Set the piece count of the last accepted position.
+
+        Args:
+            piece_count: Number of pieces in the accepted position
+        """
+        self.reference_count = int(piece_count)
+        self.count_rejections_in_row = 0
+
+    def check(self, detected_pieces, grid):
+        """
+        Check whether a frame's detections can be a real position.
+
+        Args:
+            detected_pieces: List of detected pieces
+            grid: The BoardGrid used to map piece centers to screen cells
+
+        Returns:
+            None if the frame is plausible, otherwise the rejection reason
+        """
+        self.checked += 1
+        reason = self._check(detected_pieces, grid)
+        if reason is not None:
+            self.rejections[reason] += 1
+        return reason
+
+    def _check(self, detected_pieces, grid):
+        """Run the checks and return the first failing reason, or None."""
+        if not detected_pieces:
+            return "no_pieces"
+
+        codes = np.array([self.class_codes.get(piece["class"], -1) for piece in detected_pieces])
+        codes = codes[codes >= 0]
+        counts = np.bincount(codes, minlength=12)
+
+        # Exactly one king per side
+        if counts[5] == 0 or counts[11] == 0:
+            return "missing_king"
+        if counts[5] > 1 or counts[11] > 1:
+            return "extra_king"
+
+        # At most 8 pawns and 16 pieces per side
+        if counts[0] > 8 or counts[6] > 8:
+            return "too_many_pawns"
+        if counts[:6].sum() > 16 or counts[6:].sum() > 16:
+            return "too_many_pieces"
+
+        # Pawns can never stand on the first or last rank, which are the top and
+        # bottom screen rows in either orientation
+        is_pawn = np.array([piece["class"] in ('wp', 'bp') for piece in detected_pieces])
+        if is_pawn.any():
+            centers = np.array([piece["center"] for piece in detected_pieces], dtype=np.intp).reshape(-1, 2)[is_pawn]
+            rows = grid.map_centers(centers) // 8
+            if np.any((rows == 0) | (rows == 7)):
+                return "pawn_on_back_rank"
+
+        # Compare the total count with the last accepted position
+        total = int(counts.sum())
+        if self.reference_count is not None:
+            if total < self.reference_count - self.max_missing or total > self.reference_count + self.max_extra:
+                self.count_rejections_in_row += 1
+                if self.count_rejections_in_row < self.patience:
+                    return "piece_count_jump"
+            else:
+                self.count_rejections_in_row = 0
+
+        return None
+
+    def summary(self):
+        """
+        Get a short summary of the rejections.
+
+        Returns:
+            A string such as "missing_king: 3, piece_count_jump: 1"
+        """
+        return ", ".join(f"{reason}: {count}" for reason, count in self.rejections.most_common())
@@ -0,0 +1,117 @@
+"""
+Position Stability Module.
+
+This module provides functionality for deciding when a detected position is stable
+enough to be accepted, working on integer position keys.
+"""
+
+import time
+from collections import deque
+
+
+class StabilityTracker:
+    """
+    A class for tracking the stability of detected positions.
+
+    Each frame is reduced to an integer position key. A position is accepted
+    once the same key has been seen in enough consecutive frames and it differs
+    from the last accepted position. The number of frames required depends on
+    the position: a placement one legal move away from the current game
+    position is accepted after fast_threshold frames, anything else needs the
+    full threshold.
+    """
+
+    def __init__(self, threshold=10, fast_threshold=2, history_size=5, latency_history=100):
+        """
+        Initialize the stability tracker.
+
+        Args:
+            threshold: Number of consecutive identical keys required for an
+                unreachable or implausible position
+            fast_threshold: Number of consecutive identical keys required for a
+                position one legal move away from the current game position
+            history_size: Number of recent distinct keys to remember
+            latency_history: Number of acceptance latencies to remember
+        """
+        self.threshold = threshold
+        self.fast_threshold = fast_threshold
+        self.recent_keys = deque(maxlen=history_size)
+        self.consecutive = 0
+        self.first_seen = None
+        self.accepted_key = None
+
+        # Keys of positions one legal move away from the current game position
+        self.reachable_keys = frozenset()
+
+        # Acceptance latencies in seconds, from the first frame showing a position to its acceptance
+        self.latencies = deque(maxlen=latency_history)
+        self.last_latency = None
+
+    def reset(self):
+        """Reset the consecutive frame count and the recent keys."""
+        self.recent_keys.clear()
+        self.consecutive = 0
+        self.first_seen = None
+
+    def reject(self):
+        """Record a frame that could not be resolved into a position."""
+        self.consecutive = 0
+
+    def set_reachable(self, keys):
+        """
+        Set the keys of the positions one legal move away from the game position.
+
+        This is called whenever the game position changes. The set is replaced
+        as a whole, so it can be called from another thread.
+
+        Args:
+            keys: Iterable of placement keys
+        """
+        self.reachable_keys = frozenset(keys)
+
+    def required_frames(self, key):
+        """
+        Get the number of consecutive frames required to accept a position.
+
+        Args:
+            key: The integer key of the detected position
+
+        Returns:
+            The number of frames
+        """
+        if key in self.reachable_keys:
+            return self.fast_threshold
+        return self.threshold
+
+    def observe(self, key, now=None):
+        """
+        Record the position key of a frame.
+
+        Args:
+            key: The integer key of the detected position
+            now: The frame time in seconds, or None for the current time
+
+        Returns:
+            True if the position has just become stable and differs from the
+            last accepted position, False otherwise
+        """
+        if now is None:
+            now = time.perf_counter()
+
+        if self.recent_keys and key == self.recent_keys[-1]:
+            # Same position as before, increment the counter
+            self.consecutive += 1
+        else:
+            # New position detected, reset the counter
+            self.consecutive = 1
+            self.first_seen = now
+            self.recent_keys.append(key)
+
+        # If we've seen the same position enough times and it has changed, accept it
+        if self.consecutive >= self.required_frames(key) and key != self.accepted_key:
+            self.accepted_key = key
+            self.last_latency = now - self.first_seen
+            self.latencies.append(self.last_latency)
+            return True
+
+        return False
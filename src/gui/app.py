@@ -9,7 +9,7 @@ import sys
 import chess
 import threading
 import time
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QLineEdit, QGroupBox, QSpinBox, QMessageBox,
@@ -18,10 +18,25 @@ from PyQt5.QtWidgets import (
 from src.gui.piece_palette import ChessPiecePalette
 
 from src.gui.board_view import ChessBoardView
-from src.chess.engine import StockfishEngine
+from src.chess.analysis_cache import AnalysisCache, position_hash
+from src.chess.async_engine import AsyncAnalysisEngine
+from src.chess.budget import SearchBudget
+from src.chess.engine import StockfishEngine, find_server
+from src.chess.engine_pool import EnginePool
+from src.chess.engine_server import is_running as is_daemon_running
+from src.chess.game import GameTracker
+from src.chess.move_detector import MoveIndex
+from src.chess.move_quality import MoveQualityMap
+from src.chess.opening_book import OpeningBook
+from src.chess.position import Position
+from src.chess.review import GameReview
+from src.chess.tablebase import Tablebase
+from src.chess.tuning import EngineTuner
 from src.screen.selector import select_screen_region, save_selection, load_selection
 from src.detection.detector import ChessPieceDetector
 from src.detection.fen_generator import FENGenerator
+from src.detection.prefilter import PlausibilityFilter
+from src.detection.stability import StabilityTracker
 
 
 class ChessVisionApp(QMainWindow):
@@ -32,6 +47,11 @@ class ChessVisionApp(QMainWindow):
     the chess board view, controls, and analysis display.
     """
 
+    # Analysis lines (board, lines) and engine status messages, emitted from the
+    # engine's event loop thread and delivered in the GUI thread
+    analysis_updated = pyqtSignal(object, list)
+    engine_status = pyqtSignal(str)
+
     def __init__(self):
         """Initialize the application window."""
         super().__init__()
@@ -51,11 +71,64 @@ class ChessVisionApp(QMainWindow):
         # Create the board view
         self.board_view = ChessBoardView()
 
-        # Initialize the Stockfish engine
-        self.engine = StockfishEngine(depth=15)
+        # Initialize the Stockfish engine, with a persistent cache of analyzed positions
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+        self.analysis_cache = AnalysisCache(os.path.join(data_dir, "cache", "analysis.db"))
+
+        # Positions in the local Polyglot book (if any) are answered with book moves
+        self.opening_book = OpeningBook(os.path.join(data_dir, "books", "book.bin"))
+
+        # Endgame positions covered by the local Syzygy tablebases (if any) are answered exactly
+        self.tablebase = Tablebase(os.path.join(data_dir, "syzygy"))
+
+        # Search time per position grows while it stays on the board and with its
+        # complexity; the engine gets half of the cores, detection keeps the rest
+        self.search_budget = SearchBudget(cpu_share=0.5)
+
+        # With a "server" entry in data/config/engine.json, searches run on the shared
+        # engine daemon (see engine_daemon.py) instead of engine processes of our own
+        self.engine_server = find_server()
+        self.engine = StockfishEngine(
+            depth=15, threads=self.search_budget.threads(), cache=self.analysis_cache,
+            book=self.opening_book, tablebase=self.tablebase, budget=self.search_budget,
+            server=self.engine_server
+        )
         self.is_analyzing = False
-        self.analysis_thread = None
-        self.analysis_running = False
+
+        # The streaming engine opens its process with the engine's options, so the
+        # saved Threads/Hash tuning (if any) is applied here rather than at start()
+        self.engine.apply_tuning()
+        self.tuning_thread = None
+        self.pending_tuning = None  # Finished tuning (or error message) waiting for the main thread
+
+        # Streaming analysis on an asyncio engine, whose results arrive as signals; the
+        # daemon only answers complete searches, so this engine always has its own process
+        self.analysis_engine = AsyncAnalysisEngine(
+            self.engine,
+            on_update=self.analysis_updated.emit,
+            on_status=self.engine_status.emit
+        )
+        self.analysis_updated.connect(self._on_analysis_updated)
+        self.engine_status.connect(self._on_engine_status)
+        self.board_view.board_changed.connect(self._on_board_changed)
+
+        # Each played move is reviewed once in the background, on a single-threaded
+        # engine at below-normal OS priority, so live analysis keeps its CPU time; with
+        # a running daemon, the review is searched there instead
+        if self.engine_server is not None and is_daemon_running(self.engine_server):
+            self.review_pool = EnginePool(size=1, server=self.engine_server)
+        else:
+            self.review_pool = EnginePool(
+                size=1, threads=1, hash_size=16, engine_path=self.engine.engine_path, low_priority=True
+            )
+        self.game_review = GameReview(self.review_pool)
+
+        # The quality of every legal move of the shown position comes from one MultiPV
+        # search on the same engine, ahead of the review; the board view colours drag
+        # targets from the cached map
+        self.move_quality = MoveQualityMap(self.review_pool)
+        self.board_view.set_move_quality_source(self.move_quality.get)
+        self.move_quality.request(self.board_view.board)
 
         # Set up the screen selection
         self.config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "config")
@@ -65,23 +138,37 @@ class ChessVisionApp(QMainWindow):
         # Initialize the detector and FEN generator
         self.detector = ChessPieceDetector()
         self.fen_generator = FENGenerator()
+        if self.screen_selection:
+            self.fen_generator.set_board_size(self.screen_selection[2:])
 
         # Set up detection variables
         self.detection_running = False
         self.detection_thread = None
         self.current_detections = []
         self.current_image = None
-        self.last_fen = None
-        self.pending_fen = None
+        self.last_position = None  # Last accepted detected position
+        self.pending_detection = None  # Accepted (position, latency) waiting for the main thread
         self.auto_update_enabled = False  # Flag to track if auto-update is enabled
 
-        # Variables for FEN stability detection
-        self.recent_fens = []  # List to store recent FENs
-        self.consecutive_identical_fens = 0  # Counter for consecutive identical FENs
-        self.stable_fen_threshold = 10  # Number of consecutive identical FENs required for stability
+        # Position stability detection, working on integer position keys. A position one
+        # legal move away from the game position needs fewer consecutive frames.
+        self.stable_threshold = 10  # Frames required for unreachable or implausible positions
+        self.fast_stable_threshold = 2  # Frames required for positions one legal move away
+        self.stability = StabilityTracker(
+            threshold=self.stable_threshold,
+            fast_threshold=self.fast_stable_threshold
+        )
+        self.move_latencies = []  # (SAN, seconds) acceptance latency of each detected move
+
+        # Cheap plausibility checks on the raw detections, run before any placement is built
+        self.prefilter = PlausibilityFilter()
 
         # Set up board state tracking
         self.previous_board = chess.Board()  # Track the previous board state
+        self.game = GameTracker()  # Reconstructs the full state of the detected game
+        self._move_index = None  # Legal moves of the previous board by square-change signature
+        self._move_index_board = None  # The board the move index was built for
+        self.stability.set_reachable(self.game.successor_keys())
 
         # Set up board state history for undo/redo
         self.board_history = []  # Stack of previous board states for undo
@@ -198,11 +285,11 @@ class ChessVisionApp(QMainWindow):
         options_layout = QHBoxLayout()
         options_layout.setSpacing(3)  # Reduce spacing
 
-        # Depth selection
-        depth_label = QLabel("Depth:")
+        # Depth selection; the search budget only stops a search once it reaches this depth
+        depth_label = QLabel("Min depth:")
         self.depth_spin = QSpinBox()
         self.depth_spin.setRange(1, 30)
-        self.depth_spin.setValue(15)
+        self.depth_spin.setValue(self.engine.depth)
         self.depth_spin.setMaximumWidth(50)
         self.depth_spin.valueChanged.connect(self._on_depth_changed)
 
@@ -226,10 +313,25 @@ class ChessVisionApp(QMainWindow):
         self.analysis_button.clicked.connect(self._on_toggle_analysis)
         self.analysis_button.setMaximumWidth(100)
 
+        # Engine calibration button
+        self.tune_button = QPushButton("Tune Engine")
+        self.tune_button.clicked.connect(self._on_tune_engine)
+        self.tune_button.setMaximumWidth(100)
+
+        analysis_buttons_layout = QHBoxLayout()
+        analysis_buttons_layout.addWidget(self.analysis_button)
+        analysis_buttons_layout.addWidget(self.tune_button)
+        analysis_buttons_layout.addStretch(1)
+
+        # Game review status
+        self.review_label = QLabel("Game review: no moves yet")
+        self.review_label.setWordWrap(True)
+
         # Add widgets to analysis layout
         analysis_layout.addWidget(self.analysis_label)
         analysis_layout.addLayout(options_layout)
-        analysis_layout.addWidget(self.analysis_button, 0, Qt.AlignLeft)  # Align left
+        analysis_layout.addLayout(analysis_buttons_layout)
+        analysis_layout.addWidget(self.review_label)
 
 
 
@@ -270,6 +372,10 @@ class ChessVisionApp(QMainWindow):
         reset_to_detected_button = QPushButton("Reset to Detected Position")
         reset_to_detected_button.clicked.connect(self._on_reset_to_detected)
 
+        # Flip detected orientation button
+        flip_orientation_button = QPushButton("Flip Detected Orientation")
+        flip_orientation_button.clicked.connect(self._on_flip_detected_orientation)
+
         # Adjust detection area button
         adjust_area_button = QPushButton("Adjust Detection Area")
         adjust_area_button.clicked.connect(self._on_adjust_detection_area)
@@ -278,6 +384,7 @@ class ChessVisionApp(QMainWindow):
         detection_layout.addWidget(self.detection_label)
         detection_layout.addWidget(self.detection_button)
         detection_layout.addWidget(reset_to_detected_button)
+        detection_layout.addWidget(flip_orientation_button)
         detection_layout.addWidget(adjust_area_button)
 
         # Board Controls group
@@ -365,27 +472,32 @@ class ChessVisionApp(QMainWindow):
             # Clear the redo stack since we're making a new change
             self.redo_stack.clear()
 
-            # Create a new board from the FEN
-            new_board = chess.Board(fen)
+            # Parse the FEN once into a position
+            position = Position.from_fen(fen)
 
             # Update the previous board state
-            self.previous_board = new_board.copy()
+            self.previous_board = position.board.copy()
 
             # Update the board view
-            self.board_view.set_board(new_board)
+            self.board_view.set_position(position)
+
+            # Continue tracking the detected game from this position
+            self.game.reset(position.board)
+            self.stability.set_reachable(self.game.successor_keys())
+            self.prefilter.set_reference(len(position.board.piece_map()))
 
-            # Reset the move history
+            # Reset the move history and start a new game review
             self.move_history = []
+            self.game_review.reset()
 
             # Update the turn radio buttons
             self._update_turn_radio_buttons()
 
-            # Store this as the last valid FEN
-            self.last_fen = fen
+            # Store this as the last valid position
+            self.last_position = position
 
-            # Reset FEN stability tracking
-            self.recent_fens = []
-            self.consecutive_identical_fens = 0
+            # Reset position stability tracking
+            self.stability.reset()
 
             # Enable the undo button
             self.undo_button.setEnabled(True)
@@ -432,15 +544,23 @@ class ChessVisionApp(QMainWindow):
         # Update the FEN input field
         self.fen_input.setText(chess.STARTING_FEN)
 
-        # Reset the move history
+        # A new game may be played from the other side, so detect the orientation again
+        self.fen_generator.reset_orientation()
+
+        # Track the detected game from the starting position
+        self.game.reset()
+        self.stability.set_reachable(self.game.successor_keys())
+        self.prefilter.reset()
+
+        # Reset the move history and start a new game review
         self.move_history = []
+        self.game_review.reset()
 
         # Update the turn radio buttons
         self._update_turn_radio_buttons()
 
-        # Reset FEN stability tracking
-        self.recent_fens = []
-        self.consecutive_identical_fens = 0
+        # Reset position stability tracking
+        self.stability.reset()
 
         # Enable the undo button
         self.undo_button.setEnabled(True)
@@ -461,93 +581,141 @@ class ChessVisionApp(QMainWindow):
             self.analysis_label.setText("Analysis stopped")
 
     def _start_analysis(self):
-        """Start the analysis thread."""
-        if not self.engine.is_running():
-            success = self.engine.start()
-            if not success:
-                self.analysis_label.setText("Error: Could not start Stockfish engine")
-                self.is_analyzing = False
-                self.analysis_button.setText("Start Analysis")
-                return
+        """Start streaming analysis of the displayed position."""
+        self.current_analysis = []
+
+        # The engine is being tuned; _finish_tuning starts the analysis
+        if self.tuning_thread is not None:
+            self.analysis_label.setText("Tuning the engine, analysis resumes afterwards...")
+            return
 
-        # Start the analysis thread
-        self.analysis_running = True
-        self.analysis_thread = threading.Thread(target=self._analysis_worker)
-        self.analysis_thread.daemon = True
-        self.analysis_thread.start()
+        self.analysis_label.setText("Waiting for analysis...")
+        self.analysis_engine.analyse(self.board_view.board)
 
     def _stop_analysis(self):
-        """Stop the analysis thread."""
-        self.analysis_running = False
-        if self.analysis_thread is not None:
-            self.analysis_thread.join(timeout=1.0)
-            self.analysis_thread = None
-
-    def _analysis_worker(self):
-        """Worker function for the analysis thread."""
-        consecutive_errors = 0
-        max_consecutive_errors = 3
-
-        while self.analysis_running:
-            # Get the current board position
-            board = self.board_view.board
-
-            # Analyze the position
-            try:
-                # The engine.analyze method now has built-in error handling and recovery
-                self.current_analysis = self.engine.analyze(board, limit_time=0.1)
+        """Stop the analysis, which cancels the running search immediately."""
+        self.analysis_engine.cancel()
 
-                # If we got here without an exception, reset the error counter
-                consecutive_errors = 0
+    def _on_board_changed(self, board):
+        """
+        Restart the analysis and map the move quality when the displayed position changes.
 
-            except Exception as e:
-                print(f"Analysis error in worker thread: {e}")
-                consecutive_errors += 1
+        Args:
+            board: The new chess.Board of the board view
+        """
+        # While the engine is being tuned, searches would skew the measurement;
+        # _finish_tuning replays the board shown by then
+        if self.tuning_thread is not None:
+            return
 
-                # Provide a placeholder analysis result
-                self.current_analysis = [{"score": "Engine error", "pv": "", "moves": []}]
+        if self.is_analyzing:
+            self.current_analysis = []
+            self.analysis_engine.analyse(board)
 
-                # If we've had too many consecutive errors, try to restart the engine
-                if consecutive_errors >= max_consecutive_errors:
-                    print(f"Too many consecutive errors ({consecutive_errors}), restarting engine...")
-                    try:
-                        # Stop the engine
-                        self.engine.stop()
-                        # Wait a moment
-                        time.sleep(1)
-                        # Start it again
-                        success = self.engine.start()
-                        if success:
-                            print("Engine successfully restarted")
-                            consecutive_errors = 0
-                        else:
-                            print("Failed to restart engine")
-                    except Exception as restart_error:
-                        print(f"Error restarting engine: {restart_error}")
-
-                # Sleep a bit longer after an error
-                time.sleep(1)
-                continue
+        # Ready before the user starts dragging a piece
+        self.move_quality.request(board)
 
-            # Sleep to avoid excessive CPU usage
-            time.sleep(0.5)
+    def _on_analysis_updated(self, board, results):
+        """
+        Show new analysis lines as they arrive from the engine.
 
-    def _update_ui(self):
-        """Update the UI with the latest data."""
-        # Update the analysis display
+        Args:
+            board: The analysed chess.Board
+            results: A list of AnalysisLine objects, one for each principal variation
+        """
+        # Ignore lines of a search that was cancelled after they were sent (clocks
+        # are ignored, so the lines of a ponder hit are shown)
+        if not self.is_analyzing or position_hash(board) != position_hash(self.board_view.board):
+            return
+
+        self.current_analysis = results
         self._update_analysis_display()
 
+    def _on_engine_status(self, message):
+        """
+        Show an engine status message.
+
+        Args:
+            message: The status message
+        """
+        if self.is_analyzing:
+            self.analysis_label.setText(f"Engine status: {message}")
+
+    def _update_ui(self):
+        """Update the UI with the latest data."""
         # Update the detection label
         self._update_detection_label()
 
-        # Check if there's a pending FEN update
-        if self.pending_fen:
-            # Get the FEN and clear the pending update
-            fen = self.pending_fen
-            self.pending_fen = None
+        # Check if there's a pending position update
+        if self.pending_detection:
+            # Get the position and clear the pending update
+            position, latency = self.pending_detection
+            self.pending_detection = None
+
+            # Update the board with the position
+            self._direct_update_board(position, latency)
+
+        # Update the game review status
+        self._update_review_label()
+
+        # Apply a finished engine tuning
+        if self.pending_tuning is not None:
+            tuning, self.pending_tuning = self.pending_tuning, None
+            self._finish_tuning(tuning)
+
+    def _on_tune_engine(self):
+        """Measure the engine speed in the background and apply the fastest Threads and Hash."""
+        if self.tuning_thread is not None:
+            return
+
+        self.tune_button.setEnabled(False)
+        self.tune_button.setText("Tuning...")
 
-            # Update the board with the FEN
-            self._direct_update_board(fen)
+        # Live analysis and the game review would skew the measurement; the
+        # analysis engine is reopened with the new options afterwards
+        self.analysis_engine.close()
+        self.game_review.stop()
+        if self.is_analyzing:
+            self.analysis_label.setText("Tuning the engine, analysis resumes afterwards...")
+
+        self.tuning_thread = threading.Thread(target=self._tuning_worker, daemon=True)
+        self.tuning_thread.start()
+
+    def _tuning_worker(self):
+        """Run the engine tuning, within the cores left over by detection."""
+        tuner = EngineTuner(self.engine.engine_path, max_threads=self.search_budget.threads())
+        try:
+            tuning = tuner.run()
+            EngineTuner.save(tuning)
+            print(EngineTuner.report(tuning))
+            self.pending_tuning = tuning
+        except Exception as e:
+            print(f"Error tuning engine: {e}")
+            self.pending_tuning = f"Error tuning engine: {e}"
+
+    def _finish_tuning(self, tuning):
+        """
+        Apply a finished tuning and resume the analysis and the game review.
+
+        Args:
+            tuning: The tuning dictionary, or an error message
+        """
+        self.tuning_thread = None
+        self.tune_button.setEnabled(True)
+        self.tune_button.setText("Tune Engine")
+
+        if isinstance(tuning, str):
+            QMessageBox.warning(self, "Engine Tuning", tuning)
+        else:
+            self.engine.set_threads(tuning["threads"])
+            self.engine.set_hash_size(tuning["hash"])
+            QMessageBox.information(self, "Engine Tuning", EngineTuner.report(tuning))
+
+        # Catch up with the position shown during the tuning
+        if self.is_analyzing:
+            self._start_analysis()
+        self.move_quality.request(self.board_view.board)
+        self.game_review.start()
 
     def _update_detection_label(self):
         """Update the detection label with the latest status."""
@@ -556,10 +724,33 @@ class ChessVisionApp(QMainWindow):
 
         # Update the detection label with the number of detected pieces
         if self.current_detections:
-            self.detection_label.setText(f"Detected {len(self.current_detections)} pieces")
+            rejected = sum(self.prefilter.rejections.values())
+            self.detection_label.setText(
+                f"Detected {len(self.current_detections)} pieces, {rejected} implausible frames skipped"
+            )
         else:
             self.detection_label.setText("Detecting...")
 
+    def _update_review_label(self):
+        """Update the game review label with the progress and the average centipawn losses."""
+        summary = self.game_review.summary()
+        if not summary["moves"]:
+            self.review_label.setText("Game review: no moves yet")
+            return
+
+        white, black = summary["white"], summary["black"]
+        if summary["reviewed"] + summary["failed"] < summary["moves"]:
+            status = f"{summary['reviewed']}/{summary['moves']} moves"
+        elif summary["failed"]:
+            status = f"ready, {summary['failed']} moves failed"
+        else:
+            status = "ready"
+        self.review_label.setText(
+            f"Game review {status}\n"
+            f"White: {white['average_loss']:.0f} avg loss, {white['mistakes']} mistakes, {white['blunders']} blunders\n"
+            f"Black: {black['average_loss']:.0f} avg loss, {black['mistakes']} mistakes, {black['blunders']} blunders"
+        )
+
     def _update_analysis_display(self):
         """Update the analysis display with the latest results."""
         if not self.is_analyzing or not self.current_analysis:
@@ -569,44 +760,27 @@ class ChessVisionApp(QMainWindow):
         analysis_text = ""
         arrows = []
 
-        for i, analysis in enumerate(self.current_analysis):
-            if "score" in analysis:
-                line_number = i + 1
-                score = analysis["score"]
-
-                # Check if this is an error message
-                if score in ["Engine error", "Engine restarting...", "Analysis error"]:
-                    # Display the error message
-                    analysis_text = f"Engine status: {score}\nPlease wait while the engine recovers..."
-                    break
-
-                # Normal analysis processing
-                if "moves" in analysis:
-                    moves = analysis["moves"]  # This is a list of SAN moves
-
-                    # Limit the number of moves shown in text
-                    if len(moves) > 5:
-                        moves_text = " ".join(moves[:5]) + "..."
-                    else:
-                        moves_text = " ".join(moves)
-
-                    analysis_text += f"Line {line_number}: {score} - {moves_text}\n"
-
-                    # Add arrow for the first move of each line
-                    if moves and i < 5:  # Limit to 5 arrows
-                        # Get the move from the analysis
-                        board = self.board_view.board.copy()
-
-                        # Find the move in UCI format
-                        for move in board.legal_moves:
-                            try:
-                                if board.san(move) == moves[0]:
-                                    # Add arrow (from_square, to_square, color_index)
-                                    arrows.append((move.from_square, move.to_square, i))
-                                    break
-                            except Exception as e:
-                                print(f"Error processing move for arrow: {e}")
-                                continue
+        for i, line in enumerate(self.current_analysis):
+            # Check if this is an error message
+            if line.is_error:
+                # Display the error message
+                analysis_text = f"Engine status: {line.score_text}\nPlease wait while the engine recovers..."
+                break
+
+            # SAN is only produced here, and memoised on the line
+            moves = line.san
+
+            # Limit the number of moves shown in text
+            if len(moves) > 5:
+                moves_text = " ".join(moves[:5]) + "..."
+            else:
+                moves_text = " ".join(moves)
+
+            analysis_text += f"Line {i + 1}: {line.score_text} - {moves_text}\n"
+
+            # Add an arrow (from_square, to_square, color_index) for the first move of each line
+            if line.move is not None and i < 5:  # Limit to 5 arrows
+                arrows.append((line.move.from_square, line.move.to_square, i))
 
         # Update the analysis text
         if analysis_text:
@@ -625,6 +799,10 @@ class ChessVisionApp(QMainWindow):
         """Handle changes to the number of analysis lines."""
         self.engine.set_multipv(lines)
 
+        # Restart the search with the new number of lines
+        if self.is_analyzing:
+            self._start_analysis()
+
     def _on_flip_board(self):
         """Handle the Flip Board button click."""
         # Flip the board
@@ -636,6 +814,9 @@ class ChessVisionApp(QMainWindow):
         else:
             print("Board flipped: White pieces at bottom")
 
+        # Our side is at the bottom; the engine ponders while the other side is to move
+        self.analysis_engine.set_ponder(True, chess.BLACK if flipped else chess.WHITE)
+
     def _on_undo(self):
         """Handle the Undo button click."""
         if not self.board_history:
@@ -710,13 +891,12 @@ class ChessVisionApp(QMainWindow):
             self.auto_update_button.setText("Auto Update: ON")
             print("Auto update enabled")
 
-            # Reset FEN stability tracking
-            self.recent_fens = []
-            self.consecutive_identical_fens = 0
+            # Reset position stability tracking
+            self.stability.reset()
 
-            # If we have a last_fen, update the board immediately
-            if self.last_fen:
-                self._auto_update_board(self.last_fen)
+            # If we have a last detected position, update the board immediately
+            if self.last_position:
+                self._auto_update_board(self.last_position)
         else:
             self.auto_update_button.setText("Auto Update: OFF")
             print("Auto update disabled")
@@ -830,8 +1010,9 @@ class ChessVisionApp(QMainWindow):
 
     def _on_reset_to_detected(self):
         """Reset the board to the latest detected position."""
-        if self.last_fen:
-            print(f"Resetting to detected position: {self.last_fen}")
+        if self.last_position:
+            position = self.last_position
+            print(f"Resetting to detected position: {position.fen}")
 
             try:
                 # Save the current board state for undo
@@ -840,24 +1021,21 @@ class ChessVisionApp(QMainWindow):
                 # Clear the redo stack since we're making a new change
                 self.redo_stack.clear()
 
-                # Create a new board from the FEN
-                new_board = chess.Board(self.last_fen)
-
                 # Update the previous board state
-                self.previous_board = new_board.copy()
+                self.previous_board = position.board.copy()
 
                 # Update the board view
-                self.board_view.set_board(new_board)
+                self.board_view.set_position(position)
 
                 # Update the FEN input field
-                self.fen_input.setText(self.last_fen)
+                self.fen_input.setText(position.fen)
 
-                # Reset the move history
+                # Reset the move history and start a new game review
                 self.move_history = []
+                self.game_review.reset()
 
-                # Reset FEN stability tracking
-                self.recent_fens = []
-                self.consecutive_identical_fens = 0
+                # Reset position stability tracking
+                self.stability.reset()
 
                 # Update the turn radio buttons
                 self._update_turn_radio_buttons()
@@ -889,6 +1067,18 @@ class ChessVisionApp(QMainWindow):
                 "No detected position is available. Start detection first."
             )
 
+    def _on_flip_detected_orientation(self):
+        """Handle the Flip Detected Orientation button click."""
+        white_at_bottom = self.fen_generator.flip_orientation()
+
+        # Reset position stability tracking, since the detected positions are now mirrored
+        self.stability.reset()
+
+        if white_at_bottom:
+            print("Detected orientation flipped: White pieces at bottom")
+        else:
+            print("Detected orientation flipped: Black pieces at bottom")
+
     def _on_adjust_detection_area(self):
         """
         Handle the Adjust Detection Area button click.
@@ -993,48 +1183,89 @@ class ChessVisionApp(QMainWindow):
         print(f"Updating board with FEN: {fen}")
 
         try:
-            # Create a new board from the FEN
-            new_board = chess.Board(fen)
+            # Parse the FEN once into a position
+            position = Position.from_fen(fen)
+        except Exception as e:
+            print(f"Error updating board with FEN: {fen}, error: {e}")
+            return False
 
-            # Try to find what move was made
-            move = self._find_move_between_positions(self.previous_board, new_board)
+        self._apply_position(position)
 
-            if move:
-                # A move was found, apply it to the previous board
-                print(f"Detected move: {self.previous_board.san(move)}")
+        # Update the FEN input field with the current board FEN
+        self.fen_input.setText(self.board_view.board.fen())
 
-                # Make the move on the previous board
-                self.previous_board.push(move)
+        return True
 
-                # Use the updated previous board (which has the correct turn)
-                self.board_view.set_board(self.previous_board)
+    def _apply_position(self, position):
+        """
+        Apply a new position to the board, as a move if one explains it.
 
-                # Add the move to the history
-                self.add_move_to_history(self.previous_board.san(move))
+        The position is passed by reference and never re-parsed: its board is
+        shared with the board view, and the previous board is only replaced,
+        never modified in place.
 
-                # Update the FEN input field with the current board FEN
-                self.fen_input.setText(self.previous_board.fen())
+        Args:
+            position: The new Position
+        """
+        # Try to find what move was made
+        move = self._find_move_between_positions(self.previous_board, position)
 
-                print(f"Board updated with move: {self.previous_board.san(move)}")
-            else:
-                # No move was found, just set the board directly
-                print("No move detected, setting board directly")
+        if move:
+            # A move was found, apply it to a copy of the previous board
+            san = self.previous_board.san(move)
+            print(f"Detected move: {san}")
 
-                # Update the previous board
-                self.previous_board = new_board.copy()
+            board_before = self.previous_board
+            new_board = self.previous_board.copy()
+            new_board.push(move)
+            self.previous_board = new_board
 
-                # Use the set_board method to update the board
-                self.board_view.set_board(new_board)
+            # Use the updated board (which has the correct turn)
+            self.board_view.set_board(new_board)
 
-                # Update the FEN input field
-                self.fen_input.setText(fen)
+            # Add the move to the history and queue it for review
+            self.add_move_to_history(san, board_before, move)
 
-                print(f"Board directly updated with FEN: {fen}")
+            print(f"Board updated with move: {san}")
+        else:
+            # No move was found, just set the board directly
+            print("No move detected, setting board directly")
 
-            return True
-        except Exception as e:
-            print(f"Error updating board with FEN: {fen}, error: {e}")
-            return False
+            # Update the previous board
+            self.previous_board = position.board.copy()
+
+            # Use the position's board directly
+            self.board_view.set_position(position)
+
+            print(f"Board directly updated with position: {position.fen}")
+
+    def _replay_moves(self, moves):
+        """
+        Replay a sequence of moves on the board.
+
+        Args:
+            moves: List of chess.Move objects to play from the previous board
+
+        Returns:
+            True if all moves were legal and were played, False otherwise
+        """
+        new_board = self.previous_board.copy()
+        sans = []
+        boards = []
+        for move in moves:
+            if not new_board.is_legal(move):
+                return False
+            sans.append(new_board.san(move))
+            boards.append(new_board.copy(stack=False))
+            new_board.push(move)
+
+        self.previous_board = new_board
+        self.board_view.set_board(new_board)
+        for san, board, move in zip(sans, boards, moves):
+            self.add_move_to_history(san, board, move)
+
+        print(f"Board updated with moves: {' '.join(sans)}")
+        return True
 
     def add_move_to_history(self, move_san):
         """Add a move to the history display."""
@@ -1080,6 +1311,11 @@ class ChessVisionApp(QMainWindow):
 
     def _start_detection(self):
         """Start the detection thread."""
+        # Build the square lookup table for the actual region size and recalibrate the grid
+        self.fen_generator.set_board_size(self.screen_selection[2:])
+        self.fen_generator.reset_orientation()
+        self.prefilter.reset()
+
         # Start the detection thread
         self.detection_running = True
         self.detection_thread = threading.Thread(target=self._detection_worker)
@@ -1104,132 +1340,115 @@ class ChessVisionApp(QMainWindow):
                 self.current_image = img
                 self.current_detections = detections
 
-                # Generate FEN
-                fen = self.fen_generator.generate_fen(detections)
-
-                # Print debug info
-                print(f"Detected {len(detections)} pieces")
-                print(f"Generated FEN: {fen}")
-
-                # Validate the FEN
-                try:
-                    # Validate the FEN by creating a board from it
-                    _ = chess.Board(fen)  # Just validate, we don't need the board object
-
-                    # Check if this is a new FEN or the same as the last one
-                    if not self.recent_fens or fen != self.recent_fens[-1]:
-                        # New FEN detected, reset the counter
-                        self.consecutive_identical_fens = 1
-                        self.recent_fens.append(fen)
-                        # Keep only the last 5 FENs to avoid memory growth
-                        if len(self.recent_fens) > 5:
-                            self.recent_fens.pop(0)
-                        print(f"New FEN detected: {fen}, consecutive count: {self.consecutive_identical_fens}")
-                    else:
-                        # Same FEN as before, increment the counter
-                        self.consecutive_identical_fens += 1
-                        print(f"Same FEN detected: {fen}, consecutive count: {self.consecutive_identical_fens}")
-
-                    # If we've seen the same FEN enough times, it's stable
-                    if self.consecutive_identical_fens >= self.stable_fen_threshold:
-                        # If the FEN has changed from the last processed one, update the board
-                        if fen != self.last_fen:
-                            self.last_fen = fen
-                            print(f"Stable FEN detected ({self.consecutive_identical_fens} times), updating board: {fen}")
-                            # Store the FEN to be processed in the main thread
-                            self.pending_fen = fen
-                    else:
-                        print(f"Waiting for stable FEN ({self.consecutive_identical_fens}/{self.stable_fen_threshold})")
-
-                except Exception as e:
-                    print(f"Invalid FEN generated: {fen}, error: {e}")
-                    # Reset the counter for invalid FENs
-                    self.consecutive_identical_fens = 0
+                # Skip frames that cannot be a real position (mid-animation, occluded, misdetected)
+                reason = self.prefilter.check(detections, self.fen_generator.grid)
+                if reason is not None:
+                    self.stability.reject()
+                    time.sleep(0.1)
+                    continue
+
+                # Resolve the detections into a placement and its integer key
+                key, placement, confidences = self.fen_generator.generate_placement(detections)
+
+                # The position object (FEN and board) is only built once a position is accepted
+                if self.stability.observe(key):
+                    position = Position(placement, key, confidences=confidences)
+
+                    # Validate the position by building its board, which is reused downstream
+                    try:
+                        _ = position.board
+
+                        print(f"Stable position detected ({self.stability.consecutive} times), updating board: {position.fen}")
+                        self.last_position = position
+
+                        # Store the position to be processed in the main thread
+                        self.pending_detection = (position, self.stability.last_latency)
+
+                    except Exception as e:
+                        print(f"Invalid position generated: {position.board_fen}, error: {e}")
+                        # Reset the counter for invalid positions
+                        self.stability.reject()
 
             # Sleep to avoid excessive CPU usage
             time.sleep(0.1)
 
-    def _direct_update_board(self, fen):
+    def _direct_update_board(self, position, latency=None):
         """
-        Update the FEN input field with the detected FEN string.
+        Update the FEN input field with the detected position.
 
         This method is designed to be called from the main UI thread
-        to update the FEN input field with a new FEN string from detection.
+        to update the FEN input field with a new position from detection.
         If auto-update is enabled, it will also update the board.
         Otherwise, the board is not updated until the user clicks "Set Position".
+
+        Args:
+            position: The accepted Position
+            latency: Seconds from the first frame showing the position to its acceptance
         """
-        print(f"Updating FEN input field with: {fen}")
+        # Advance the tracked game, which reconstructs the side to move,
+        # castling rights, en passant square and clocks of the detected position
+        move = self.game.update(position)
+        moves = list(self.game.last_moves)
+        if move is not None:
+            sans = " ".join(self.game.last_sans)
+            if latency is not None:
+                for san in self.game.last_sans:
+                    self.move_latencies.append((san, latency))
+                print(f"Detected moves in game: {sans} (accepted after {latency * 1000:.0f} ms)")
+            else:
+                print(f"Detected moves in game: {sans}")
+        position = self.game.position()
 
-        try:
-            # Validate the FEN by creating a board from it
-            _ = chess.Board(fen)  # Just validate, we don't need the board object
+        # Positions one legal move away from the new game position are accepted faster
+        self.stability.set_reachable(self.game.successor_keys())
 
-            # Update the FEN input field only
-            self.fen_input.setText(fen)
+        # Piece counts are compared with the game position, not with the detected
+        # frame, which may have missed or misdetected the piece the game corrected
+        self.prefilter.set_reference(len(self.game.board.piece_map()))
 
-            # Store the last valid FEN
-            self.last_fen = fen
+        fen = position.fen
+        print(f"Updating FEN input field with: {fen}")
 
-            print(f"FEN input field updated with: {fen}")
+        # Update the FEN input field only
+        self.fen_input.setText(fen)
 
-            # If auto-update is enabled, update the board as well
-            # Note: The FEN has already been validated as stable by the detection worker
-            if self.auto_update_enabled:
-                self._auto_update_board(fen)
+        # Store the last valid position
+        self.last_position = position
 
-        except Exception as e:
-            print(f"Error updating FEN input field: {e}")
+        # If auto-update is enabled, update the board as well
+        # Note: The position has already been validated as stable by the detection worker
+        if self.auto_update_enabled:
+            self._auto_update_board(position, moves)
 
-    def _auto_update_board(self, fen):
+    def _auto_update_board(self, position, moves=None):
         """
-        Automatically update the board with the detected FEN string.
+        Automatically update the board with the detected position.
 
         This method updates the board and handles the turn correctly based on
-        the changes between the previous board state and the new FEN.
+        the changes between the previous board state and the new position.
+
+        Args:
+            position: The detected Position
+            moves: The moves the game tracker inferred for the position, including
+                reconstructed missed moves, or None to infer a single move here
         """
-        print(f"Auto-updating board with FEN: {fen}")
+        print(f"Auto-updating board with position: {position.fen}")
 
         try:
-            # Save the current board state for undo
-            self.board_history.append(self.board_view.board.copy())
+            # Save the current board state for undo; boards shown in the view
+            # are never modified in place, so the reference can be kept
+            self.board_history.append(self.board_view.board)
 
             # Clear the redo stack since we're making a new change
             self.redo_stack.clear()
 
-            # Create a new board from the FEN
-            new_board = chess.Board(fen)
-
-            # Try to find what move was made
-            move = self._find_move_between_positions(self.previous_board, new_board)
-
-            if move:
-                # A move was found, apply it to the previous board
-                print(f"Detected move: {self.previous_board.san(move)}")
-
-                # Make the move on the previous board
-                self.previous_board.push(move)
-
-                # Use the updated previous board (which has the correct turn)
-                self.board_view.set_board(self.previous_board)
-
-                # Add the move to the history
-                self.add_move_to_history(self.previous_board.san(move))
-
-                # Update the FEN input field with the current board FEN
-                self.fen_input.setText(self.previous_board.fen())
-
-                print(f"Board auto-updated with move: {self.previous_board.san(move)}")
-            else:
-                # No move was found, just set the board directly
-                print("No move detected, setting board directly")
-
-                # Update the previous board
-                self.previous_board = new_board.copy()
+            # Replay the inferred moves so none are lost from the history,
+            # otherwise apply the position, as a move if one explains it
+            if not moves or not self._replay_moves(moves):
+                self._apply_position(position)
 
-                # Use the set_board method to update the board
-                self.board_view.set_board(new_board)
-
-                print(f"Board directly auto-updated with FEN: {fen}")
+            # Update the FEN input field with the current board FEN
+            self.fen_input.setText(self.board_view.board.fen())
 
             # Update the turn radio buttons
             self._update_turn_radio_buttons()
@@ -1287,39 +1506,33 @@ class ChessVisionApp(QMainWindow):
         except Exception as e:
             print(f"Error updating board in GUI thread: {e}")
 
-    def _find_move_between_positions(self, previous_board, new_board):
+    def _find_move_between_positions(self, previous_board, new_position):
         """
         Find the move that was made between two board positions.
 
+        The legal moves of the previous board are indexed by their square-change
+        signature, so this is a single diff-and-lookup. The index is rebuilt only
+        when the previous board changes.
+
         Args:
             previous_board: The previous board position
-            new_board: The new board position
+            new_position: The new Position
 
         Returns:
             The move that was made, or None if no move could be determined
         """
-        # Check if it's a legal move from the previous position
-        for move in previous_board.legal_moves:
-            # Create a copy of the previous board
-            test_board = previous_board.copy()
-
-            # Apply the move
-            test_board.push(move)
-
-            # Compare the resulting position with the new board
-            # We only compare the piece placement part of the FEN
-            if test_board.board_fen() == new_board.board_fen():
-                return move
+        if self._move_index_board is not previous_board:
+            self._move_index = MoveIndex(previous_board)
+            self._move_index_board = previous_board
 
-        # No matching move found
-        return None
+        return self._move_index.lookup(new_position.key)
 
-    def _on_move_made(self, _, san):
+    def _on_move_made(self, move, san):
         """
         Handle a move made on the board.
 
         Args:
-            _: The chess.Move object (unused)
+            move: The chess.Move object
             san: The move in Standard Algebraic Notation
         """
         print(f"Move made: {san}")
@@ -1330,8 +1543,8 @@ class ChessVisionApp(QMainWindow):
         # Clear the redo stack since we're making a new move
         self.redo_stack.clear()
 
-        # Add the move to the history
-        self.add_move_to_history(san)
+        # Add the move to the history and queue it for review
+        self.add_move_to_history(san, self.previous_board, move)
 
         # Update the FEN input field
         self.fen_input.setText(self.board_view.board.fen())
@@ -1348,13 +1561,20 @@ class ChessVisionApp(QMainWindow):
         # Disable the redo button since we've made a new move
         self.redo_button.setEnabled(False)
 
-    def add_move_to_history(self, move_san):
+    def add_move_to_history(self, move_san, board=None, move=None):
         """
         Add a move to the history.
 
         Args:
             move_san: The move in Standard Algebraic Notation
+            board: The position before the move, or None
+            move: The chess.Move, or None; with the board it is queued for review
         """
+        # Review the move in the background (the previous board may be out of
+        # sync with the view after manual edits, so check the move first)
+        if board is not None and move is not None and board.is_legal(move):
+            self.game_review.add_move(board, move)
+
         # Get the current position
         position = self.board_view.board.fullmove_number
 
@@ -1392,8 +1612,12 @@ class ChessVisionApp(QMainWindow):
 
     def closeEvent(self, event):
         """Handle the window close event."""
-        # Stop the analysis thread
-        self._stop_analysis()
+        # Stop the analysis and quit the analysis engine
+        self.analysis_engine.close()
+
+        # Stop the game review and its engine
+        self.game_review.stop()
+        self.review_pool.stop()
 
         # Stop the detection thread
         self._stop_detection()
@@ -1402,6 +1626,11 @@ class ChessVisionApp(QMainWindow):
         if self.engine is not None:
             self.engine.stop()
 
+        # Close the analysis cache database, the opening book and the tablebases
+        self.analysis_cache.close()
+        self.opening_book.close()
+        self.tablebase.close()
+
         # Accept the close event
         event.accept()
 
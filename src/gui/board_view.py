@@ -6,10 +6,13 @@ This module provides a graphical representation of a chess board using PyQt5.
 
 import os
 import chess
-from PyQt5.QtCore import Qt, QSize, QRect, QPointF, QPoint
+from PyQt5.QtCore import Qt, QSize, QRect, QPointF, QPoint, pyqtSignal
 from PyQt5.QtGui import QPainter, QColor, QPixmap, QPolygonF
 from PyQt5.QtWidgets import QWidget
 
+from src.chess.position import Position
+from src.chess.review import INACCURACY, MISTAKE, BLUNDER
+
 
 class ChessBoardView(QWidget):
     """
@@ -19,12 +22,21 @@ class ChessBoardView(QWidget):
     or a FEN string. It handles rendering the board, pieces, and highlighting squares.
     """
 
+    # Emitted with the new chess.Board whenever the displayed position changes
+    board_changed = pyqtSignal(object)
+
     # Colors for the chess board (matching the provided image)
     LIGHT_SQUARE_COLOR = QColor(245, 222, 179)  # Light beige/cream
     DARK_SQUARE_COLOR = QColor(205, 133, 63)    # Orange-brown
     HIGHLIGHT_COLOR = QColor(100, 180, 100, 150)  # Green highlight for moves
     LAST_MOVE_COLOR = QColor(230, 180, 80, 150)  # Golden highlight for last move
 
+    # Colors of drag targets by the centipawn loss of the move
+    GOOD_MOVE_COLOR = QColor(40, 160, 60, 170)        # Best move or close to it
+    INACCURACY_COLOR = QColor(220, 200, 50, 170)      # Yellow for inaccuracies
+    MISTAKE_COLOR = QColor(240, 130, 30, 170)         # Orange for mistakes
+    BLUNDER_COLOR = QColor(210, 40, 40, 170)          # Red for blunders
+
     # Colors for arrows
     ARROW_COLORS = [
         QColor(255, 0, 0, 180),    # Red for best move
@@ -69,6 +81,10 @@ class ChessBoardView(QWidget):
         self.drag_pos = QPoint()
         self.legal_moves = []
 
+        # Move quality of the drag targets, looked up from a cache when a drag starts
+        self.move_quality_source = None
+        self.target_colors = {}  # Square -> QColor
+
         # Set up move callback
         self.move_made_callback = None
 
@@ -116,9 +132,24 @@ class ChessBoardView(QWidget):
                     print(f"Warning: Piece image not found: {file_path}")
 
     def set_board(self, board):
-        """Set the chess board to display."""
+        """
+        Set the chess board to display.
+
+        The board is kept by reference and is never modified in place; moves
+        made on the board view are applied to a copy.
+        """
         self.board = board
         self.update()
+        self.board_changed.emit(board)
+
+    def set_position(self, position):
+        """
+        Set the chess board to display from a position object.
+
+        Args:
+            position: A Position, whose board is shared without re-parsing
+        """
+        self.set_board(position.board)
 
     def set_board_from_fen(self, fen):
         """Set the chess board from a FEN string."""
@@ -128,11 +159,11 @@ class ChessBoardView(QWidget):
                 print(f"Invalid FEN: {fen}")
                 return False
 
-            # Try to create a board from the FEN
-            new_board = chess.Board(fen)
+            # Parse the FEN once into a position
+            position = Position.from_fen(fen)
 
             # If successful, update the board
-            self.board = new_board
+            self.board = position.board
 
             # Clear any highlights or arrows
             self.highlighted_squares = []
@@ -141,6 +172,7 @@ class ChessBoardView(QWidget):
 
             # Trigger a repaint
             self.update()
+            self.board_changed.emit(self.board)
 
             return True
         except ValueError as e:
@@ -224,6 +256,7 @@ class ChessBoardView(QWidget):
         # Update the board
         self.board = new_board
         self.update()
+        self.board_changed.emit(new_board)
 
         return turn
 
@@ -293,10 +326,9 @@ class ChessBoardView(QWidget):
 
             painter.drawRect(x, y, self.square_size, self.square_size)
 
-        # Draw other highlights
-        painter.setBrush(self.HIGHLIGHT_COLOR)
-
+        # Draw other highlights, drag targets in the color of their move quality
         for square in self.highlighted_squares:
+            painter.setBrush(self.target_colors.get(square, self.HIGHLIGHT_COLOR))
             file_idx = chess.square_file(square)
             rank_idx = chess.square_rank(square)
 
@@ -471,6 +503,9 @@ class ChessBoardView(QWidget):
                         # Calculate legal moves for this piece
                         self.legal_moves = [move for move in self.board.legal_moves if move.from_square == square]
 
+                        # Color the targets by move quality, if the position has been mapped
+                        self.target_colors = self._target_colors()
+
                         # Highlight the source square and legal target squares
                         highlight_squares = [move.to_square for move in self.legal_moves]
                         highlight_squares.append(square)
@@ -506,9 +541,12 @@ class ChessBoardView(QWidget):
                         move = chess.Move(self.drag_source, target_square, promotion=chess.QUEEN)
 
                 if move in self.legal_moves:
-                    # Make the move
+                    # Make the move on a copy, since the board may be shared
                     san = self.board.san(move)
-                    self.board.push(move)
+                    new_board = self.board.copy()
+                    new_board.push(move)
+                    self.board = new_board
+                    self.board_changed.emit(new_board)
 
                     # Update the last move highlight
                     self.highlight_last_move(move)
@@ -531,11 +569,57 @@ class ChessBoardView(QWidget):
             self.drag_piece = None
             self.drag_source = None
             self.legal_moves = []
+            self.target_colors = {}
 
             # Release the mouse
             self.setMouseTracking(False)
             self.update()
 
+    def set_move_quality_source(self, source):
+        """
+        Set the function looking up the move quality map of a board.
+
+        Args:
+            source: A function returning a dictionary from legal moves to their
+                centipawn loss, or None if the board has no map yet (e.g.
+                MoveQualityMap.get); it is called once when a drag starts and
+                must not wait for the engine
+        """
+        self.move_quality_source = source
+
+    def _target_colors(self):
+        """
+        Get the colors of the dragged piece's target squares from the move quality map.
+
+        Returns:
+            A dictionary from target squares to colors, empty if the position has no map
+        """
+        if self.move_quality_source is None:
+            return {}
+        quality = self.move_quality_source(self.board)
+        if not quality:
+            return {}
+
+        # Moves missing from a capped map ranked below all of its lines, and a
+        # promotion square is colored by its best promotion
+        worst = max(quality.values())
+        losses = {}
+        for move in self.legal_moves:
+            loss = quality.get(move, worst)
+            losses[move.to_square] = min(loss, losses.get(move.to_square, loss))
+
+        colors = {}
+        for square, loss in losses.items():
+            if loss >= BLUNDER:
+                colors[square] = self.BLUNDER_COLOR
+            elif loss >= MISTAKE:
+                colors[square] = self.MISTAKE_COLOR
+            elif loss >= INACCURACY:
+                colors[square] = self.INACCURACY_COLOR
+            else:
+                colors[square] = self.GOOD_MOVE_COLOR
+        return colors
+
     def set_move_made_callback(self, callback):
         """Set the callback function to be called when a move is made."""
         self.move_made_callback = callback
@@ -0,0 +1,11 @@
+"""
+Test Configuration.
+
+This module makes the project packages importable when the tests are run with pytest.
+"""
+
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
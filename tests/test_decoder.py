@@ -0,0 +1,60 @@
+"""
+Game Decoder Tests.
+
+These tests decode missed moves from clean and noisy detected placements.
+"""
+
+import chess
+import numpy as np
+
+from src.chess.decoder import GameDecoder
+from src.chess.position import EMPTY, placement_from_board
+
+
+def played(board, *sans):
+    """Play SAN moves on a copy of a board and return the moves and the new placement."""
+    board = board.copy()
+    moves = [board.push_san(san) for san in sans]
+    return moves, placement_from_board(board)
+
+
+def test_two_missed_plies_are_recovered():
+    """The two moves between two placements are decoded."""
+    board = chess.Board()
+    moves, observed = played(board, "e4", "c5")
+    assert GameDecoder().decode(board, placement_from_board(board), observed) == moves
+
+
+def test_three_missed_plies_are_recovered():
+    """A sequence of max_plies moves, including a capture, is decoded."""
+    board = chess.Board()
+    board.push_san("e4")
+    board.push_san("d5")
+    moves, observed = played(board, "exd5", "Qxd5", "Nc3")
+    assert GameDecoder(max_plies=3).decode(board, placement_from_board(board), observed) == moves
+
+
+def test_missed_castling_is_recovered():
+    """Castling followed by a reply is decoded with the rook move."""
+    board = chess.Board("r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1")
+    moves, observed = played(board, "O-O", "O-O-O")
+    assert GameDecoder().decode(board, placement_from_board(board), observed) == moves
+
+
+def test_noisy_square_is_explained_by_the_legal_sequence():
+    """A missed piece on a low-confidence square does not prevent the decode."""
+    board = chess.Board()
+    moves, observed = played(board, "d4", "Nf6")
+    confidences = np.where(observed >= 0, 0.95, 0.0)
+
+    # The pawn on a2 was not detected in this frame
+    observed = observed.copy()
+    observed[chess.A2] = EMPTY
+    assert GameDecoder().decode(board, placement_from_board(board), observed, confidences) == moves
+
+
+def test_unreachable_placement_is_not_decoded():
+    """Placements too many moves away are not forced onto a wrong sequence."""
+    board = chess.Board()
+    _, observed = played(board, "e4", "e5", "Nf3", "Nc6", "Bb5", "a6")
+    assert GameDecoder(max_plies=3).decode(board, placement_from_board(board), observed) is None
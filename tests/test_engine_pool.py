@@ -0,0 +1,53 @@
+"""
+Engine Pool Tests.
+
+These tests run the pool against the scripted mock engine, so they need no Stockfish.
+"""
+
+import json
+import time
+
+import chess
+import chess.engine
+import pytest
+
+from src.chess.engine import find_engine
+from src.chess.engine_pool import EnginePool
+
+
+@pytest.fixture
+def mock_engine_path(tmp_path):
+    """The command line of a mock engine that spends 0.1 s per depth."""
+    script = tmp_path / "script.json"
+    script.write_text(json.dumps({"depth_delay": 0.1, "max_depth": 30}))
+    config = tmp_path / "engine.json"
+    config.write_text(json.dumps({"engine": "mock", "script": str(script)}))
+    return find_engine(str(config))
+
+
+def test_idle_engine_steals_burst_routed_to_busy_engine(mock_engine_path):
+    """Jobs submitted together with the same route are shared by an idle engine."""
+    pool = EnginePool(size=2, engine_path=mock_engine_path)
+    try:
+        for _ in range(3):
+            # Both engines are started and idle; engine 1 goes idle first, so it is
+            # the first to look at the burst, while engine 0 is still free
+            pool.analyse(chess.Board(), chess.engine.Limit(depth=1), route=1)
+            pool.analyse(chess.Board(), chess.engine.Limit(depth=1), route=0)
+            jobs_before = [engine["jobs"] for engine in pool.stats()["engines"]]
+
+            # Queue the whole burst before any worker wakes up
+            limit = chess.engine.Limit(depth=4)
+            started = time.perf_counter()
+            with pool.condition:
+                futures = [pool.submit(chess.Board(), limit, route=0) for _ in range(3)]
+            for future in futures:
+                future.result(timeout=10)
+            elapsed = time.perf_counter() - started
+
+            # Run serially on engine 0, the burst takes three searches of 0.4 s
+            jobs = [engine["jobs"] - before for engine, before in zip(pool.stats()["engines"], jobs_before)]
+            assert jobs[1] >= 1, jobs
+            assert elapsed < 1.1, elapsed
+    finally:
+        pool.stop()
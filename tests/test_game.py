@@ -0,0 +1,91 @@
+"""
+Game Tracker Tests.
+
+These tests feed the tracker detected placements and check the game state it reconstructs.
+"""
+
+import chess
+
+from src.chess.game import GameTracker
+from src.chess.position import Position
+
+
+def detected(board, *sans):
+    """Get the Position detected after playing SAN moves on a copy of a board."""
+    board = board.copy()
+    for san in sans:
+        board.push_san(san)
+    # Detection only sees the placement, never the game state
+    return Position(Position.from_board(board).placement)
+
+
+def detected_board(*sans):
+    """Get the board after playing SAN moves from the starting position."""
+    board = chess.Board()
+    for san in sans:
+        board.push_san(san)
+    return board
+
+
+def test_single_move_updates_the_game_state():
+    """A placement one move away is explained by that move, which updates the full state."""
+    tracker = GameTracker()
+    assert tracker.update(detected(chess.Board(), "e4")) == chess.Move.from_uci("e2e4")
+    assert tracker.last_sans == ["e4"]
+    assert tracker.board.fen() == detected_board("e4").fen()
+
+
+def test_unchanged_placement_is_not_a_move():
+    """The same placement again applies no move."""
+    tracker = GameTracker()
+    tracker.update(detected(chess.Board(), "e4"))
+    assert tracker.update(detected(chess.Board(), "e4")) is None
+    assert tracker.last_moves == []
+    assert len(tracker.board.move_stack) == 1
+
+
+def test_missed_moves_are_recovered():
+    """Two and three missed plies are reconstructed as legal move sequences."""
+    tracker = GameTracker()
+    assert tracker.update(detected(chess.Board(), "e4", "e5")) == chess.Move.from_uci("e7e5")
+    assert tracker.last_sans == ["e4", "e5"]
+
+    assert tracker.update(detected(tracker.board, "Nf3", "Nc6", "Bb5")) == chess.Move.from_uci("f1b5")
+    assert tracker.last_sans == ["Nf3", "Nc6", "Bb5"]
+    assert tracker.board.turn == chess.BLACK
+    assert tracker.board.fen() == detected_board("e4", "e5", "Nf3", "Nc6", "Bb5").fen()
+
+
+def test_side_to_move_is_corrected_from_the_mover():
+    """A move by the side that was not thought to be on move corrects the turn."""
+    tracker = GameTracker()
+
+    # Black moves first, e.g. the game was picked up with black to move
+    black_first = chess.Board()
+    black_first.turn = chess.BLACK
+    assert tracker.update(detected(black_first, "e5")) == chess.Move.from_uci("e7e5")
+    assert tracker.last_sans == ["e5"]
+    assert tracker.board.turn == chess.WHITE
+
+
+def test_en_passant_and_castling_are_tracked():
+    """En passant removes the captured pawn and castling moves the rook in the tracked game."""
+    tracker = GameTracker()
+    for san in ("e4", "a6", "e5", "d5", "exd6", "Nf6", "Nf3", "Ra7", "Be2", "h6", "O-O"):
+        move = tracker.board.parse_san(san)
+        assert tracker.update(detected(tracker.board, san)) == move
+
+    board = tracker.board
+    assert board.piece_at(chess.D5) is None
+    assert board.piece_at(chess.D6) == chess.Piece(chess.PAWN, chess.WHITE)
+    assert board.piece_at(chess.G1) == chess.Piece(chess.KING, chess.WHITE)
+    assert board.piece_at(chess.F1) == chess.Piece(chess.ROOK, chess.WHITE)
+    assert not board.has_castling_rights(chess.WHITE)
+
+
+def test_successor_keys_follow_the_game():
+    """The successor keys are those of the position after the last move."""
+    tracker = GameTracker()
+    tracker.update(detected(chess.Board(), "e4"))
+    assert detected(tracker.board, "e5").key in tracker.successor_keys()
+    assert detected(chess.Board(), "d4").key not in tracker.successor_keys()
@@ -0,0 +1,83 @@
+"""
+Move Index Tests.
+
+These tests check that the square-change signature of every kind of move finds the move.
+"""
+
+import chess
+
+from src.chess.move_detector import MoveIndex
+from src.chess.position import placement_from_board, placement_key
+
+
+def play(board, *sans):
+    """Play SAN moves on a copy of a board."""
+    board = board.copy()
+    for san in sans:
+        board.push_san(san)
+    return board
+
+
+def lookup(board, move):
+    """Look up the placement after a move in the index of the board."""
+    after = board.copy()
+    after.push(move)
+    return MoveIndex(board).lookup_placement(placement_from_board(after))
+
+
+def test_every_legal_move_is_found_from_its_placement():
+    """Each legal move of a middlegame position is recovered from the placement after it."""
+    board = play(chess.Board(), "e4", "e5", "Nf3", "Nc6", "Bb5", "a6")
+    for move in board.legal_moves:
+        assert lookup(board, move) == move
+
+
+def test_en_passant_signature_includes_the_captured_pawn():
+    """An en passant capture is found, and a placement keeping the captured pawn is not a move."""
+    board = play(chess.Board(), "e4", "a6", "e5", "d5")
+    move = chess.Move.from_uci("e5d6")
+    assert board.is_en_passant(move)
+    assert lookup(board, move) == move
+
+    # The capturing pawn arrives but the captured pawn is still seen on d5
+    after = board.copy()
+    after.push(move)
+    placement = placement_from_board(after)
+    placement[chess.D5] = placement_from_board(board)[chess.D5]
+    assert MoveIndex(board).lookup_placement(placement) is None
+
+
+def test_castling_signatures_include_the_rook():
+    """Both castling moves are found from the king and rook squares they change."""
+    board = chess.Board("r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1")
+    for uci in ("e1g1", "e1c1"):
+        move = chess.Move.from_uci(uci)
+        assert board.is_castling(move)
+        assert lookup(board, move) == move
+
+    # A king step to g1 without the rook is not castling, and not legal
+    placement = placement_from_board(board)
+    placement[chess.G1], placement[chess.E1] = placement[chess.E1], -1
+    assert MoveIndex(board).lookup_placement(placement) is None
+
+
+def test_promotions_are_told_apart():
+    """Promotions to different pieces on the same square are different moves."""
+    board = chess.Board("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+    for promotion in (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT):
+        move = chess.Move(chess.A7, chess.A8, promotion)
+        assert lookup(board, move) == move
+
+
+def test_successor_keys_are_the_keys_after_each_legal_move():
+    """The successor keys are exactly the placement keys one legal move away."""
+    board = chess.Board()
+    expected = set()
+    for move in board.legal_moves:
+        after = board.copy()
+        after.push(move)
+        expected.add(placement_key(placement_from_board(after)))
+
+    index = MoveIndex(board)
+    assert len(index) == board.legal_moves.count()
+    assert index.successor_keys() == expected
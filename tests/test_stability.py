@@ -0,0 +1,59 @@
+"""
+Position Stability Tests.
+
+These tests feed the tracker frame keys with explicit frame times.
+"""
+
+import pytest
+
+# The detection package imports the screen capture and YOLO dependencies
+pytest.importorskip("cv2")
+pytest.importorskip("pyautogui")
+pytest.importorskip("ultralytics")
+
+from src.detection.stability import StabilityTracker  # noqa: E402
+
+
+def frames_until_accepted(tracker, key, limit=50, start=0.0, interval=0.1):
+    """Observe a key frame by frame and count the frames until it is accepted."""
+    for frame in range(1, limit + 1):
+        if tracker.observe(key, now=start + frame * interval):
+            return frame
+    return None
+
+
+def test_unreachable_position_needs_the_full_threshold():
+    """A key that is not one move away is accepted after threshold frames."""
+    tracker = StabilityTracker(threshold=10, fast_threshold=2)
+    assert frames_until_accepted(tracker, 1) == 10
+
+
+def test_reachable_position_uses_the_fast_threshold():
+    """A key one legal move away is accepted after fast_threshold frames."""
+    tracker = StabilityTracker(threshold=10, fast_threshold=2)
+    tracker.set_reachable([1, 2, 3])
+    assert tracker.required_frames(2) == 2
+    assert tracker.required_frames(4) == 10
+    assert frames_until_accepted(tracker, 2) == 2
+    assert abs(tracker.last_latency - 0.1) < 1e-9
+
+
+def test_accepted_position_is_not_accepted_again():
+    """The last accepted key is not reported again while it stays on screen."""
+    tracker = StabilityTracker(threshold=3, fast_threshold=2)
+    assert frames_until_accepted(tracker, 1) == 3
+    assert frames_until_accepted(tracker, 1, limit=10) is None
+
+
+def test_flicker_and_rejected_frames_restart_the_count():
+    """A different key or a rejected frame in between restarts the consecutive count."""
+    tracker = StabilityTracker(threshold=3, fast_threshold=2)
+    assert not tracker.observe(1, now=0.0)
+    assert not tracker.observe(1, now=0.1)
+    assert not tracker.observe(2, now=0.2)
+    assert not tracker.observe(1, now=0.3)
+    assert not tracker.observe(1, now=0.4)
+    tracker.reject()
+    assert not tracker.observe(1, now=0.5)
+    assert not tracker.observe(1, now=0.6)
+    assert tracker.observe(1, now=0.7)
@@ -0,0 +1,21 @@
+"""
+Chess Vision - Engine Tuning Entry Point.
+
+This script measures the engine speed across thread counts and hash sizes, within
+the cores left over by detection, and saves the fastest configuration, which the
+application applies when it starts the engine.
+
+Usage:
+    python tune_engine.py [--cpu-share F] [--hash MB [MB ...]] [--depth D] [--engine-config FILE]
+"""
+
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.chess.tuning import main
+
+if __name__ == "__main__":
+    main()